@@ -0,0 +1,5 @@
+"""测试从仓库根目录导入 wp_* 模块"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
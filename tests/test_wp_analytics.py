@@ -0,0 +1,39 @@
+"""时段直方图：归档周改动后替换计数而不是累加"""
+import datetime
+
+from wp_catalog import ArchiveCatalog
+from wp_analytics import AnalyticsEngine, HourlyHistogram
+
+
+def test_rearchived_week_replaces_counts(tmp_path):
+    archive_dir = tmp_path / "archive"
+    archive_dir.mkdir()
+    week_file = archive_dir / "week_1_progress_2024-01-07.txt"
+    week_file.write_text("📆 2024-01-01 (Monday)\n[2024-01-01 10:00] 快速记录: a\n", encoding='utf-8')
+    current = tmp_path / "weekly_progress.txt"
+    current.write_text("", encoding='utf-8')
+    catalog = ArchiveCatalog(str(archive_dir))
+    analytics = AnalyticsEngine(catalog)
+
+    hourly = HourlyHistogram(str(archive_dir))
+    hourly.build(analytics, str(current))
+    assert hourly.archived[0][10] == 1
+
+    with open(week_file, 'a', encoding='utf-8') as f:
+        f.write("[2024-01-01 10:30] 快速记录: b\n")
+    catalog.record(1, str(week_file))
+    hourly.build(analytics, str(current))
+    assert hourly.archived[0][10] == 2
+
+    # 重新加载后计数一致，未变化时不再写盘
+    reloaded = HourlyHistogram(str(archive_dir))
+    reloaded.build(analytics, str(current))
+    assert reloaded.archived[0][10] == 2 and not reloaded.dirty
+
+
+def test_add_is_saved_on_flush(tmp_path):
+    hourly = HourlyHistogram(str(tmp_path))
+    hourly.add(datetime.datetime(2024, 1, 2, 9, 15))
+    assert hourly.dirty and not (tmp_path / ".hourly.json").exists()
+    hourly.flush()
+    assert HourlyHistogram(str(tmp_path)).current[1][9] == 1
@@ -0,0 +1,43 @@
+"""日期标题索引：程序自己写文件之后索引仍然有效，外部改动时重新扫描"""
+from wp_days import DayIndex
+
+WEEK = "# 第 1 周\n📆 2024-01-01 (Monday)\n□ 写周报\n"
+
+
+def test_index_follows_own_writes(tmp_path):
+    current = tmp_path / "weekly_progress.txt"
+    current.write_text(WEEK, encoding='utf-8')
+    index = DayIndex(str(tmp_path), str(current))
+    assert index.line_of("2024-01-01") == 2
+
+    # 保存整篇之后 update：文件版本与索引一致，ensure_day 不用重新扫描
+    saved = WEEK + "📆 2024-01-02 (Tuesday)\n"
+    current.write_text(saved, encoding='utf-8')
+    index.update(saved)
+    assert index._file_key() == index.key
+    assert not index.ensure_day("2024-01-02", "不应追加\n")
+
+    # 末尾追加一行（文件原本不以换行结尾）
+    with open(current, 'a', encoding='utf-8') as f:
+        f.write("x")
+    index.update(saved + "x")
+    with open(current, 'a', encoding='utf-8') as f:
+        f.write("\n📆 2024-01-03 (Wednesday)\n")
+    index.appended("\n📆 2024-01-03 (Wednesday)\n")
+    assert index._file_key() == index.key
+    assert index.line_of("2024-01-03") == 6
+
+
+def test_outside_change_is_rescanned(tmp_path):
+    current = tmp_path / "weekly_progress.txt"
+    current.write_text(WEEK, encoding='utf-8')
+    index = DayIndex(str(tmp_path), str(current))
+    # 另一个实例在开头插入了一天，随后本实例追加
+    current.write_text("📆 2023-12-31 (Sunday)\n" + WEEK, encoding='utf-8')
+    with open(current, 'a', encoding='utf-8') as f:
+        f.write("📆 2024-01-02 (Tuesday)\n")
+    index.appended("📆 2024-01-02 (Tuesday)\n")
+    assert index.line_of("2023-12-31") == 1
+    assert index.line_of("2024-01-02") == 5
+    assert index.ensure_day("2024-01-04", "📆 2024-01-04 (Thursday)\n")
+    assert DayIndex(str(tmp_path), str(current)).line_of("2024-01-04") == 6
@@ -0,0 +1,35 @@
+"""记录段统计：按段增量解析，结果与整篇解析一致"""
+import wp_events
+from wp_analytics import analyze_text
+from wp_events import SectionTracker
+
+WEEK = """# 第 3 周
+📆 2024-01-15 (Monday)
+□ 写周报 #工作
+✓ 回邮件
+[2024-01-15 09:30] 快速记录: ⏱️ 写周报 - 用时 25 分钟
+📆 2024-01-16 (Tuesday)
+✓ 读论文 #学习
+"""
+
+
+def test_day_stats_match_full_parse(monkeypatch):
+    tracker = SectionTracker()
+    tracker.update(WEEK)
+    assert tracker.day_stats() == analyze_text(WEEK)['days']
+    assert tracker.day_stats()["2024-01-15"] == {'created': 2, 'completed': 1, 'notes': 1, 'focus': 25}
+
+    parsed = []
+    original = wp_events.analyze_text
+    monkeypatch.setattr(wp_events, 'analyze_text', lambda text: parsed.append(text) or original(text))
+    edited = WEEK.replace("□ 写周报", "✓ 写周报") + "📆 2024-01-17 (Wednesday)\n□ 锻炼\n"
+    changed = tracker.update(edited)
+
+    assert [day for day, _ in changed] == ["2024-01-15", "2024-01-17"]
+    # 只重新解析了变化的两段
+    assert len(parsed) == 2
+    assert tracker.day_stats() == analyze_text(edited)['days']
+
+    removed = edited.split("📆 2024-01-16")[0]
+    assert ("2024-01-16", None) in tracker.update(removed)
+    assert tracker.day_stats() == analyze_text(removed)['days']
@@ -0,0 +1,87 @@
+"""多格式导出：各格式的输出、批量导出跳过未变化的周、出错时不留临时文件"""
+import csv
+import json
+
+import pytest
+
+import wp_export
+from wp_catalog import ArchiveCatalog
+from wp_export import export_file, export_archive, ExportManifest
+
+WEEK = """# 第 1 周
+📆 2024-01-01 (Monday)
+【学习】
+□ 写周报 #工作 [Due:01/05]
+✓ 读论文, 做笔记
+随手记一笔
+"""
+META = {'week': 1, 'start': '2024-01-01', 'end': '2024-01-07'}
+
+
+def test_formats(tmp_path):
+    source = tmp_path / "week.txt"
+    source.write_text(WEEK, encoding='utf-8')
+    out_dir = tmp_path / "out"
+    names = export_file(str(source), str(out_dir), ['md', 'html', 'csv', 'json', 'ics'], META)
+    assert sorted(p.name for p in out_dir.iterdir()) == sorted(names.values())
+
+    md = (out_dir / names['md']).read_text(encoding='utf-8')
+    assert "## 2024-01-01 (Monday)" in md and "### 学习" in md
+    assert "- [ ] 写周报 #工作 [Due:01/05]" in md and "- [x] 读论文, 做笔记" in md
+
+    html = (out_dir / names['html']).read_text(encoding='utf-8')
+    assert html.count("<li") == 2 and "<p>随手记一笔</p>" in html
+
+    with open(out_dir / names['csv'], encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[1] == ["1", "2024-01-01", "待办", "写周报 #工作 [Due:01/05]", "#工作", "2024-01-05"]
+    assert rows[2][2:4] == ["完成", "读论文, 做笔记"]
+
+    data = json.loads((out_dir / names['json']).read_text(encoding='utf-8'))
+    assert data['week'] == 1
+    assert [item['type'] for item in data['items']] == ['text', 'day', 'section', 'task', 'task', 'text']
+
+    ics = (out_dir / names['ics']).read_bytes().decode('utf-8')
+    assert ics.count("BEGIN:VTODO") == 1
+    assert "DUE;VALUE=DATE:20240105\r\n" in ics and "CATEGORIES:工作\r\n" in ics
+
+
+def test_archive_skips_unchanged_weeks(tmp_path):
+    archive_dir = tmp_path / "archive"
+    archive_dir.mkdir()
+    for week in (1, 2):
+        (archive_dir / f"week_{week}_progress_2024-01-{week * 7:02d}.txt").write_text(WEEK, encoding='utf-8')
+    catalog = ArchiveCatalog(str(archive_dir))
+    out_dir = tmp_path / "out"
+
+    assert export_archive(catalog, str(out_dir), ['md', 'csv']) == (2, 0, [])
+    assert export_archive(catalog, str(out_dir), ['md', 'csv']) == (0, 2, [])
+
+    # 改动一周、删掉另一周的一个导出文件、新增一种格式
+    week_1 = archive_dir / "week_1_progress_2024-01-07.txt"
+    with open(week_1, 'a', encoding='utf-8') as f:
+        f.write("□ 补一条\n")
+    catalog.record(1, str(week_1))
+    (out_dir / "week_2.csv").unlink()
+    manifest = ExportManifest(str(out_dir))
+    assert manifest.missing(catalog.get_week(1), ['md', 'csv']) == ['md', 'csv']
+    assert manifest.missing(catalog.get_week(2), ['md', 'csv', 'json']) == ['csv', 'json']
+
+    assert export_archive(catalog, str(out_dir), ['md', 'csv', 'json']) == (2, 0, [])
+    assert "补一条" in (out_dir / "week_1.md").read_text(encoding='utf-8')
+    assert export_archive(catalog, str(out_dir), ['md', 'csv', 'json']) == (0, 2, [])
+
+
+def test_failed_export_leaves_no_files(tmp_path, monkeypatch):
+    source = tmp_path / "week.txt"
+    source.write_text(WEEK, encoding='utf-8')
+    out_dir = tmp_path / "out"
+
+    class Broken(wp_export.Writer):
+        def item(self, item):
+            raise ValueError("写出失败")
+
+    monkeypatch.setitem(wp_export.WRITERS, 'json', Broken)
+    with pytest.raises(ValueError):
+        export_file(str(source), str(out_dir), ['md', 'json'], META)
+    assert list(out_dir.iterdir()) == []
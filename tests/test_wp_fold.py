@@ -0,0 +1,201 @@
+"""折叠编辑窗口：占位行只读，取全文时折叠段原文拼回原处"""
+import re
+
+import pytest
+
+from wp_fold import DayWindow, FoldView, FOLD_TAG
+
+WEEK = """# 第 3 周
+📆 2024-01-15 (Monday)
+□ 写周报
+📆 2024-01-16 (Tuesday)
+✓ 读论文
+📆 2024-01-17 (Wednesday)
+□ 锻炼
+"""
+
+
+class FakeText:
+    """只实现 FoldView 用到的 Text 接口（字符偏移模拟行列索引，标记右重力）"""
+
+    def __init__(self):
+        self.chars = "\n"
+        self.tags = [set()]
+        self.marks = {}
+
+    def _offset(self, index):
+        base, *deltas = re.split(r'(?=[+-]\d+c)', str(index))
+        if base in self.marks:
+            offset = self.marks[base]
+        elif base == 'end':
+            offset = len(self.chars)
+        else:
+            line, col = map(int, base.split('.'))
+            lines = self.chars.split('\n')
+            offset = sum(len(text) + 1 for text in lines[:line - 1]) + min(col, len(lines[line - 1]))
+        offset += sum(int(delta[:-1]) for delta in deltas)
+        return max(0, min(offset, len(self.chars)))
+
+    def index(self, index):
+        before = self.chars[:min(self._offset(index), len(self.chars) - 1)]
+        return f"{before.count(chr(10)) + 1}.{len(before) - before.rfind(chr(10)) - 1}"
+
+    def insert(self, index, chars, tags=None):
+        at = min(self._offset(index), len(self.chars) - 1)
+        if tags is None:
+            # 和 Tk 一样：继承前后两个字符共有的标签
+            inherited = self.tags[at - 1] & self.tags[at] if at else set()
+        else:
+            inherited = {tags} if isinstance(tags, str) else set(tags)
+        self.chars = self.chars[:at] + chars + self.chars[at:]
+        self.tags[at:at] = [set(inherited) for _ in chars]
+        for name, offset in self.marks.items():
+            if offset >= at:
+                self.marks[name] = offset + len(chars)
+
+    def delete(self, first, last=None):
+        start = self._offset(first)
+        end = min(self._offset(last) if last else start + 1, len(self.chars) - 1)
+        if end <= start:
+            return
+        self.chars = self.chars[:start] + self.chars[end:]
+        del self.tags[start:end]
+        for name, offset in self.marks.items():
+            self.marks[name] = offset - (end - start) if offset >= end else min(offset, start)
+
+    def get(self, first, last):
+        return self.chars[self._offset(first):self._offset(last)]
+
+    def compare(self, first, op, second):
+        a, b = self._offset(first), self._offset(second)
+        return {'<': a < b, '<=': a <= b, '>': a > b, '>=': a >= b, '==': a == b}[op]
+
+    def tag_names(self, index):
+        return tuple(self.tags[self._offset(index)])
+
+    def tag_ranges(self, name):
+        ranges = []
+        for i, tags in enumerate(self.tags):
+            inside = name in tags
+            if inside and (i == 0 or name not in self.tags[i - 1]):
+                ranges.append(self.index(f"1.0+{i}c"))
+            if not inside and i and name in self.tags[i - 1]:
+                ranges.append(self.index(f"1.0+{i}c"))
+        return ranges
+
+    def tag_delete(self, name):
+        for tags in self.tags:
+            tags.discard(name)
+
+    def mark_set(self, name, index):
+        self.marks[name] = self._offset(index)
+
+    def mark_unset(self, name):
+        self.marks.pop(name, None)
+
+    def mark_gravity(self, name, gravity):
+        pass
+
+    def tag_configure(self, *args, **kwargs):
+        pass
+
+    def tag_bind(self, *args, **kwargs):
+        pass
+
+    def config(self, **kwargs):
+        pass
+
+    def cget(self, option):
+        return False
+
+    def edit_reset(self):
+        pass
+
+    def bell(self):
+        pass
+
+
+class FakeHook:
+    """TextChangeHook 的守卫部分：修改先经过守卫，被拒绝时不执行"""
+
+    def __init__(self, text):
+        self.text = text
+        self.guards = []
+
+    def add_guard(self, guard):
+        self.guards.append(guard)
+
+    def edit(self, command, *args):
+        for guard in self.guards:
+            args = guard(command, args)
+            if args is None:
+                return False
+        getattr(self.text, command)(*args)
+        return True
+
+
+@pytest.fixture
+def view(tmp_path):
+    path = tmp_path / "week.txt"
+    path.write_bytes(WEEK.encode('utf-8'))
+    window = DayWindow(str(path), window_days=0)
+    text = FakeText()
+    hook = FakeHook(text)
+    fold_view = FoldView(text, window, hook=hook)
+    fold_view.render(window.plan(path.read_bytes()))
+    return fold_view, text, hook
+
+
+def test_content_round_trips(view):
+    fold_view, text, _ = view
+    assert len(fold_view.folds) == 2
+    assert FOLD_TAG in text.tag_names('2.0')
+    assert fold_view.content('end-1c') == WEEK
+
+
+def test_typing_next_to_placeholder_is_kept(view):
+    fold_view, text, hook = view
+    # 第 2、3 行是两个相邻的占位行
+    assert hook.edit('insert', '2.0', "置顶\n")
+    assert hook.edit('insert', '4.0', "夹在中间\n")
+    assert FOLD_TAG not in text.tag_names('4.0')
+    assert hook.edit('insert', 'end-1c', "新任务\n")
+    expected = WEEK.replace("📆 2024-01-15", "置顶\n📆 2024-01-15").replace(
+        "📆 2024-01-16", "夹在中间\n📆 2024-01-16") + "新任务\n"
+    assert fold_view.content('end-1c') == expected
+
+
+def test_placeholder_is_read_only(view):
+    fold_view, text, hook = view
+    assert not hook.edit('insert', '2.3', "丢失")
+    # 退格删掉占位行的换行符、选区跨进占位行
+    assert not hook.edit('delete', '4.0-1c', '4.0')
+    assert not hook.edit('delete', '1.2', '2.4')
+    assert fold_view.content('end-1c') == WEEK
+
+    # 整行删除仍然允许，折叠段原文保留
+    assert hook.edit('delete', '2.0', '3.0')
+    assert fold_view.content('end-1c') == WEEK
+
+
+@pytest.mark.parametrize('same_version', [False, True])
+def test_external_change_to_folded_day(tmp_path, same_version):
+    """文件在载入后被外部改动：折叠段变长、变短时都读回改动后的原文
+
+    same_version 模拟文件版本没能识别出改动的情况，只靠区间两端的核对。
+    """
+    path = tmp_path / "week.txt"
+    path.write_bytes(WEEK.encode('utf-8'))
+    window = DayWindow(str(path), window_days=0)
+    text = FakeText()
+    fold_view = FoldView(text, window, hook=FakeHook(text))
+    fold_view.render(window.plan(path.read_bytes()))
+
+    grown = WEEK.replace("□ 写周报\n", "□ 写周报\n□ 外部添加\n")
+    shrunk = WEEK.replace("□ 写周报\n", "")
+    for changed in (grown, shrunk):
+        path.write_bytes(changed.encode('utf-8'))
+        if same_version:
+            window.version = window._stat()
+        assert window.read("2024-01-15#0") == changed.split("📆 2024-01-16")[0].split("周\n")[1]
+        assert fold_view.content('end-1c') == changed
@@ -0,0 +1,122 @@
+"""版本历史：恢复、中断后的恢复、清理后的恢复、清理中断后的恢复"""
+import os
+
+import pytest
+
+import wp_history
+from wp_history import VersionHistory, CHUNK_HEADER
+
+
+def week_text(n, edited=None):
+    lines = [f"📆 2024-01-0{1 + i % 7} 第 {i} 行 记录内容 {i * 7}" for i in range(n)]
+    if edited is not None:
+        lines[edited] += " (已修改)"
+    return "\n".join(lines) + "\n"
+
+
+def test_restore_every_version(tmp_path):
+    history = VersionHistory(str(tmp_path))
+    texts = [week_text(300), week_text(300, 5), week_text(300, 250), week_text(310)]
+    ids = [history.snapshot(text, 1000 + i) for i, text in enumerate(texts)]
+    assert history.snapshot(texts[-1]) is None
+
+    reloaded = VersionHistory(str(tmp_path))
+    for version_id, text in zip(ids, texts):
+        assert reloaded.restore(version_id) == text
+    assert reloaded.restore_at(1001.5) == texts[1]
+
+
+def test_truncated_pack_is_repaired(tmp_path):
+    history = VersionHistory(str(tmp_path))
+    first = history.snapshot(week_text(200), 1000)
+    size = os.path.getsize(history.pack_path)
+    # 模拟写块时崩溃：块头完整、数据只写了一半，日志还没写
+    with open(history.pack_path, 'ab') as f:
+        f.write(CHUNK_HEADER.pack(b"\x01" * 20, 0, 500) + b"x" * 100)
+
+    reloaded = VersionHistory(str(tmp_path))
+    assert os.path.getsize(reloaded.pack_path) == size
+    assert "01" * 20 not in reloaded.chunks
+    assert reloaded.restore(first) == week_text(200)
+    second = reloaded.snapshot(week_text(200, 3), 2000)
+    assert VersionHistory(str(tmp_path)).restore(second) == week_text(200, 3)
+
+
+def test_partial_log_line_is_dropped(tmp_path):
+    history = VersionHistory(str(tmp_path))
+    first = history.snapshot(week_text(50), 1000)
+    with open(history.log_path, 'a', encoding='utf-8') as f:
+        f.write('{"id":2,"time":2000,"si')
+
+    reloaded = VersionHistory(str(tmp_path))
+    assert [v['id'] for v in reloaded.list_versions()] == [first]
+    second = reloaded.snapshot(week_text(50, 1), 3000)
+    assert VersionHistory(str(tmp_path)).restore(second) == week_text(50, 1)
+
+
+def test_prune_keeps_restorable_versions(tmp_path):
+    history = VersionHistory(str(tmp_path))
+    day = 86400
+    now = 100 * day
+    texts = {}
+    # 60 天前起每小时一个版本
+    for hour in range(60 * 24):
+        timestamp = now - 60 * day + hour * 3600
+        texts[history.snapshot(week_text(120, hour % 120), timestamp)] = week_text(120, hour % 120)
+    before = history.disk_usage()
+    history.prune(now)
+
+    assert len(history.versions) < 60 * 24
+    assert history.disk_usage() < before
+    reloaded = VersionHistory(str(tmp_path))
+    for version in reloaded.list_versions():
+        assert reloaded.restore(version['id']) == texts[version['id']]
+
+
+def hourly_history(tmp_path, hours=10 * 24):
+    history = VersionHistory(str(tmp_path))
+    day = 86400
+    texts = {}
+    for hour in range(hours):
+        text = week_text(120, hour % 120)
+        texts[history.snapshot(text, 50 * day + hour * 3600)] = text
+    return history, texts, 100 * day
+
+
+@pytest.mark.parametrize('crash_at', ['_rewrite_log', 'remove'])
+def test_prune_interrupted_between_pack_and_log(tmp_path, monkeypatch, crash_at):
+    """清理时在写完新块文件之后、替换日志之前（或删除旧块文件之前）中断，历史仍然完整"""
+    history, texts, now = hourly_history(tmp_path)
+
+    def crash(*args, **kwargs):
+        raise OSError("模拟中断")
+
+    if crash_at == 'remove':
+        # 旧块文件删不掉：清理本身完成，旧文件留到下次加载时删除
+        monkeypatch.setattr(wp_history.os, 'remove', crash)
+        history.prune(now)
+    else:
+        monkeypatch.setattr(history, crash_at, crash)
+        with pytest.raises(OSError):
+            history.prune(now)
+    monkeypatch.undo()
+    for version in history.list_versions():
+        assert history.restore(version['id']) == texts[version['id']]
+
+    reloaded = VersionHistory(str(tmp_path))
+    packs = [name for name in os.listdir(reloaded.dir) if name.endswith('.pack')]
+    assert packs == [os.path.basename(reloaded.pack_path)]
+    for version in reloaded.list_versions():
+        assert reloaded.restore(version['id']) == texts[version['id']]
+    # 中断之后还能继续记录和清理
+    latest = reloaded.snapshot(week_text(120, 7) + "新增\n", now)
+    reloaded.prune(now)
+    assert VersionHistory(str(tmp_path)).restore(latest) == week_text(120, 7) + "新增\n"
+
+
+def test_restore_detects_mismatched_content(tmp_path):
+    history = VersionHistory(str(tmp_path))
+    version_id = history.snapshot(week_text(50), 1000)
+    history.versions[-1]['sha1'] = "0" * 16
+    with pytest.raises(ValueError):
+        history.restore(version_id)
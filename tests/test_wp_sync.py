@@ -0,0 +1,124 @@
+"""目录同步：多台设备收敛、按变更范围生成操作、状态快照 + 操作日志"""
+import json
+import random
+
+from wp_sync import SyncEngine
+
+
+def make_engine(tmp_path, name):
+    (tmp_path / name).mkdir(exist_ok=True)
+    return SyncEngine(str(tmp_path / "shared"), "week_1", str(tmp_path / name / ".sync_state.json"))
+
+
+def edited(engine, content):
+    """整篇替换编辑器内容后同步（变更范围未知）"""
+    engine.note_change(None, 0, 0)
+    return engine.sync(content)
+
+
+def test_concurrent_edits_converge(tmp_path):
+    a, b = make_engine(tmp_path, "a"), make_engine(tmp_path, "b")
+    base = "📆 2024-01-01 (Monday)\n□ 任务一\n□ 任务二\n"
+    a.sync(base)
+    text_b, _, _ = b.sync(base)
+    assert text_b == base
+
+    edited(a, base.replace("□ 任务一", "✓ 任务一") + "A 的备注\n")
+    text_b, _, received = edited(b, base.replace("□ 任务二", "□ 任务二 #重要") + "B 的备注\n")
+    text_a, _, _ = a.sync(a.text())
+    assert received and text_a == b.sync(text_b)[0]
+    assert "✓ 任务一" in text_a and "□ 任务二 #重要" in text_a
+    assert "A 的备注" in text_a and "B 的备注" in text_a
+
+
+def test_same_line_edit_keeps_both_versions(tmp_path):
+    a, b = make_engine(tmp_path, "a"), make_engine(tmp_path, "b")
+    a.sync("x\ny\n")
+    b.sync("x\ny\n")
+    edited(a, "x\nya\n")
+    edited(b, "x\nyb\n")
+    merged, _, _ = a.sync(a.text())
+    assert merged == b.sync(b.text())[0]
+    assert "ya" in merged and "yb" in merged and "y" not in merged.split("\n")
+
+
+def test_noted_ranges_match_full_diff(tmp_path):
+    """只比较编辑器报告的范围，结果和整篇比较一样，且随机交替编辑后两台设备收敛"""
+    rng = random.Random(7)
+    editors = {}
+    for name in "ab":
+        editors[name] = [make_engine(tmp_path, name), [""]]
+    for _ in range(150):
+        for name, editor in editors.items():
+            engine, lines = editor
+            for _ in range(rng.randint(0, 3)):
+                start = rng.randint(1, len(lines))
+                removed = rng.randint(0, min(2, len(lines) - start))
+                added = rng.randint(0, 2)
+                lines[start - 1:start + removed] = [f"{name}{rng.randint(0, 99)}" for _ in range(added + 1)]
+                engine.note_change(start, removed, added)
+            content = "\n".join(lines)
+            merged, _, received = engine.sync(content)
+            assert engine.text() == merged
+            if not received:
+                assert merged == content
+            editor[1] = merged.split("\n")
+            engine.forget_changes()
+            if rng.random() < 0.05:
+                editor[0] = make_engine(tmp_path, name)
+    a, b = editors["a"], editors["b"]
+    a[0].sync("\n".join(a[1]))
+    final_b, _, _ = b[0].sync("\n".join(b[1]))
+    final_a, _, _ = a[0].sync(a[0].text())
+    assert final_a == final_b
+
+
+def test_state_reloads_from_snapshot_and_journal(tmp_path):
+    a, b = make_engine(tmp_path, "a"), make_engine(tmp_path, "b")
+    a.sync("1\n2\n3\n")
+    b.sync("")
+    for i in range(5):
+        edited(b, b.text() + f"\nb{i}")
+        edited(a, a.text() + f"\na{i}")
+    journal = tmp_path / "a" / ".sync_state.journal"
+    assert len(journal.read_text(encoding='utf-8').splitlines()) > 1
+    # 同步中断留下半行
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('{"ops": [{"i": [99')
+
+    reloaded = make_engine(tmp_path, "a")
+    assert reloaded.text() == a.text()
+    assert reloaded.replica == a.replica and reloaded.offsets == a.offsets
+    assert reloaded.sync(a.text())[1] == 0
+
+
+def test_crash_before_push_resends_without_reusing_ids(tmp_path, monkeypatch):
+    """本机操作写入状态之后、追加到共享日志之前中断：下次同步重发，编号不重复"""
+    a, b = make_engine(tmp_path, "a"), make_engine(tmp_path, "b")
+    a.sync("1\n2\n")
+    b.sync("1\n2\n")
+
+    def crash(ops):
+        raise OSError("模拟中断")
+
+    monkeypatch.setattr(a, '_push', crash)
+    try:
+        edited(a, "1\n2\n3\n")
+    except OSError:
+        pass
+    monkeypatch.undo()
+    own_log = tmp_path / "shared" / "week_1" / (a.replica + ".log")
+    # 模拟追加共享日志时只写了半行
+    with open(own_log, 'ab') as f:
+        f.write(b'{"i": [3, "')
+
+    restarted = make_engine(tmp_path, "a")
+    assert restarted.text() == "1\n2\n3\n" and restarted.outbox
+    restarted.note_change(None, 0, 0)
+    merged, _, _ = restarted.sync("1\n2\n3\n4\n")
+    assert not restarted.outbox
+    ids = [op['i'][0] for op in map(json.loads, own_log.read_text(encoding='utf-8').splitlines()) if 'i' in op]
+    # 补发的 "3" 和新行 "4" 编号各不相同，中断留下的半行已截掉
+    assert ids == [1, 2, 3, 4, 5]
+    assert b.sync(b.text())[0] == merged == "1\n2\n3\n4\n"
+    assert make_engine(tmp_path, "a").outbox == []
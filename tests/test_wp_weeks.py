@@ -0,0 +1,62 @@
+"""周次引擎：久未打开后的周转换、手动开始新周"""
+import datetime
+
+from wp_catalog import ArchiveCatalog
+from wp_weeks import WeekEngine
+
+
+def make_week_file(path, text="📆 2024-01-17 (Wednesday)\n✓ 旧任务\n"):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_start_date_derived_from_last_check():
+    config = {'week_num': 3, 'last_check': '2024-01-17'}
+    engine = WeekEngine.from_config(config, today=datetime.date(2024, 6, 1))
+    assert config['start_date'] == '2024-01-01'
+    assert engine.week_of(datetime.date(2024, 1, 17)) == 3
+
+
+def test_start_date_falls_back_to_today():
+    config = {'week_num': 2}
+    WeekEngine.from_config(config, today=datetime.date(2024, 6, 5))
+    assert config['start_date'] == '2024-05-27'
+
+
+def test_rollover_after_months_away(tmp_path):
+    catalog = ArchiveCatalog(str(tmp_path / "archive"))
+    current = make_week_file(tmp_path / "weekly_progress.txt")
+    config = {'week_num': 3, 'last_check': '2024-01-17'}
+    today = datetime.date(2024, 3, 6)
+    engine = WeekEngine.from_config(config, today)
+
+    week_num, archived, gaps = engine.transition(catalog, current, config['week_num'], today)
+
+    assert week_num == engine.week_of(today) == 10
+    assert archived and catalog.get_week(3)['file']
+    # 第 1、2 周和离开期间的第 4~9 周登记为空白周
+    assert gaps == 8
+    assert all(catalog.get_week(n).get('gap') for n in range(4, 10))
+    assert catalog.find_by_date('2024-02-14')['week'] == 7
+
+    # 再检查一次不会重复归档
+    assert engine.transition(catalog, current, week_num, today) == (10, None, 0)
+
+
+def test_manual_new_week_stays_in_step(tmp_path):
+    catalog = ArchiveCatalog(str(tmp_path / "archive"))
+    current = make_week_file(tmp_path / "weekly_progress.txt")
+    config = {'week_num': 3, 'start_date': '2024-01-01'}
+    today = datetime.date(2024, 1, 17)
+    engine = WeekEngine.from_config(config, today)
+
+    week_num, archived, _ = engine.start_new_week(catalog, current, config['week_num'], today)
+
+    assert week_num == 4 and archived
+    assert engine.week_of(today) == 4
+    # 下一个周一照常转换并归档第 4 周
+    make_week_file(tmp_path / "weekly_progress.txt", "📆 2024-01-18 (Thursday)\n")
+    monday = datetime.date(2024, 1, 22)
+    week_num, archived, _ = engine.transition(catalog, current, week_num, monday)
+    assert week_num == 5 and archived
+    assert catalog.get_week(4)['file']
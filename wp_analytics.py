@@ -0,0 +1,324 @@
+"""多周统计分析 - 解析当前周和归档周，供报告使用"""
+import os
+import json
+import hashlib
+import datetime
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from wp_model import (
+    parse_day_header, parse_timestamp, parse_task, extract_tags,
+    QUICK_NOTE_MARK, TIMER_RE,
+)
+
+CACHE_NAME = ".analytics_cache.json"
+# 解析逻辑变化时递增，旧缓存自动失效
+ANALYZER_VERSION = 1
+# 未命中缓存的周数达到该值才启用进程池
+POOL_THRESHOLD = 4
+
+WEEKDAY_NAMES = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+
+def analyze_text(content):
+    """解析一周文本，返回可序列化的统计结果"""
+    days = {}
+    tags = Counter()
+    hour_weekday = [[0] * 24 for _ in range(7)]
+    result = {
+        'done': 0,
+        'pending': 0,
+        'notes': 0,
+        'focus_minutes': 0,
+        'days': days,
+        'tags': tags,
+        'hour_weekday': hour_weekday,
+    }
+
+    def day_entry(date):
+        return days.setdefault(str(date), {'created': 0, 'completed': 0, 'notes': 0, 'focus': 0})
+
+    current_day = None
+    for line in content.splitlines():
+        header = parse_day_header(line)
+        if header:
+            current_day = header
+            day_entry(header)
+            continue
+
+        stamp, body = parse_timestamp(line.strip())
+        day = stamp.date() if stamp else current_day
+        if stamp:
+            hour_weekday[stamp.weekday()][stamp.hour] += 1
+
+        task = parse_task(line)
+        if task:
+            done, text = task
+            tags.update(extract_tags(text))
+            if done:
+                result['done'] += 1
+            else:
+                result['pending'] += 1
+            if day:
+                entry = day_entry(day)
+                entry['created'] += 1
+                if done:
+                    entry['completed'] += 1
+            continue
+
+        if body.startswith(QUICK_NOTE_MARK):
+            result['notes'] += 1
+            tags.update(extract_tags(body))
+            timer = TIMER_RE.search(body)
+            minutes = int(timer.group(2)) if timer else 0
+            result['focus_minutes'] += minutes
+            if day:
+                entry = day_entry(day)
+                entry['notes'] += 1
+                entry['focus'] += minutes
+
+    result['tags'] = dict(tags)
+    return result
+
+
+def analyze_file(path):
+    """解析单个文件（进程池入口），返回 (路径, 统计)，文件缺失时统计为 None"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return path, analyze_text(f.read())
+    except OSError:
+        return path, None
+
+
+def peak_window(hour_weekday, width=2):
+    """找出记录最密集的连续时段，返回 (开始小时, 结束小时, 次数) 或 None"""
+    hours = [sum(day[h] for day in hour_weekday) for h in range(24)]
+    if not any(hours):
+        return None
+    best_start, best_count = 0, -1
+    for start in range(0, 24 - width + 1):
+        count = sum(hours[start:start + width])
+        if count > best_count:
+            best_start, best_count = start, count
+    return best_start, best_start + width, best_count
+
+
+def combine(stats_list):
+    """合并多周统计"""
+    total = {
+        'done': 0,
+        'pending': 0,
+        'notes': 0,
+        'focus_minutes': 0,
+        'days': {},
+        'tags': Counter(),
+        'hour_weekday': [[0] * 24 for _ in range(7)],
+    }
+    for stats in stats_list:
+        for key in ('done', 'pending', 'notes', 'focus_minutes'):
+            total[key] += stats[key]
+        total['tags'].update(stats['tags'])
+        for date, entry in stats['days'].items():
+            merged = total['days'].setdefault(date, {'created': 0, 'completed': 0, 'notes': 0, 'focus': 0})
+            for key in merged:
+                merged[key] += entry.get(key, 0)
+        for wd in range(7):
+            row = total['hour_weekday'][wd]
+            for h, count in enumerate(stats['hour_weekday'][wd]):
+                row[h] += count
+    return total
+
+
+def summarize(stats):
+    """从合并后的统计中提取报告所需数字"""
+    days = stats['days']
+    total_tasks = stats['done'] + stats['pending']
+    completed_days = {d: e['completed'] for d, e in days.items() if e['completed'] > 0}
+
+    best_day = None
+    if completed_days:
+        date = max(completed_days, key=lambda d: (completed_days[d], d))
+        weekday = WEEKDAY_NAMES[datetime.datetime.strptime(date, "%Y-%m-%d").weekday()]
+        best_day = (date, weekday, completed_days[date])
+
+    return {
+        'completion_rate': (stats['done'] / total_tasks * 100) if total_tasks else 0,
+        'peak': peak_window(stats['hour_weekday']),
+        'best_day': best_day,
+        'avg_completed': (sum(completed_days.values()) / len(days)) if days else 0,
+        'top_tags': [tag for tag, _ in Counter(stats['tags']).most_common(3)],
+        'focus_minutes': stats['focus_minutes'],
+        'active_days': len(days),
+    }
+
+
+class AnalyticsEngine:
+    """多周分析引擎
+
+    归档周的解析结果按内容哈希缓存（哈希来自归档清单，命中时不读文件），
+    未命中的周在进程池中并行解析。
+    """
+
+    def __init__(self, catalog, cache_name=CACHE_NAME):
+        self.catalog = catalog
+        self.cache_path = os.path.join(catalog.archive_dir, cache_name)
+        self.cache = {}
+        self._current = None
+        self.load_cache()
+
+    def load_cache(self):
+        """加载缓存"""
+        try:
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == ANALYZER_VERSION:
+                    self.cache = data.get('weeks', {})
+        except (OSError, ValueError) as e:
+            print(f"读取分析缓存错误: {e}")
+            self.cache = {}
+
+    def save_cache(self):
+        """保存缓存（只保留清单中仍存在的周）"""
+        live = {entry['sha1'] for entry in self.catalog.list_weeks() if entry.get('sha1')}
+        data = {
+            'version': ANALYZER_VERSION,
+            'weeks': {k: v for k, v in self.cache.items() if k in live},
+        }
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    def archived_stats(self, first_week=None, last_week=None):
+        """返回指定周范围内每个归档周的统计 {周数: 统计}"""
+        entries = [
+            e for e in self.catalog.list_weeks()
+            if e.get('sha1')
+            and (first_week is None or e['week'] >= first_week)
+            and (last_week is None or e['week'] <= last_week)
+        ]
+        missing = [e for e in entries if e['sha1'] not in self.cache]
+        if missing:
+            paths = {self.catalog.path_for(e): e for e in missing}
+            if len(missing) >= POOL_THRESHOLD:
+                with ProcessPoolExecutor() as pool:
+                    results = list(pool.map(analyze_file, paths, chunksize=4))
+            else:
+                results = [analyze_file(p) for p in paths]
+            for path, stats in results:
+                if stats is not None:
+                    self.cache[paths[path]['sha1']] = stats
+            self.save_cache()
+        return {e['week']: self.cache[e['sha1']] for e in entries if e['sha1'] in self.cache}
+
+    def current_stats(self, current_file):
+        """当前周的统计（同样按内容哈希缓存在内存中）"""
+        if not os.path.exists(current_file):
+            return analyze_text("")
+        with open(current_file, 'rb') as f:
+            data = f.read()
+        key = hashlib.sha1(data).hexdigest()
+        if self._current and self._current[0] == key:
+            return self._current[1]
+        stats = analyze_text(data.decode('utf-8', errors='replace'))
+        self._current = (key, stats)
+        return stats
+
+    def report_numbers(self, current_file=None, week_range=None):
+        """合并当前周和指定范围 (起始周, 结束周) 的归档周，返回报告数字"""
+        stats_list = []
+        if week_range:
+            stats_list.extend(self.archived_stats(*week_range).values())
+        if current_file:
+            stats_list.append(self.current_stats(current_file))
+        return summarize(combine(stats_list))
+
+
+HOURLY_NAME = ".hourly.json"
+
+
+class HourlyHistogram:
+    """星期 × 小时 的记录次数直方图
+
+    归档周的计数按周保存并记录内容哈希，归档被改动（哈希变化）时替换该周的计数，
+    不会重复累加；当前周在启动时统计一次，之后随追加的条目递增，不再重新扫描历史文件。
+    追加条目只标记为待保存，由 flush() 统一写盘。
+    """
+
+    def __init__(self, archive_dir, hourly_name=HOURLY_NAME):
+        self.path = os.path.join(archive_dir, hourly_name)
+        self.weeks = {}
+        self.archived = [[0] * 24 for _ in range(7)]
+        self.current = [[0] * 24 for _ in range(7)]
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """加载直方图（旧格式没有按周的计数，下次 build 时重建）"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.weeks = data.get('weeks', {})
+                self.current = data.get('current', self.current)
+        except (OSError, ValueError) as e:
+            print(f"读取时段统计错误: {e}")
+        self._sum_archived()
+
+    def save(self):
+        """保存直方图"""
+        data = {
+            'weeks': self.weeks,
+            'current': self.current,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def flush(self):
+        """有未保存的变化时写盘（退出时调用）"""
+        if self.dirty:
+            self.save()
+
+    def _sum_archived(self):
+        self.archived = [[0] * 24 for _ in range(7)]
+        for week in self.weeks.values():
+            for wd in range(7):
+                row = self.archived[wd]
+                for h, count in enumerate(week['hour_weekday'][wd]):
+                    row[h] += count
+
+    def build(self, analytics, current_file):
+        """同步归档周（新增或哈希变化的周替换计数，已删除的周去掉），并重新统计当前周"""
+        live = {}
+        for week, stats in analytics.archived_stats().items():
+            sha1 = analytics.catalog.get_week(week)['sha1']
+            live[str(week)] = {'sha1': sha1, 'hour_weekday': stats['hour_weekday']}
+        changed = {k for k, v in live.items() if self.weeks.get(k, {}).get('sha1') != v['sha1']}
+        if changed or set(self.weeks) != set(live):
+            self.weeks = live
+            self._sum_archived()
+            self.dirty = True
+        current = [row[:] for row in analytics.current_stats(current_file)['hour_weekday']]
+        if current != self.current:
+            self.current = current
+            self.dirty = True
+        self.flush()
+
+    def add(self, stamp):
+        """记录一条新追加的带时间条目"""
+        self.current[stamp.weekday()][stamp.hour] += 1
+        self.dirty = True
+
+    def counts(self, current_only=False):
+        """返回 7×24 计数"""
+        if current_only:
+            return self.current
+        return [[a + c for a, c in zip(arch, cur)] for arch, cur in zip(self.archived, self.current)]
+
+    def peak(self, width=2, current_only=False):
+        """最高效时段 (开始小时, 结束小时, 次数) 或 None"""
+        return peak_window(self.counts(current_only), width)
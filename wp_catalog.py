@@ -0,0 +1,157 @@
+"""归档目录清单 - 按周数和日期直接查找归档文件，无需扫描目录"""
+import os
+import re
+import json
+import hashlib
+import datetime
+
+from wp_model import summarize_text, parse_date
+
+MANIFEST_NAME = "catalog.json"
+
+# 两种归档命名: week_{n}_progress_{date}.txt (wp_gui.py) 和 week_{n}_{date}.txt (wp_gui_final.py)
+ARCHIVE_NAME_RE = re.compile(r'^week_(\d+)_(?:progress_)?(\d{4}-\d{2}-\d{2})\.txt$')
+
+
+class ArchiveCatalog:
+    """归档清单
+
+    每次归档时更新 catalog.json，记录周数、日期范围、文件名、大小、哈希和概要统计。
+    查找某周、某天或列出所有周都只读清单，不打开归档文件。
+    """
+
+    def __init__(self, archive_dir, manifest_name=MANIFEST_NAME):
+        self.archive_dir = archive_dir
+        self.manifest_path = os.path.join(archive_dir, manifest_name)
+        self.version = 0
+        self.weeks = {}
+        self.by_date = {}
+        self.load()
+
+    def load(self):
+        """加载清单，不存在时从现有归档重建一次"""
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.version = data.get('version', 0)
+                self.weeks = {int(k): v for k, v in data.get('weeks', {}).items()}
+                self._rebuild_date_index()
+                return
+            except (OSError, ValueError) as e:
+                print(f"读取归档清单错误: {e}")
+        self.rebuild()
+
+    def save(self):
+        """原子写入清单"""
+        if not os.path.exists(self.archive_dir):
+            os.makedirs(self.archive_dir)
+        data = {
+            'version': self.version,
+            'weeks': {str(k): v for k, v in sorted(self.weeks.items())},
+        }
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def rebuild(self):
+        """扫描归档目录重建清单（仅在清单缺失时使用）"""
+        self.weeks = {}
+        if os.path.isdir(self.archive_dir):
+            for name in sorted(os.listdir(self.archive_dir)):
+                match = ARCHIVE_NAME_RE.match(name)
+                if match:
+                    self._put(int(match.group(1)), os.path.join(self.archive_dir, name))
+        self.version += 1
+        self._rebuild_date_index()
+        self.save()
+
+    def record(self, week_num, path):
+        """归档后登记一周，返回清单条目"""
+        entry = self._put(week_num, path)
+        self.version += 1
+        self._rebuild_date_index()
+        self.save()
+        return entry
+
+    def record_gaps(self, gaps):
+        """登记没有归档文件的空白周 [(周数, 开始日期, 结束日期)]，已有条目的周跳过"""
+        added = 0
+        for week_num, start, end in gaps:
+            if week_num in self.weeks:
+                continue
+            self.weeks[week_num] = {
+                'week': week_num,
+                'file': None,
+                'start': str(start),
+                'end': str(end),
+                'size': 0,
+                'sha1': None,
+                'stats': {'done': 0, 'pending': 0, 'notes': 0, 'timers': 0, 'days': 0, 'words': 0},
+                'gap': True,
+            }
+            added += 1
+        if added:
+            self.version += 1
+            self._rebuild_date_index()
+            self.save()
+        return added
+
+    def _put(self, week_num, path):
+        """读取一次归档文件，生成条目"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        stats = summarize_text(data.decode('utf-8', errors='replace'))
+
+        # 日期范围优先取文件内的日期，其次取文件名里的日期
+        name = os.path.basename(path)
+        match = ARCHIVE_NAME_RE.match(name)
+        name_date = match.group(2) if match else str(datetime.date.today())
+        end = stats.pop('last_date') or name_date
+        start = stats.pop('first_date') or end
+        end_date = parse_date(end) or datetime.date.today()
+        monday = end_date - datetime.timedelta(days=end_date.weekday())
+        start = min(start, str(monday))
+
+        entry = {
+            'week': week_num,
+            'file': name,
+            'start': start,
+            'end': end,
+            'size': len(data),
+            'sha1': hashlib.sha1(data).hexdigest(),
+            'stats': stats,
+        }
+        self.weeks[week_num] = entry
+        return entry
+
+    def _rebuild_date_index(self):
+        """按日期建立到周数的映射"""
+        self.by_date = {}
+        for week_num in sorted(self.weeks):
+            entry = self.weeks[week_num]
+            start, end = parse_date(entry.get('start')), parse_date(entry.get('end'))
+            if not start or not end:
+                continue
+            day = start
+            while day <= end:
+                self.by_date[str(day)] = week_num
+                day += datetime.timedelta(days=1)
+
+    def get_week(self, week_num):
+        """按周数查找条目"""
+        return self.weeks.get(int(week_num))
+
+    def find_by_date(self, date):
+        """按日期查找所在周的条目"""
+        week_num = self.by_date.get(str(date))
+        return self.weeks.get(week_num) if week_num is not None else None
+
+    def list_weeks(self, include_gaps=False):
+        """按周数顺序列出所有条目（默认只列有归档文件的周）"""
+        return [self.weeks[k] for k in sorted(self.weeks) if include_gaps or self.weeks[k].get('file')]
+
+    def path_for(self, entry):
+        """条目对应的归档文件路径"""
+        return os.path.join(self.archive_dir, entry['file'])
@@ -0,0 +1,239 @@
+"""日期标题索引与周/日模板 - 判断某天的记录段是否存在，按模板追加"""
+import os
+import json
+import time
+import string
+
+from wp_model import parse_day_header
+
+DAY_INDEX_NAME = ".day_index.json"
+LOCK_NAME = ".day_entry.lock"
+# 锁文件超过该秒数视为上次异常退出遗留
+LOCK_STALE_SECONDS = 30
+WEEKDAY_CN = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
+
+
+class Template:
+    """预编译的文本模板
+
+    配置中的模板可以是字符串或行列表，占位符用 {date} {weekday} {weekday_cn}
+    {week_num} {week_start} {week_end}；未知占位符和花括号不成对的行按原文输出。
+    """
+
+    def __init__(self, source):
+        if isinstance(source, (list, tuple)):
+            source = "\n".join(source) + "\n"
+        self.source = source
+        self.pieces = []
+        for line in source.splitlines(keepends=True):
+            try:
+                pieces = []
+                for literal, field, spec, conversion in string.Formatter().parse(line):
+                    if literal:
+                        pieces.append((literal, None))
+                    if field is not None:
+                        pieces.append((field, spec or ""))
+            except ValueError:
+                # 这一行的花括号不成对，按原文输出
+                pieces = [(line, None)]
+            self.pieces.extend(pieces)
+
+    def render(self, **values):
+        parts = []
+        for text, spec in self.pieces:
+            if spec is None:
+                parts.append(text)
+            elif text in values:
+                parts.append(format(values[text], spec))
+            else:
+                parts.append("{" + text + (":" + spec if spec else "") + "}")
+        return "".join(parts)
+
+    def static_lines(self):
+        """不含占位符的行（未填写时原样保留的模板项）"""
+        lines = set()
+        for line in self.source.splitlines():
+            if "{" not in line and line.strip():
+                lines.add(line.strip())
+        return lines
+
+
+def template_values(date, week_num=None, week_range=None):
+    """模板占位符的取值"""
+    values = {
+        'date': str(date),
+        'weekday': date.strftime("%A"),
+        'weekday_cn': WEEKDAY_CN[date.weekday()],
+    }
+    if week_num is not None:
+        values['week_num'] = week_num
+    if week_range is not None:
+        values['week_start'], values['week_end'] = (str(d) for d in week_range)
+    return values
+
+
+def render_day(template, date, week_num=None, week_range=None):
+    """按日模板生成某天的记录段；模板里没有日期标题时补一行，保证能被索引识别"""
+    values = template_values(date, week_num, week_range)
+    text = template.render(**values)
+    if not any(parse_day_header(line) for line in text.splitlines()):
+        text = f"\n{values['date']} ({values['weekday_cn']})\n" + text
+    return text
+
+
+class DayIndex:
+    """当前周文件的日期标题索引
+
+    记录每个日期标题所在的行号，判断某天是否已有记录段只需查字典；
+    与文件的 (mtime, 大小) 一起保存，文件没被改过时启动不用重新扫描。
+    程序自己写文件之后调用 update()（整篇写入）或 appended()（末尾追加），索引随之
+    记下新的 (mtime, 大小)，之后判断仍不必重新扫描；只有在程序之外被改动时才重新扫描。
+    只认日期标题行，正文中提到日期不算。
+    """
+
+    def __init__(self, archive_dir, current_file, index_name=DAY_INDEX_NAME):
+        self.path = os.path.join(archive_dir, index_name)
+        self.lock_path = os.path.join(archive_dir, LOCK_NAME)
+        self.current_file = current_file
+        self.days = {}
+        self.newlines = 0
+        self.key = None
+        self.load()
+
+    def _file_key(self):
+        try:
+            st = os.stat(self.current_file)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('file') == os.path.basename(self.current_file):
+                    self.days, self.newlines, self.key = data['days'], data['newlines'], data['key']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"读取日期索引错误: {e}")
+        self.validate()
+
+    def save(self):
+        data = {
+            'file': os.path.basename(self.current_file),
+            'key': self.key,
+            'newlines': self.newlines,
+            'days': self.days,
+        }
+        # 多个实例可能同时保存，临时文件按进程区分
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def validate(self):
+        """文件在索引之外被修改过时重新扫描"""
+        key = self._file_key()
+        if key == self.key:
+            return
+        if key is None:
+            self.days, self.newlines = {}, 0
+        else:
+            with open(self.current_file, 'r', encoding='utf-8', errors='replace') as f:
+                self.update(f.read(), save=False)
+        self.key = key
+        self.save()
+
+    def update(self, content, save=True):
+        """按新内容重建（保存文件之后调用）"""
+        days = {}
+        for lineno, line in enumerate(content.splitlines(), 1):
+            day = parse_day_header(line)
+            if day:
+                days.setdefault(str(day), lineno)
+        self.days = days
+        self.newlines = content.count('\n')
+        if save:
+            self.key = self._file_key()
+            self.save()
+
+    def has_day(self, date):
+        return str(date) in self.days
+
+    def line_of(self, date):
+        """某天日期标题的行号，没有时返回 None"""
+        return self.days.get(str(date))
+
+    def _acquire(self):
+        """跨进程互斥（同时启动两个实例时只有一个追加）"""
+        deadline = time.monotonic() + LOCK_STALE_SECONDS
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                return
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) > LOCK_STALE_SECONDS:
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(self.lock_path)
+                time.sleep(0.05)
+
+    def _release(self):
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
+
+    def ensure_day(self, date, text):
+        """某天还没有日期标题时追加 text，返回是否追加
+
+        加锁后按文件当前状态重新确认，多个实例同时执行也只追加一次。
+        """
+        if self.has_day(date) and self._file_key() == self.key:
+            return False
+        self._acquire()
+        try:
+            self.validate()
+            if self.has_day(date):
+                return False
+            with open(self.current_file, 'a', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            self.appended(text)
+            return True
+        finally:
+            self._release()
+
+    def appended(self, text):
+        """文件末尾追加了 text 之后调用，只处理追加的部分
+
+        文件大小与索引记录的加上追加部分对不上（在索引之外被改过）时整篇重新扫描。
+        """
+        key = self._file_key()
+        if key is None or self.key is None or key[1] != self.key[1] + len(text.encode('utf-8')):
+            self.validate()
+            return
+        # 追加部分的第 k 行就是文件的第 (原换行数 + 1 + k) 行
+        for offset, line in enumerate(text.split('\n')):
+            day = parse_day_header(line)
+            if day:
+                self.days.setdefault(str(day), self.newlines + 1 + offset)
+        self.newlines += text.count('\n')
+        self.key = key
+        self.save()
+
+
+def create_week_file(path, text):
+    """新建周文件，已存在时不覆盖（另一个实例已创建），返回是否创建"""
+    try:
+        with open(path, 'x', encoding='utf-8') as f:
+            f.write(text)
+        return True
+    except FileExistsError:
+        return False
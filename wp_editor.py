@@ -0,0 +1,517 @@
+"""编辑器增强 - 文本变更钩子、增量查找和语法高亮"""
+import datetime
+import tkinter as tk
+from tkinter import ttk
+from collections import deque
+
+from wp_model import SECTION_RE, TAG_RE, DUE_RE, parse_task, parse_day_header
+
+# 每帧最多处理的高亮数，避免大文件一次性打标签卡住界面
+MAX_TAGS_PER_FRAME = 400
+FRAME_MS = 16
+
+
+class TextChangeHook:
+    """拦截 Text 控件的 insert/delete，把变更的行范围通知给监听者
+
+    监听者签名: listener(start_line, removed_lines, added_lines)，
+    表示从 start_line 开始的 removed_lines+1 行被替换成 added_lines+1 行。
+    撤销/重做无法得知范围，以 start_line=None 通知整体变化。
+
+    守卫签名: guard(command, args)，在 insert/delete/replace 执行前调用，返回（可改写的）
+    参数，返回 None 时拒绝这次修改。
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.listeners = []
+        self.guards = []
+        self.suspended = 0
+        self.missed = False
+        self.orig = text._w + "_orig"
+        text.tk.call("rename", text._w, self.orig)
+        text.tk.createcommand(text._w, self._dispatch)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def add_guard(self, guard):
+        self.guards.append(guard)
+
+    def suspend(self):
+        """暂停通知（分片插入期间），恢复时合并成一次"""
+        self.suspended += 1
+
+    def resume(self, change=None):
+        """恢复通知；change 为暂停期间的合并变更，不知道范围时按整体变化通知"""
+        self.suspended -= 1
+        if self.suspended or not (self.missed or change):
+            return
+        self.missed = False
+        self._notify(change or (None, 0, 0))
+
+    def _notify(self, change):
+        for listener in self.listeners:
+            try:
+                listener(*change)
+            except Exception as e:
+                print(f"文本变更处理错误: {e}")
+
+    def _line(self, index):
+        """索引所在行号（"end" 之类超出末行的索引按末行算）"""
+        line = int(self.text.tk.call(self.orig, "index", index).split('.')[0])
+        last = int(self.text.tk.call(self.orig, "index", "end-1c").split('.')[0])
+        return min(line, last)
+
+    def _dispatch(self, command, *args):
+        if command in ("insert", "delete", "replace") and args:
+            for guard in self.guards:
+                args = guard(command, args)
+                if args is None:
+                    return ""
+        change = None
+        if command == "insert" and args:
+            start = self._line(args[0])
+            added = sum(chunk.count('\n') for chunk in args[1::2])
+            change = (start, 0, added)
+        elif command in ("delete", "replace") and args:
+            start = self._line(args[0])
+            end = self._line(args[1] if len(args) > 1 else f"{args[0]}+1c")
+            added = sum(chunk.count('\n') for chunk in args[2::2]) if command == "replace" else 0
+            change = (start, max(end - start, 0), added)
+        elif command == "edit" and args and args[0] in ("undo", "redo"):
+            change = (None, 0, 0)
+
+        result = self.text.tk.call((self.orig, command) + args)
+
+        if change:
+            if self.suspended:
+                self.missed = True
+            else:
+                self._notify(change)
+        return result
+
+
+class LineMatchIndex:
+    """按行保存的匹配位置，编辑时只重算变化的行"""
+
+    def __init__(self):
+        self.query = ""
+        self.lines = []  # 每行的 [(起始列, 结束列), ...]
+
+    def scan_line(self, text):
+        """查找一行中的所有匹配（忽略大小写）"""
+        if not self.query:
+            return []
+        haystack = text.lower()
+        needle = self.query.lower()
+        matches = []
+        pos = haystack.find(needle)
+        while pos != -1:
+            matches.append((pos, pos + len(needle)))
+            pos = haystack.find(needle, pos + len(needle))
+        return matches
+
+    def set_query(self, query, line_texts):
+        """切换查询；新查询是旧查询的延伸时只复查已匹配的行"""
+        refine = self.query and query.lower().startswith(self.query.lower()) and len(self.lines) == len(line_texts)
+        old_lines = self.lines
+        self.query = query
+        if refine:
+            self.lines = [self.scan_line(line_texts[i]) if old else [] for i, old in enumerate(old_lines)]
+        else:
+            self.lines = [self.scan_line(text) for text in line_texts]
+
+    def apply_change(self, start, removed, new_texts):
+        """用新行的匹配替换从 start 行开始的 removed+1 行"""
+        self.lines[start - 1:start + removed] = [self.scan_line(text) for text in new_texts]
+
+    def count(self):
+        return sum(len(m) for m in self.lines)
+
+    def find_from(self, line, col, backwards=False):
+        """从 (行, 列) 起查找下一个/上一个匹配，返回 (行, 起始列, 结束列) 或 None"""
+        total = len(self.lines)
+        if not total:
+            return None
+        for step in range(total + 1):
+            if backwards:
+                lineno = (line - 1 - step) % total + 1
+            else:
+                lineno = (line - 1 + step) % total + 1
+            matches = self.lines[lineno - 1]
+            if backwards:
+                matches = reversed(matches)
+            for start, end in matches:
+                if step == 0 and ((not backwards and start < col) or (backwards and start >= col)):
+                    continue
+                return lineno, start, end
+            if step == total:
+                break
+        return None
+
+
+class FindBar(ttk.Frame):
+    """增量查找栏
+
+    输入时更新匹配索引并用 Text 标签高亮；编辑正文时只重算变化的行，
+    高亮分帧进行，每帧最多 MAX_TAGS_PER_FRAME 个。
+    """
+
+    def __init__(self, parent, text, hook):
+        super().__init__(parent)
+        self.text = text
+        self.index = LineMatchIndex()
+        self.pending = deque()
+        self.pending_set = set()
+        self.job = None
+
+        self.query_var = tk.StringVar()
+        ttk.Label(self, text="🔍").pack(side=tk.LEFT)
+        self.entry = ttk.Entry(self, textvariable=self.query_var, width=24)
+        self.entry.pack(side=tk.LEFT, padx=2)
+        ttk.Button(self, text="↑", width=3, command=lambda: self.goto(backwards=True)).pack(side=tk.LEFT)
+        ttk.Button(self, text="↓", width=3, command=self.goto).pack(side=tk.LEFT)
+        self.count_label = ttk.Label(self, text="")
+        self.count_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(self, text="✕", width=3, command=self.hide).pack(side=tk.RIGHT)
+
+        text.tag_configure('search_match', background='#fff3a0')
+        text.tag_configure('search_current', background='#ff9f43')
+        text.tag_raise('search_current', 'search_match')
+
+        self.query_var.trace_add('write', lambda *args: self.on_query())
+        self.entry.bind('<Return>', lambda e: self.goto())
+        self.entry.bind('<Shift-Return>', lambda e: self.goto(backwards=True))
+        self.entry.bind('<Escape>', lambda e: self.hide())
+        hook.add_listener(self.on_text_change)
+
+    def show(self):
+        """显示查找栏"""
+        self.pack(fill=tk.X, pady=(0, 5), before=self.text.master)
+        self.entry.focus_set()
+        self.entry.select_range(0, tk.END)
+
+    def hide(self):
+        """隐藏查找栏并清除高亮"""
+        self.query_var.set("")
+        self.pack_forget()
+        self.text.focus_set()
+
+    def line_texts(self):
+        return self.text.get('1.0', 'end-1c').split('\n')
+
+    def on_query(self):
+        """查询变化"""
+        self.index.set_query(self.query_var.get(), self.line_texts())
+        self.text.tag_remove('search_match', '1.0', tk.END)
+        self.text.tag_remove('search_current', '1.0', tk.END)
+        self.pending.clear()
+        self.pending_set.clear()
+
+        # 先高亮可见区域，再处理其余行
+        first = int(self.text.index('@0,0').split('.')[0])
+        last = int(self.text.index(f'@0,{self.text.winfo_height()}').split('.')[0])
+        lines = [i for i in range(first, last + 1) if i <= len(self.index.lines) and self.index.lines[i - 1]]
+        lines += [i for i, m in enumerate(self.index.lines, 1) if m and not first <= i <= last]
+        self.queue_lines(lines)
+        self.update_count()
+
+    def on_text_change(self, start, removed, added):
+        """正文变化：只重算变化的行"""
+        if not self.index.query:
+            return
+        if start is None or len(self.index.lines) == 0:
+            self.on_query()
+            return
+        new_texts = self.text.get(f'{start}.0', f'{start + added}.end').split('\n')
+        self.index.apply_change(start, removed, new_texts)
+        # 尚未高亮的后续行随插入/删除的行数平移
+        delta = added - removed
+        if delta and self.pending:
+            self.pending = deque(line + delta if line > start + removed else line for line in self.pending)
+            self.pending_set = set(self.pending)
+        self.text.tag_remove('search_match', f'{start}.0', f'{start + added}.end')
+        self.queue_lines(range(start, start + added + 1))
+        self.update_count()
+
+    def queue_lines(self, lines):
+        for line in lines:
+            if line not in self.pending_set:
+                self.pending.append(line)
+                self.pending_set.add(line)
+        if self.pending and self.job is None:
+            self.job = self.after(0, self.flush)
+
+    def flush(self):
+        """分帧打高亮标签"""
+        self.job = None
+        budget = MAX_TAGS_PER_FRAME
+        while self.pending and budget > 0:
+            line = self.pending.popleft()
+            self.pending_set.discard(line)
+            if line > len(self.index.lines):
+                continue
+            for start, end in self.index.lines[line - 1]:
+                self.text.tag_add('search_match', f'{line}.{start}', f'{line}.{end}')
+                budget -= 1
+        if self.pending:
+            self.job = self.after(FRAME_MS, self.flush)
+
+    def update_count(self):
+        count = self.index.count()
+        self.count_label.config(text=f"{count} 处" if self.index.query else "")
+
+    def goto(self, backwards=False):
+        """跳到下一个/上一个匹配"""
+        line, col = map(int, self.text.index(tk.INSERT).split('.'))
+        if backwards:
+            found = self.index.find_from(line, col, backwards=True)
+        else:
+            found = self.index.find_from(line, col + (1 if self.text.tag_ranges('search_current') else 0))
+        if not found:
+            return
+        lineno, start, end = found
+        self.text.tag_remove('search_current', '1.0', tk.END)
+        self.text.tag_add('search_current', f'{lineno}.{start}', f'{lineno}.{end}')
+        self.text.mark_set(tk.INSERT, f'{lineno}.{start}')
+        self.text.see(f'{lineno}.{start}')
+
+
+# 超过该字符数的插入分片进行，每帧插入一片
+INSERT_CHUNK_CHARS = 64 * 1024
+INSERT_MARK = 'chunked_insert'
+
+
+def split_text_chunks(content, size=INSERT_CHUNK_CHARS):
+    """按大约 size 个字符切片，尽量在换行处断开"""
+    chunks = []
+    pos = 0
+    while pos < len(content):
+        end = pos + size
+        if end < len(content):
+            newline = content.find('\n', end)
+            if newline != -1 and newline - end < size:
+                end = newline + 1
+        chunks.append(content[pos:end])
+        pos = end
+    return chunks
+
+
+class ChunkedInserter:
+    """大段文本分片插入
+
+    每帧插入一片后让出事件循环，界面保持响应；插入期间正文只读，变更钩子暂停，
+    结束时把整段插入作为一次变更通知（高亮、查找只重算一次），整段也只占一步撤销。
+    取消时删除已插入的部分。
+    """
+
+    def __init__(self, text, hook=None, chunk_chars=INSERT_CHUNK_CHARS):
+        self.text = text
+        self.hook = hook
+        self.chunk_chars = chunk_chars
+        self.chunks = None
+        self.job = None
+
+    @property
+    def busy(self):
+        return self.chunks is not None
+
+    def insert(self, index, content, on_done=None, on_progress=None):
+        """在 index 处插入 content；完成或取消后调用 on_done(是否完成)
+
+        on_progress(已插入字符数, 总字符数) 在每片之后调用。
+        """
+        self.cancel()
+        if len(content) <= self.chunk_chars:
+            self.text.insert(index, content)
+            if on_done:
+                on_done(True)
+            return
+        self.chunks = deque(split_text_chunks(content, self.chunk_chars))
+        self.total = len(content)
+        self.inserted = 0
+        self.added_lines = 0
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.start = self.text.index(index)
+        self.state = str(self.text.cget('state'))
+        self.autoseparators = self.text.cget('autoseparators')
+        self.text.mark_set(INSERT_MARK, self.start)
+        self.text.mark_gravity(INSERT_MARK, tk.RIGHT)
+        self.text.config(autoseparators=False)
+        self.text.edit_separator()
+        if self.hook:
+            self.hook.suspend()
+        self._step()
+
+    def _step(self):
+        self.job = None
+        chunk = self.chunks.popleft()
+        self.text.config(state=tk.NORMAL)
+        self.text.insert(INSERT_MARK, chunk)
+        self.text.config(state=tk.DISABLED)
+        self.inserted += len(chunk)
+        self.added_lines += chunk.count('\n')
+        if self.on_progress:
+            self.on_progress(self.inserted, self.total)
+        if self.chunks:
+            self.job = self.text.after(FRAME_MS, self._step)
+        else:
+            self._finish(True)
+
+    def cancel(self):
+        """取消进行中的插入，删除已插入的部分"""
+        if not self.busy:
+            return
+        if self.job:
+            self.text.after_cancel(self.job)
+            self.job = None
+        self.text.config(state=tk.NORMAL)
+        self.text.delete(self.start, INSERT_MARK)
+        self.added_lines = 0
+        self._finish(False)
+
+    def _finish(self, completed):
+        self.chunks = None
+        self.text.config(state=self.state, autoseparators=self.autoseparators)
+        self.text.edit_separator()
+        self.text.mark_unset(INSERT_MARK)
+        if self.hook:
+            self.hook.resume((int(self.start.split('.')[0]), 0, self.added_lines))
+        if self.on_done:
+            self.on_done(completed)
+
+
+# 每个空闲片段最多重新着色的屏幕外行数
+HIGHLIGHT_SLICE_LINES = 200
+
+# 按优先级从高到低排列
+HIGHLIGHT_STYLES = {
+    'hl_due_overdue': {'foreground': '#ffffff', 'background': '#dc3545'},
+    'hl_due_soon': {'foreground': '#000000', 'background': '#ffc107'},
+    'hl_due_later': {'foreground': '#198754'},
+    'hl_important': {'foreground': '#dc3545'},
+    'hl_tag': {'foreground': '#6f42c1'},
+    'hl_done': {'foreground': '#8c959f'},
+    'hl_pending': {'foreground': '#212529'},
+    'hl_section': {'foreground': '#0d6efd'},
+}
+
+
+class SyntaxHighlighter:
+    """周记语法高亮
+
+    只重新着色变化的行：可见区域内的立即处理，屏幕外的在空闲时分片处理，
+    每片最多 HIGHLIGHT_SLICE_LINES 行。
+    """
+
+    def __init__(self, text, hook):
+        self.text = text
+        self.dirty = set()
+        self.idle_job = None
+        self.slice_job = None
+
+        for tag, style in HIGHLIGHT_STYLES.items():
+            text.tag_configure(tag, **style)
+            # 依次压到最底层：查找高亮等其他标签优先，高亮之间保持上面的顺序
+            text.tag_lower(tag)
+        hook.add_listener(self.on_text_change)
+        text.bind('<Configure>', lambda e: self.schedule(), add='+')
+
+    def on_text_change(self, start, removed, added):
+        """记录变化的行"""
+        if start is None:
+            last = int(self.text.index('end-1c').split('.')[0])
+            self.dirty = set(range(1, last + 1))
+        else:
+            delta = added - removed
+            if delta and self.dirty:
+                self.dirty = {line + delta if line > start + removed else line for line in self.dirty}
+            self.dirty.update(range(start, start + added + 1))
+        self.schedule()
+
+    def schedule(self):
+        if self.idle_job is None:
+            self.idle_job = self.text.after_idle(self.refresh_visible)
+
+    def visible_range(self):
+        first = int(self.text.index('@0,0').split('.')[0])
+        last = int(self.text.index(f'@0,{self.text.winfo_height()}').split('.')[0])
+        return first, last
+
+    def refresh_visible(self):
+        """立即着色可见区域内的脏行，其余交给空闲分片"""
+        self.idle_job = None
+        self.highlight_visible()
+        if self.dirty and self.slice_job is None:
+            self.slice_job = self.text.after(1, self.refresh_slice)
+
+    def highlight_visible(self):
+        first, last = self.visible_range()
+        for line in range(first, last + 1):
+            if line in self.dirty:
+                self.dirty.discard(line)
+                self.highlight_line(line)
+
+    def refresh_slice(self):
+        """空闲时处理一片屏幕外的脏行（滚动到的新区域优先）"""
+        self.slice_job = None
+        self.highlight_visible()
+        last_line = int(self.text.index('end-1c').split('.')[0])
+        for _ in range(min(HIGHLIGHT_SLICE_LINES, len(self.dirty))):
+            line = self.dirty.pop()
+            if line <= last_line:
+                self.highlight_line(line)
+        if self.dirty:
+            self.slice_job = self.text.after(1, self.refresh_slice)
+
+    def highlight_line(self, line):
+        """重新着色一行"""
+        start, end = f'{line}.0', f'{line}.end'
+        for tag in HIGHLIGHT_STYLES:
+            self.text.tag_remove(tag, start, end)
+        content = self.text.get(start, end)
+        for tag, col_start, col_end in line_highlights(content):
+            stop = end if col_end >= len(content) else f'{line}.{col_end}'
+            self.text.tag_add(tag, f'{line}.{col_start}', stop)
+
+
+def line_highlights(content, today=None):
+    """计算一行的高亮区间 [(标签, 起始列, 结束列), ...]"""
+    spans = []
+    stripped = content.lstrip()
+    offset = len(content) - len(stripped)
+
+    if SECTION_RE.match(stripped) or parse_day_header(content):
+        spans.append(('hl_section', offset, len(content)))
+
+    task = parse_task(content)
+    if task:
+        spans.append(('hl_done' if task[0] else 'hl_pending', offset, len(content)))
+
+    for match in TAG_RE.finditer(content):
+        spans.append(('hl_tag', match.start(), match.end()))
+
+    pos = content.find('!!')
+    while pos != -1:
+        spans.append(('hl_important', pos, pos + 2))
+        pos = content.find('!!', pos + 2)
+
+    today = today or datetime.date.today()
+    for match in DUE_RE.finditer(content):
+        try:
+            due = datetime.date(today.year, int(match.group(1)), int(match.group(2)))
+        except ValueError:
+            continue
+        days_left = (due - today).days
+        if task and task[0]:
+            tag = 'hl_done'
+        elif days_left < 0:
+            tag = 'hl_due_overdue'
+        elif days_left <= 2:
+            tag = 'hl_due_soon'
+        else:
+            tag = 'hl_due_later'
+        spans.append((tag, match.start(), match.end()))
+    return spans
@@ -0,0 +1,173 @@
+"""周记变化事件总线 - 面板、托盘、提醒按细粒度的变化增量更新，不再各自重读文件"""
+import hashlib
+
+from wp_model import parse_day_header
+from wp_analytics import analyze_text
+
+# 任务变化（payload: task）
+TASK_ADDED = 'task_added'
+TASK_REMOVED = 'task_removed'
+TASK_TOGGLED = 'task_toggled'
+TASK_EDITED = 'task_edited'
+TASK_EVENTS = (TASK_ADDED, TASK_REMOVED, TASK_TOGGLED, TASK_EDITED)
+# 某天的记录段被编辑（payload: day, lineno；整段被删除时 lineno 为 None）
+SECTION_EDITED = 'section_edited'
+# 跨过零点（payload: date, added 是否追加了今日条目）
+DAY_ROLLED = 'day_rolled'
+# 标签索引事件 -> 总线主题
+TAG_INDEX_TOPICS = {
+    'add': TASK_ADDED,
+    'remove': TASK_REMOVED,
+    'toggle': TASK_TOGGLED,
+    'update': TASK_EDITED,
+}
+# 第一个日期标题之前的内容（周标题等）
+PREAMBLE = ""
+
+
+class EventBus:
+    """周记变化事件总线
+
+    订阅者 callback(topic, payload) 只收到变化本身（哪个任务、哪一天），按增量更新自己的状态；
+    subscribe_idle 把同一轮的事件合并，空闲时一次交给回调，适合刷新界面。
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+
+    def subscribe(self, topics, callback):
+        if isinstance(topics, str):
+            topics = (topics,)
+        for topic in topics:
+            self.subscribers.setdefault(topic, []).append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        for callbacks in self.subscribers.values():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def has_subscribers(self, topic):
+        return bool(self.subscribers.get(topic))
+
+    def publish(self, topic, **payload):
+        for callback in list(self.subscribers.get(topic, ())):
+            try:
+                callback(topic, payload)
+            except Exception as e:
+                print(f"事件回调错误: {e}")
+
+    def subscribe_idle(self, topics, widget, callback):
+        """订阅并合并：一轮事件之后（after_idle）调用一次 callback(events)
+
+        一次保存改动了很多任务时界面也只刷新一次。
+        """
+        events = []
+
+        def flush():
+            batch = events[:]
+            events.clear()
+            try:
+                callback(batch)
+            except Exception as e:
+                print(f"事件回调错误: {e}")
+
+        def collect(topic, payload):
+            if not events:
+                widget.after_idle(flush)
+            events.append((topic, payload))
+
+        return self.subscribe(topics, collect)
+
+    def bridge(self, tag_index, source):
+        """把标签索引中某个来源的任务变化转发到总线，返回监听函数（停止转发时 remove_listener）"""
+        def forward(event, task):
+            if task['source'] == source:
+                self.publish(TAG_INDEX_TOPICS[event], task=task)
+        tag_index.add_listener(forward)
+        return forward
+
+
+class TaskCounter:
+    """当前周已完成/待办数量，按任务事件加减，不读文件"""
+
+    def __init__(self, tasks=()):
+        self.done = 0
+        self.pending = 0
+        for task in tasks:
+            self._count(task, 1)
+
+    def _count(self, task, delta):
+        if task['done']:
+            self.done += delta
+        else:
+            self.pending += delta
+
+    def on_event(self, topic, payload):
+        task = payload['task']
+        if topic == TASK_ADDED:
+            self._count(task, 1)
+        elif topic == TASK_REMOVED:
+            self._count(task, -1)
+        elif topic == TASK_TOGGLED:
+            # 事件里是切换后的状态
+            delta = 1 if task['done'] else -1
+            self.done += delta
+            self.pending -= delta
+
+
+class SectionTracker:
+    """按日期标题分段记录内容摘要，保存时找出被编辑的日记录段
+
+    同时记下每段的按天统计（analyze_text 的 days），只有摘要变化的段重新解析，
+    本周总览的每日数据直接取 day_stats()，不再重读文件。
+    """
+
+    def __init__(self):
+        self.digests = None
+        self.stats = {}
+
+    def _sections(self, content):
+        """{日期: (行号, 摘要, 行)}，同一天出现多次时合并到第一次出现的位置"""
+        sections = {PREAMBLE: (1, hashlib.blake2b(digest_size=16), [])}
+        hasher, lines = sections[PREAMBLE][1:]
+        for lineno, line in enumerate(content.splitlines(), 1):
+            day = parse_day_header(line)
+            if day:
+                key = str(day)
+                if key not in sections:
+                    sections[key] = (lineno, hashlib.blake2b(digest_size=16), [])
+                hasher, lines = sections[key][1:]
+            hasher.update(line.encode('utf-8'))
+            hasher.update(b'\n')
+            lines.append(line)
+        return {key: (lineno, h.hexdigest(), lines) for key, (lineno, h, lines) in sections.items()}
+
+    def update(self, content):
+        """按新内容更新，返回变化的段 [(日期, 行号)]；第一次调用只记录，不算变化"""
+        sections = self._sections(content)
+        old = self.digests
+        self.digests = {key: (lineno, digest) for key, (lineno, digest, _) in sections.items()}
+        for key, (lineno, digest, lines) in sections.items():
+            if old is None or old.get(key, (None, None))[1] != digest:
+                self.stats[key] = analyze_text("\n".join(lines))['days']
+        for key in [key for key in self.stats if key not in sections]:
+            del self.stats[key]
+        if old is None:
+            return []
+        changed = [
+            (day, lineno) for day, (lineno, digest) in self.digests.items()
+            if day != PREAMBLE and old.get(day, (None, None))[1] != digest
+        ]
+        changed += [(day, None) for day in old if day != PREAMBLE and day not in sections]
+        return changed
+
+    def day_stats(self):
+        """各段按天统计合并后的 {日期: {created, completed, notes, focus}}"""
+        days = {}
+        for section in self.stats.values():
+            for date, entry in section.items():
+                total = days.setdefault(date, dict.fromkeys(entry, 0))
+                for key, value in entry.items():
+                    total[key] = total.get(key, 0) + value
+        return days
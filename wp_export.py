@@ -0,0 +1,375 @@
+"""多格式导出 - 逐行解析周记并同时写出 Markdown/HTML/CSV/JSON/iCalendar，批量导出归档周"""
+import os
+import csv
+import html
+import json
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from wp_model import (
+    parse_date, parse_day_header, parse_timestamp, parse_task, extract_tags, task_digest, SECTION_RE,
+)
+from wp_priority import task_due
+
+MANIFEST_NAME = ".export_manifest.json"
+# 导出格式变化时递增，旧的导出全部重做
+EXPORT_VERSION = 1
+# 需要导出的周数达到该值才启用进程池
+POOL_THRESHOLD = 4
+# 格式 -> 扩展名
+EXTENSIONS = {
+    'md': 'md',
+    'html': 'html',
+    'csv': 'csv',
+    'json': 'json',
+    'ics': 'ics',
+}
+FORMAT_LABELS = {
+    'md': "Markdown",
+    'html': "HTML",
+    'csv': "CSV 任务表",
+    'json': "JSON",
+    'ics': "iCalendar 截止日期",
+}
+
+
+def iter_items(lines, source, default_date):
+    """逐行解析为导出条目，不需要整份文本
+
+    条目类型: day（日期标题）、section（【栏目】）、task（任务，含所在日期和截止日期）、text（其他行）。
+    任务 ID 与 iter_tasks 相同（来源 + 正文哈希 + 同名序号）。
+    """
+    seen = {}
+    day = None
+    for lineno, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        header = parse_day_header(line)
+        if header:
+            day = header
+            yield {'type': 'day', 'date': str(header), 'text': line.strip()}
+            continue
+        section = SECTION_RE.match(line.strip())
+        if section:
+            yield {'type': 'section', 'name': section.group(1), 'text': line.strip()}
+            continue
+        task = parse_task(line)
+        if not task:
+            yield {'type': 'text', 'text': line}
+            continue
+        done, text = task
+        digest = task_digest(text)
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        stamp, _ = parse_timestamp(line.strip())
+        created = stamp.date() if stamp else (day or default_date)
+        due = task_due({'text': text}, created)
+        yield {
+            'type': 'task',
+            'id': f"{source}:{digest}:{occurrence}",
+            'done': done,
+            'text': text,
+            'tags': extract_tags(text),
+            'day': str(day) if day else None,
+            'due': str(due) if due else None,
+            'lineno': lineno,
+        }
+
+
+class Writer:
+    """一种格式的输出：begin() 写文件头，item() 每个条目写一次，end() 写文件尾"""
+
+    def __init__(self, f, meta):
+        self.f = f
+        self.meta = meta
+
+    def begin(self):
+        pass
+
+    def item(self, item):
+        pass
+
+    def end(self):
+        pass
+
+
+class MarkdownWriter(Writer):
+    def begin(self):
+        self.f.write(f"# {self.meta['title']}\n\n")
+
+    def item(self, item):
+        kind = item['type']
+        if kind == 'day':
+            self.f.write(f"\n## {item['text'].lstrip('📆').strip()}\n\n")
+        elif kind == 'section':
+            self.f.write(f"\n### {item['name']}\n\n")
+        elif kind == 'task':
+            self.f.write(f"- [{'x' if item['done'] else ' '}] {item['text']}\n")
+        else:
+            self.f.write(item['text'] + "\n")
+
+
+class HtmlWriter(Writer):
+    def begin(self):
+        self.in_list = False
+        title = html.escape(self.meta['title'])
+        self.f.write(
+            "<!DOCTYPE html>\n<html lang=\"zh\">\n<head>\n<meta charset=\"utf-8\">\n"
+            f"<title>{title}</title>\n"
+            "<style>body{font-family:'Microsoft YaHei',sans-serif;max-width:800px;margin:auto}"
+            ".done{color:#2e7d32}.pending{color:#e65100}ul{list-style:none}</style>\n"
+            f"</head>\n<body>\n<h1>{title}</h1>\n"
+        )
+
+    def _close_list(self):
+        if self.in_list:
+            self.f.write("</ul>\n")
+            self.in_list = False
+
+    def item(self, item):
+        kind = item['type']
+        if kind == 'task':
+            if not self.in_list:
+                self.f.write("<ul>\n")
+                self.in_list = True
+            css, mark = ('done', '✓') if item['done'] else ('pending', '□')
+            self.f.write(f"<li class=\"{css}\">{mark} {html.escape(item['text'])}</li>\n")
+            return
+        self._close_list()
+        if kind == 'day':
+            self.f.write(f"<h2>{html.escape(item['text'].lstrip('📆').strip())}</h2>\n")
+        elif kind == 'section':
+            self.f.write(f"<h3>{html.escape(item['name'])}</h3>\n")
+        elif item['text'].strip():
+            self.f.write(f"<p>{html.escape(item['text'])}</p>\n")
+
+    def end(self):
+        self._close_list()
+        self.f.write("</body>\n</html>\n")
+
+
+class CsvWriter(Writer):
+    """只导出任务"""
+
+    def begin(self):
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(["周", "日期", "状态", "任务", "标签", "截止"])
+
+    def item(self, item):
+        if item['type'] == 'task':
+            self.writer.writerow([
+                self.meta['week'],
+                item['day'] or "",
+                "完成" if item['done'] else "待办",
+                item['text'],
+                " ".join(item['tags']),
+                item['due'] or "",
+            ])
+
+
+class JsonWriter(Writer):
+    """{"week", "start", "end", "items": [...]}，条目逐个写出"""
+
+    def begin(self):
+        self.count = 0
+        head = {k: self.meta[k] for k in ('week', 'start', 'end')}
+        self.f.write(json.dumps(head, ensure_ascii=False)[:-1] + ', "items": [\n')
+
+    def item(self, item):
+        if item['type'] == 'text' and not item['text'].strip():
+            return
+        self.f.write((",\n" if self.count else "") + json.dumps(item, ensure_ascii=False))
+        self.count += 1
+
+    def end(self):
+        self.f.write("\n]}\n")
+
+
+def ics_escape(text):
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def ics_fold(line):
+    """按 RFC 5545 折行：每行不超过 75 字节，续行以空格开头，不拆开多字节字符"""
+    parts = []
+    current, size = "", 0
+    for ch in line:
+        width = len(ch.encode('utf-8'))
+        if size + width > 75:
+            parts.append(current)
+            current, size = " ", 1
+        current += ch
+        size += width
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+
+class IcsWriter(Writer):
+    """有截止日期的任务导出为 VTODO"""
+
+    def begin(self):
+        self.stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        for line in ("BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Weekly Progress//wp_export//ZH",
+                     f"X-WR-CALNAME:{ics_escape(self.meta['title'])}"):
+            self.f.write(ics_fold(line))
+
+    def item(self, item):
+        if item['type'] != 'task' or not item['due']:
+            return
+        due = item['due'].replace('-', '')
+        for line in (
+            "BEGIN:VTODO",
+            f"UID:{item['id']}@weekly-progress",
+            f"DTSTAMP:{self.stamp}",
+            f"DUE;VALUE=DATE:{due}",
+            f"SUMMARY:{ics_escape(item['text'])}",
+            f"STATUS:{'COMPLETED' if item['done'] else 'NEEDS-ACTION'}",
+            *([f"CATEGORIES:{','.join(ics_escape(t[1:]) for t in item['tags'])}"] if item['tags'] else []),
+            "END:VTODO",
+        ):
+            self.f.write(ics_fold(line))
+
+    def end(self):
+        self.f.write(ics_fold("END:VCALENDAR"))
+
+
+WRITERS = {
+    'md': MarkdownWriter,
+    'html': HtmlWriter,
+    'csv': CsvWriter,
+    'json': JsonWriter,
+    'ics': IcsWriter,
+}
+
+
+def export_name(week_num, fmt):
+    return f"week_{week_num}.{EXTENSIONS[fmt]}"
+
+
+def export_file(path, out_dir, formats, meta):
+    """把一个周记文件导出为多种格式（一次读取，逐行同时写出），返回 {格式: 文件名}
+
+    meta 需包含 week / start / end；每个输出先写临时文件再替换，中途出错时删除临时文件，
+    不留下半个文件。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    meta = dict(meta, title=meta.get('title') or f"第 {meta['week']} 周学习进度")
+    default_date = parse_date(meta['start']) or datetime.date.today()
+    names = {fmt: export_name(meta['week'], fmt) for fmt in formats}
+    files, writers = {}, []
+    complete = False
+    try:
+        for fmt, name in names.items():
+            # CSV 带 BOM，Excel 打开中文不乱码；ics 自己写 CRLF
+            encoding = 'utf-8-sig' if fmt == 'csv' else 'utf-8'
+            newline = '' if fmt in ('csv', 'ics') else None
+            files[fmt] = open(os.path.join(out_dir, name + ".tmp"), 'w', encoding=encoding, newline=newline)
+            writers.append(WRITERS[fmt](files[fmt], meta))
+        for writer in writers:
+            writer.begin()
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for item in iter_items(f, f"week_{meta['week']}", default_date):
+                for writer in writers:
+                    writer.item(item)
+        for writer in writers:
+            writer.end()
+        complete = True
+    finally:
+        for f in files.values():
+            f.close()
+            if not complete:
+                try:
+                    os.remove(f.name)
+                except OSError:
+                    pass
+    for name in names.values():
+        os.replace(os.path.join(out_dir, name + ".tmp"), os.path.join(out_dir, name))
+    return names
+
+
+def export_week(job):
+    """进程池任务: (归档路径, 输出目录, 格式, meta) -> (周数, {格式: 文件名} 或 None, 错误)"""
+    path, out_dir, formats, meta = job
+    try:
+        return meta['week'], export_file(path, out_dir, formats, meta), None
+    except (OSError, ValueError) as e:
+        return meta['week'], None, str(e)
+
+
+class ExportManifest:
+    """导出清单：记录每个归档周导出时的内容哈希和已导出的格式
+
+    归档内容（哈希）没变、格式已导出且文件还在的周，批量导出时跳过。
+    """
+
+    def __init__(self, out_dir, manifest_name=MANIFEST_NAME):
+        self.out_dir = out_dir
+        self.path = os.path.join(out_dir, manifest_name)
+        self.weeks = {}
+        self.load()
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == EXPORT_VERSION:
+                    self.weeks = data.get('weeks', {})
+        except (OSError, ValueError) as e:
+            print(f"读取导出清单错误: {e}")
+            self.weeks = {}
+
+    def save(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        data = {'version': EXPORT_VERSION, 'weeks': self.weeks}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def missing(self, entry, formats):
+        """该周还需要导出的格式"""
+        record = self.weeks.get(str(entry['week']))
+        if not record or record.get('sha1') != entry['sha1']:
+            return list(formats)
+        files = record.get('files', {})
+        return [
+            fmt for fmt in formats
+            if fmt not in files or not os.path.exists(os.path.join(self.out_dir, files[fmt]))
+        ]
+
+    def record(self, entry, names):
+        record = self.weeks.get(str(entry['week']))
+        if not record or record.get('sha1') != entry['sha1']:
+            record = self.weeks[str(entry['week'])] = {'sha1': entry['sha1'], 'files': {}}
+        record['files'].update(names)
+
+
+def export_archive(catalog, out_dir, formats=tuple(EXTENSIONS)):
+    """批量导出所有归档周，只导出内容变化或缺少格式的周，返回 (导出周数, 跳过周数, 错误列表)"""
+    manifest = ExportManifest(out_dir)
+    jobs, entries, skipped = [], {}, 0
+    for entry in catalog.list_weeks():
+        if not entry.get('sha1'):
+            continue
+        needed = manifest.missing(entry, formats)
+        if not needed:
+            skipped += 1
+            continue
+        meta = {'week': entry['week'], 'start': entry['start'], 'end': entry['end']}
+        jobs.append((catalog.path_for(entry), out_dir, needed, meta))
+        entries[entry['week']] = entry
+    if not jobs:
+        return 0, skipped, []
+    if len(jobs) >= POOL_THRESHOLD:
+        with ProcessPoolExecutor() as pool:
+            results = list(pool.map(export_week, jobs, chunksize=2))
+    else:
+        results = [export_week(job) for job in jobs]
+    errors = []
+    for week_num, names, error in results:
+        if names is None:
+            errors.append(f"第 {week_num} 周: {error}")
+        else:
+            manifest.record(entries[week_num], names)
+    manifest.save()
+    return len(jobs) - len(errors), skipped, errors
@@ -0,0 +1,320 @@
+"""按天折叠的编辑窗口 - 编辑器只载入最近几天，较早的日记录段折叠为占位行"""
+import os
+import tkinter as tk
+
+from wp_model import parse_day_header
+
+# 默认展开的最近天数（不含今天），None 表示载入整个文件
+DEFAULT_WINDOW_DAYS = 3
+FOLD_TAG = "fold"
+FOLD_PREFIX = "fold:"
+
+
+def decode_text(data):
+    """文件字节 -> 编辑器文本（统一换行符）"""
+    return data.decode('utf-8', errors='replace').replace('\r\n', '\n')
+
+
+def scan_sections(lines):
+    """按日期标题切分，lines 为文件的字节行（保留行尾）
+
+    返回 [{'key', 'label', 'start', 'end', 'lines'}]，start/end 为字节偏移；
+    key 为 "日期#序号"（同一天的第几个标题），第一个标题之前的内容 key 为 None。
+    """
+    sections = [{'key': None, 'label': "", 'start': 0, 'end': 0, 'lines': 0}]
+    seen = {}
+    offset = 0
+    for line in lines:
+        # 日期标题很短，长行不必解码
+        day = parse_day_header(line.decode('utf-8', errors='replace')) if len(line) < 200 else None
+        if day:
+            day = str(day)
+            seen[day] = seen.get(day, -1) + 1
+            sections.append({
+                'key': f"{day}#{seen[day]}",
+                'label': line.decode('utf-8', errors='replace').strip(),
+                'start': offset,
+                'end': offset,
+                'lines': 0,
+            })
+        offset += len(line)
+        sections[-1]['end'] = offset
+        sections[-1]['lines'] += 1
+    return sections
+
+
+class DayWindow:
+    """当前周文件的日记录段位置
+
+    只记录每段在文件中的字节区间，不保留折叠段的内容；折叠段在展开或保存时按偏移
+    从文件读取。扫描时记下文件版本 (mtime, 大小)，文件被改动过（同步、外部编辑器、
+    另一个实例）时先重新扫描；读取时再核对区间两端都是日期标题（或文件末尾）。
+    """
+
+    def __init__(self, path, window_days=DEFAULT_WINDOW_DAYS):
+        self.path = path
+        self.window_days = window_days
+        self.sections = []
+        # 扫描时的文件版本 (mtime, 大小)，None 表示未知
+        self.version = None
+        # 用户展开过的段，重新载入时保持展开
+        self.expanded = set()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def rescan(self):
+        """重新扫描文件中各段的位置（保存之后调用）"""
+        try:
+            with open(self.path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                self.sections = scan_sections(f)
+            self.version = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            self.sections = []
+            self.version = None
+
+    def plan(self, data):
+        """按文件内容生成载入计划 [('text', 文本) | ('fold', 键, 标题, 行数, 词数)]，相邻的展开段合并
+
+        data 应是刚读出的文件内容；读出之后文件又被改动（大小不符）时版本记为未知，下次读取前重新扫描。
+        """
+        self.sections = scan_sections(data.splitlines(keepends=True))
+        version = self._stat()
+        self.version = version if version and version[1] == len(data) else None
+        if self.window_days is None:
+            return [('text', decode_text(data))]
+        days = [s['key'] for s in self.sections if s['key']]
+        shown = set(days[-(self.window_days + 1):]) | self.expanded
+        plan = []
+        for section in self.sections:
+            if section['key'] is None or section['key'] in shown:
+                text = decode_text(data[section['start']:section['end']])
+                if plan and plan[-1][0] == 'text':
+                    plan[-1] = ('text', plan[-1][1] + text)
+                else:
+                    plan.append(('text', text))
+            else:
+                words = len(decode_text(data[section['start']:section['end']]).split())
+                plan.append(('fold', section['key'], section['label'], section['lines'], words))
+        return plan
+
+    def _find(self, key):
+        for section in self.sections:
+            if section['key'] == key:
+                return section
+        return None
+
+    def _read_at(self, section):
+        """按记录的区间读取一段；开头不是该日期的标题、结尾不是下一个日期标题或文件末尾时返回 None"""
+        with open(self.path, 'rb') as f:
+            f.seek(section['start'])
+            data = f.read(section['end'] - section['start'])
+            following = f.readline(256)
+        first = data.split(b'\n', 1)[0].decode('utf-8', errors='replace')
+        day = parse_day_header(first)
+        if day is None or str(day) != section['key'].split('#')[0]:
+            return None
+        if len(data) != section['end'] - section['start'] or not data.endswith(b'\n') and following:
+            return None
+        if following and parse_day_header(following.decode('utf-8', errors='replace')) is None:
+            return None
+        return decode_text(data)
+
+    def read(self, key):
+        """读取一个折叠段的原文；找不到时抛出 KeyError（此时不能保存，否则会丢失该段）"""
+        if self.version is None or self._stat() != self.version:
+            self.rescan()
+        section = self._find(key)
+        text = self._read_at(section) if section else None
+        if text is None:
+            self.rescan()
+            section = self._find(key)
+            text = self._read_at(section) if section else None
+        if text is None:
+            raise KeyError(f"折叠的记录段已不在文件中: {key}")
+        return text
+
+
+class FoldView:
+    """在 Text 中显示载入计划
+
+    折叠段显示为一行占位（带 fold 标签和同名标记），点击展开；取全文时占位行换回
+    文件中的原文，编辑器中的修改按位置拼回文件。占位行被删掉时原文仍保留在原处。
+
+    占位行只读：给了 hook（TextChangeHook）时，落在占位行内部的插入和只删掉占位行一部分的
+    删除会被拒绝（否则输入的文字带上折叠标签，取全文时被原文覆盖）；整行删除仍然允许。
+    """
+
+    def __init__(self, text, window, on_expand=None, hook=None):
+        self.text = text
+        self.window = window
+        self.on_expand = on_expand
+        # 键 -> (占位行文字, 折叠段词数, 折叠段行数)
+        self.folds = {}
+        # 载入、展开时自己改动编辑器，不经过只读检查
+        self.internal = False
+        if hook is not None:
+            hook.add_guard(self._guard_edit)
+        text.tag_configure(FOLD_TAG, foreground='#888888', background='#eeeeee')
+        text.tag_bind(FOLD_TAG, '<Button-1>', self._on_click)
+        text.tag_bind(FOLD_TAG, '<Enter>', lambda e: text.config(cursor='hand2'))
+        text.tag_bind(FOLD_TAG, '<Leave>', lambda e: text.config(cursor='xterm'))
+
+    def _forget(self):
+        for key in self.folds:
+            self.text.mark_unset(FOLD_PREFIX + key)
+            self.text.tag_delete(FOLD_PREFIX + key)
+        self.folds = {}
+
+    def render(self, plan, insert=None):
+        """清空编辑器并按计划载入
+
+        最后一段正文交给 insert(index, text)（例如分片插入器），其余直接插入。
+        """
+        self._forget()
+        self.internal = True
+        try:
+            self.text.delete('1.0', tk.END)
+            for i, piece in enumerate(plan):
+                if piece[0] == 'fold':
+                    self._insert_fold(*piece[1:])
+                elif i == len(plan) - 1 and insert:
+                    insert('end-1c', piece[1])
+                else:
+                    self.text.insert('end-1c', piece[1])
+        finally:
+            self.internal = False
+
+    def _insert_fold(self, key, label, lines, words):
+        name = FOLD_PREFIX + key
+        index = self.text.index('end-1c')
+        placeholder = f"▸ {label}  (已折叠 {lines} 行，点击展开)\n"
+        self.text.insert(index, placeholder, (FOLD_TAG, name))
+        # 右重力：在占位行行首输入的内容落在折叠段之前，展开前一段时标记随之后移
+        self.text.mark_set(name, index)
+        self.text.mark_gravity(name, tk.RIGHT)
+        self.folds[key] = (placeholder, words, lines)
+
+    def _on_click(self, event):
+        index = self.text.index(f"@{event.x},{event.y}")
+        for name in self.text.tag_names(index):
+            if name.startswith(FOLD_PREFIX):
+                self.expand(name[len(FOLD_PREFIX):])
+                return "break"
+
+    def _placeholder_end(self, key):
+        """占位行的结束位置；占位行已被删掉时就是标记位置"""
+        name = FOLD_PREFIX + key
+        start = self.text.index(name)
+        ranges = self.text.tag_ranges(name)
+        if ranges and self.text.compare(ranges[-1], '>', start):
+            return str(ranges[-1])
+        return start
+
+    def expand(self, key):
+        """展开一个折叠段（展开后清空撤销记录，撤销不会把原文变回占位文字）"""
+        if key not in self.folds:
+            return
+        content = self.window.read(key)
+        name = FOLD_PREFIX + key
+        start = self.text.index(name)
+        undo = self.text.cget('undo')
+        self.text.config(undo=False)
+        self.internal = True
+        try:
+            self.text.delete(start, self._placeholder_end(key))
+            self.text.insert(start, content)
+        finally:
+            self.internal = False
+        self.text.config(undo=undo)
+        self.text.edit_reset()
+        self.text.mark_unset(name)
+        self.text.tag_delete(name)
+        del self.folds[key]
+        self.window.expanded.add(key)
+        if self.on_expand:
+            self.on_expand(key)
+
+    def _spans(self):
+        """各占位行的 (开始, 结束)，已被删掉的占位行不算"""
+        spans = []
+        for key in self.folds:
+            start = self.text.index(FOLD_PREFIX + key)
+            end = self._placeholder_end(key)
+            if self.text.compare(start, '<', end):
+                spans.append((start, end))
+        return spans
+
+    def _guard_edit(self, command, args):
+        """TextChangeHook 守卫：拒绝改动占位行内部的插入/删除"""
+        if self.internal or not self.folds:
+            return args
+        if command == 'insert':
+            index = args[0]
+            for start, end in self._spans():
+                if self.text.compare(start, '<', index) and self.text.compare(index, '<', end):
+                    self.text.bell()
+                    return None
+            # 两个占位行相邻时，在中间输入的文字会继承 fold 标签，明确不带标签插入
+            if len(args) == 2 and FOLD_TAG in self.text.tag_names(f"{index}-1c"):
+                return args + ((),)
+            return args
+        if command == 'delete':
+            indices = list(args)
+            if len(indices) % 2:
+                indices.append(f"{indices[-1]}+1c")
+        else:
+            indices = list(args[:2])
+        for first, last in zip(indices[::2], indices[1::2]):
+            for start, end in self._spans():
+                overlaps = self.text.compare(first, '<', end) and self.text.compare(last, '>', start)
+                covers = self.text.compare(first, '<=', start) and self.text.compare(last, '>=', end)
+                if overlaps and not covers:
+                    self.text.bell()
+                    return None
+        return args
+
+    def expand_all(self):
+        for key in list(self.folds):
+            self.expand(key)
+
+    def word_count(self):
+        """全文词数：编辑器中的词数去掉占位行，加上折叠段的词数"""
+        count = len(self.text.get('1.0', tk.END).split())
+        for placeholder, words, _ in self.folds.values():
+            count += words - len(placeholder.split())
+        return count
+
+    def fold_lines(self):
+        """各占位行在编辑器中的行号"""
+        return [int(self.text.index(FOLD_PREFIX + key).split('.')[0]) for key in self.folds]
+
+    def file_line(self, line):
+        """编辑器行号 -> 全文行号（上方每个占位行在全文中是折叠段的全部行）"""
+        for key, (_, _, lines) in self.folds.items():
+            if int(self.text.index(FOLD_PREFIX + key).split('.')[0]) < line:
+                line += lines - 1
+        return line
+
+    def content(self, end=tk.END):
+        """全文：编辑器中的文本按位置拼上折叠段的原文"""
+        folds = [(self.text.index(FOLD_PREFIX + key), key) for key in self.folds]
+        folds.sort(key=lambda item: tuple(int(n) for n in item[0].split('.')))
+        parts = []
+        position = '1.0'
+        for index, key in folds:
+            parts.append(self.text.get(position, index))
+            parts.append(self.window.read(key))
+            position = self._placeholder_end(key)
+        parts.append(self.text.get(position, end))
+        return "".join(parts)
+
+    def saved(self):
+        """全文写入文件之后，重新定位各折叠段"""
+        if self.folds:
+            self.window.rescan()
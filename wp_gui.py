@@ -3,7 +3,7 @@ from tkinter import ttk, scrolledtext, messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import pystray
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, ImageTk
 import threading
 import os
 import datetime
@@ -14,9 +14,68 @@ from plyer import notification
 import keyboard
 import ctypes
 import schedule
-import time
 from collections import defaultdict
 
+from wp_analytics import AnalyticsEngine, HourlyHistogram, WEEKDAY_NAMES
+from wp_model import parse_task, extract_tags, DUE_RE
+from wp_tags import CURRENT_SOURCE
+from wp_matrix import DayMatrix, render_heatmap, HAS_NUMPY, METRICS, METRIC_LABELS
+from wp_history import VersionHistory
+from wp_streak import HabitStreak, DEFAULT_TEMPLATE_LINES
+from wp_days import DayIndex, Template, render_day, template_values, create_week_file
+from wp_timelog import FocusLog
+from wp_scheduler import Scheduler
+from wp_weeks import WeekEngine
+from wp_workspace import WorkspaceManager
+from wp_editor import ChunkedInserter, TextChangeHook
+from wp_fold import DayWindow, FoldView, decode_text, DEFAULT_WINDOW_DAYS
+from wp_report import ReportMemo, file_version
+from wp_priority import PriorityQueue, task_priority, task_due, URGENT, IMPORTANT
+from wp_overview import ViewModel, WeekStrip, overview_values
+from wp_timeline import WeekPages, TimelineView
+from wp_export import export_file, export_archive, EXTENSIONS
+from wp_events import EventBus, TaskCounter, SectionTracker, TASK_EVENTS, SECTION_EDITED, DAY_ROLLED
+from wp_timer import TimerEngine, POMODORO, STOPWATCH, FOCUS, PHASE_LABELS
+
+# 默认周/日模板（可在配置的 week_template / day_template 中自定义）
+WEEK_TEMPLATE = """═══════════════════════════════════════
+         📅 第 {week_num} 周学习进度
+═══════════════════════════════════════
+
+【本周目标】
+- 
+
+【重要事项】 !!
+- 
+
+【待办清单】 (格式: [Due:MM/DD] #标签 事项)
+- 
+
+"""
+
+DAY_TEMPLATE = """────────────────────────────────────
+📆 {date} ({weekday})
+
+【核心课程】
+□ 云计算 #课程
+□ AI #课程
+□ Advanced HCI #课程
+□ 社交计算 #课程
+
+【今日完成】
+- 
+
+【遗漏/新增】
+- 
+
+【明日计划】
+- 
+
+【备注/想法】
+
+
+"""
+
 # 解决高DPI模糊问题
 try:
     ctypes.windll.shcore.SetProcessDpiAwareness(1)
@@ -28,12 +87,19 @@ class WeeklyProgressTracker:
         # 文件路径配置
         self.config_file = "wp_config.json"
         self.current_file = "weekly_progress.txt"
-        self.habits_file = ".habits_tracker.json"
         self.reminders_file = ".reminders.json"
         self.archive_dir = "archive"
         
-        # 加载配置
+        # 加载配置（周记文件和归档使用活动工作区的路径）
         self.load_config()
+        self.workspaces = WorkspaceManager(self.config)
+        self.workspace = self.workspaces.active
+        self.current_file = self.workspace.current_file
+        self.archive_dir = self.workspace.archive_dir
+        self.load_templates()
+        
+        # 周记变化事件（统计卡片、托盘等订阅增量变化）
+        self.events = EventBus()
         self.init_files()
         
         # 创建主窗口 - 使用ttkbootstrap美化
@@ -41,20 +107,31 @@ class WeeklyProgressTracker:
         self.root.title("周进度追踪器 Pro")
         self.root.geometry("900x650")
         
+        # 定时任务：窗口隐藏时暂停纯界面刷新
+        self.scheduler = Scheduler(self.root)
+        self.schedule_week_rollover()
+        self.schedule_day_rollover()
+        
         # 设置窗口图标
         self.setup_window_icon()
         
         # 初始化UI
         self.setup_ui()
         
-        # 创建系统托盘
+        # 创建系统托盘（待办变化后刷新提示）
         self.create_tray_icon()
+        self.events.subscribe_idle(TASK_EVENTS, self.root, lambda events: self.update_tray_title())
         
         # 注册全局快捷键
         self.register_hotkeys()
         
-        # 启动提醒检查线程
-        self.start_reminder_thread()
+        # 按提醒时间排队
+        self.schedule_next_reminder()
+        
+        # 计时器引擎（独立于计时窗口，重启后恢复进行中的计时）
+        self.timer_engine = TimerEngine(self.archive_dir, self.scheduler, self.config.get('pomodoro'))
+        self.timer_engine.add_listener(self.on_timer_event)
+        self.timer_engine.load()
         
         # 初始隐藏主窗口
         self.root.withdraw()
@@ -102,7 +179,8 @@ class WeeklyProgressTracker:
             "theme": "superhero",
             "reminders_enabled": True,
             "reminder_times": ["09:00", "14:00", "18:00", "21:00"],
-            "auto_backup": True
+            "auto_backup": True,
+            "editor_window_days": DEFAULT_WINDOW_DAYS
         }
         
         if os.path.exists(self.config_file):
@@ -112,6 +190,11 @@ class WeeklyProgressTracker:
             self.config = default_config
             self.save_config()
             
+    def load_templates(self):
+        """周/日模板（配置优先，缺省用内置模板），只编译一次"""
+        self.week_template = Template(self.config.get('week_template') or WEEK_TEMPLATE)
+        self.day_template = Template(self.config.get('day_template') or DAY_TEMPLATE)
+        
     def save_config(self):
         """保存配置"""
         with open(self.config_file, 'w', encoding='utf-8') as f:
@@ -122,11 +205,61 @@ class WeeklyProgressTracker:
         if not os.path.exists(self.archive_dir):
             os.makedirs(self.archive_dir)
             
+        # 归档清单
+        self.catalog = self.workspace.catalog
+        self.analytics = AnalyticsEngine(self.catalog)
+        self.week_pages = WeekPages(self.catalog)
+        self.day_matrix = DayMatrix(self.archive_dir) if HAS_NUMPY else None
+            
         self.check_week_transition()
         
+        # 标签索引（归档周只索引一次，当前周随内容刷新增量更新）
+        self.tag_index = self.workspace.tag_index
+        self.tag_index.sync_archives(self.catalog)
+        
+        # 待办优先级队列（随标签索引增量更新，提醒和托盘都从这里取）
+        week_start, _ = self.weeks.week_range(self.config['week_num'])
+        self.task_queue = PriorityQueue(self.tag_index, CURRENT_SOURCE, week_start)
+        
+        # 当前周任务变化转发到事件总线，统计数字随事件加减
+        self.events.bridge(self.tag_index, CURRENT_SOURCE)
+        self.task_counter = TaskCounter(self.tag_index.filter(source=CURRENT_SOURCE))
+        self.events.subscribe(TASK_EVENTS, self.task_counter.on_event)
+        
+        # 日期标题索引（判断今日记录段是否存在）
+        self.day_index = DayIndex(self.archive_dir, self.current_file)
+        
         if not os.path.exists(self.current_file):
             self.create_week_file()
             
+        # 时段统计：归档周只合并一次，当前周之后随追加递增
+        self.hourly = HourlyHistogram(self.archive_dir)
+        self.hourly.build(self.analytics, self.current_file)
+        
+        # 按天统计矩阵：归档周只合并一次，当前周随记录段的变化更新
+        if self.day_matrix is not None:
+            self.day_matrix.sync_archives(self.analytics)
+        # 多周条带的归档周统计（归档清单版本变化时一次取齐）
+        self.strip_stats = (None, {})
+        
+        # 连续记录天数（归档周只扫描一次，之后按天延长）
+        self.streak = HabitStreak(self.archive_dir, DEFAULT_TEMPLATE_LINES | self.day_template.static_lines())
+        self.streak.sync(self.catalog, self.current_file)
+        
+        # 日记录段摘要（保存时找出被编辑的段）
+        self.sections = SectionTracker()
+        with open(self.current_file, 'r', encoding='utf-8') as f:
+            self.sections.update(f.read())
+        
+        # 专注时间日志（计时器和番茄钟）
+        self.focus_log = FocusLog(self.archive_dir)
+        
+        # 版本历史（auto_backup 开启时保存内容会按间隔留存版本）
+        self.history = VersionHistory(self.workspace.root)
+        
+        # 报告分段缓存（按当前周文件和归档清单的版本）
+        self.report_memo = ReportMemo()
+            
     def setup_ui(self):
         """设置美化的UI界面"""
         # 创建自定义样式
@@ -199,7 +332,8 @@ class WeeklyProgressTracker:
             ("✅ 标记完成", self.mark_done_dialog, "success"),
             ("📋 打开编辑器", self.open_editor, "info"),
             ("⏱️ 开始计时", self.show_timer, "warning"),
-            ("📊 生成报告", self.generate_report, "secondary")
+            ("📊 生成报告", self.generate_report, "secondary"),
+            ("📚 历史周记", self.show_timeline, "secondary")
         ]
         
         for text, command, style in actions:
@@ -232,42 +366,36 @@ class WeeklyProgressTracker:
             ttk.Label(frame, text=f" - {desc}").pack(side=LEFT)
             
     def create_stats_card(self, parent):
-        """创建统计信息卡片"""
+        """创建统计信息卡片（任务或记录段变化后自动更新）"""
         stats_frame = ttk.LabelFrame(parent, text="今日统计", padding=15)
         stats_frame.pack(fill=X, pady=20)
         
-        # 获取统计数据
-        stats = self.get_today_stats()
-        
         # 显示统计信息
-        for label, value, style in stats:
+        self.stats_labels = []
+        for label, value, style in self.get_today_stats():
             frame = ttk.Frame(stats_frame)
             frame.pack(fill=X, pady=5)
             
             ttk.Label(frame, text=label, width=10).pack(side=LEFT)
-            value_label = ttk.Label(frame, text=str(value), font=('Arial', 14, 'bold'))
+            value_label = ttk.Label(frame, font=('Arial', 14, 'bold'))
             value_label.pack(side=RIGHT)
+            self.stats_labels.append(value_label)
+        self.update_stats_card()
+        
+        self.events.subscribe_idle(
+            TASK_EVENTS + (SECTION_EDITED, DAY_ROLLED), self.root, lambda events: self.update_stats_card()
+        )
+        
+    def update_stats_card(self):
+        """刷新统计卡片的数值"""
+        styles = {"good": "success", "warning": "warning", "normal": "default"}
+        for value_label, (label, value, style) in zip(self.stats_labels, self.get_today_stats()):
+            value_label.configure(text=str(value), bootstyle=styles[style])
             
-            if style == "good":
-                value_label.configure(bootstyle="success")
-            elif style == "warning":
-                value_label.configure(bootstyle="warning")
-                
     def get_today_stats(self):
-        """获取今日统计数据"""
-        completed = 0
-        pending = 0
-        
-        if os.path.exists(self.current_file):
-            with open(self.current_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # 只统计今天的
-                today = datetime.date.today().strftime("%Y-%m-%d")
-                if today in content:
-                    # 简单统计
-                    completed = content.count('✓')
-                    pending = content.count('□')
-                    
+        """获取今日统计数据（计数随任务事件增减，不读文件）"""
+        completed = self.task_counter.done
+        pending = self.task_counter.pending
         streak = self.get_habit_streak()
         
         return [
@@ -311,6 +439,16 @@ class WeeklyProgressTracker:
             selectbackground='#4a90e2'
         )
         self.text_area.pack(fill=BOTH, expand=True)
+        # 文本变更钩子（折叠占位行只读）
+        self.text_hook = TextChangeHook(self.text_area)
+        # 大文件分片载入，界面不卡住
+        self.inserter = ChunkedInserter(self.text_area, self.text_hook)
+        self.insert_cancel_button.config(command=self.inserter.cancel)
+        # 载入被取消后编辑器内容不完整，刷新前不保存
+        self.load_incomplete = False
+        # 只载入今天和最近几天，较早的日记录段折叠为占位行（点击展开）
+        self.day_window = DayWindow(self.current_file, self.config.get('editor_window_days', DEFAULT_WINDOW_DAYS))
+        self.fold_view = FoldView(self.text_area, self.day_window, hook=self.text_hook)
         
         # 绑定右键菜单
         self.create_context_menu()
@@ -326,6 +464,8 @@ class WeeklyProgressTracker:
         self.context_menu.add_separator()
         self.context_menu.add_command(label="插入分隔线", command=self.insert_separator)
         self.context_menu.add_command(label="插入今日模板", command=self.insert_today_template)
+        self.context_menu.add_separator()
+        self.context_menu.add_command(label="展开全部折叠", command=lambda: self.fold_view.expand_all())
         
         self.text_area.bind("<Button-3>", self.show_context_menu)
         
@@ -389,15 +529,17 @@ class WeeklyProgressTracker:
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
-        # 生成本周总览
-        self.update_week_overview(scrollable_frame)
+        # 控件只创建一次，之后随事件原地更新数值；标签页不可见时只标记待刷新
+        self.week_view = ViewModel()
+        self.week_overview_dirty = True
+        self.build_week_overview(scrollable_frame)
+        self.notebook.bind('<<NotebookTabChanged>>', lambda e: self.on_week_tab_shown(), add='+')
+        self.events.subscribe_idle(
+            TASK_EVENTS + (SECTION_EDITED, DAY_ROLLED), self.root, lambda events: self.update_week_overview()
+        )
         
-    def update_week_overview(self, parent):
-        """更新本周总览"""
-        # 清空旧内容
-        for widget in parent.winfo_children():
-            widget.destroy()
-            
+    def build_week_overview(self, parent):
+        """创建本周总览的控件并绑定到视图模型"""
         # 标题
         title = ttk.Label(parent, text="本周进度总览", font=('Microsoft YaHei', 16, 'bold'))
         title.pack(pady=20)
@@ -406,9 +548,6 @@ class WeeklyProgressTracker:
         stats_frame = ttk.Frame(parent)
         stats_frame.pack(fill=X, padx=20, pady=10)
         
-        # 获取本周数据
-        week_data = self.analyze_week_data()
-        
         # 显示进度条
         progress_frame = ttk.LabelFrame(stats_frame, text="完成进度", padding=15)
         progress_frame.pack(fill=X, pady=10)
@@ -420,23 +559,21 @@ class WeeklyProgressTracker:
             bootstyle="success-striped"
         )
         progress.pack(pady=10)
-        progress['value'] = week_data['completion_rate']
+        rate_label = ttk.Label(progress_frame, font=('Arial', 14, 'bold'))
+        rate_label.pack()
+        self.week_view.bind('rate', lambda value: progress.configure(value=value))
+        self.week_view.bind('rate_text', lambda text: rate_label.configure(text=text))
         
-        ttk.Label(
-            progress_frame, 
-            text=f"{week_data['completion_rate']:.1f}% 完成",
-            font=('Arial', 14, 'bold')
-        ).pack()
-        
-        # 每日完成情况
+        # 每日完成情况（固定七行）
         daily_frame = ttk.LabelFrame(stats_frame, text="每日完成情况", padding=15)
         daily_frame.pack(fill=X, pady=10)
         
-        for day, data in week_data['daily_stats'].items():
+        for i in range(7):
             day_frame = ttk.Frame(daily_frame)
             day_frame.pack(fill=X, pady=5)
             
-            ttk.Label(day_frame, text=day, width=10).pack(side=LEFT)
+            name_label = ttk.Label(day_frame, width=10)
+            name_label.pack(side=LEFT)
             
             # 迷你进度条
             mini_progress = ttk.Progressbar(
@@ -446,40 +583,163 @@ class WeeklyProgressTracker:
                 bootstyle="info"
             )
             mini_progress.pack(side=LEFT, padx=10)
-            mini_progress['value'] = data['rate']
             
-            ttk.Label(day_frame, text=f"{data['completed']}/{data['total']}").pack(side=LEFT)
+            count_label = ttk.Label(day_frame)
+            count_label.pack(side=LEFT)
+            self.week_view.bind(f'day{i}.name', lambda text, w=name_label: w.configure(text=text))
+            self.week_view.bind(f'day{i}.rate', lambda value, w=mini_progress: w.configure(value=value))
+            self.week_view.bind(f'day{i}.text', lambda text, w=count_label: w.configure(text=text))
+            
+        # 多周完成率（只绘制滚动到的周）
+        strip_frame = ttk.LabelFrame(stats_frame, text="多周完成率", padding=15)
+        strip_frame.pack(fill=X, pady=10)
+        self.week_strip = WeekStrip(strip_frame, self.week_strip_stats)
+        
+        # 时段分布
+        self.create_hourly_chart(stats_frame)
+        
+        # 贡献热力图
+        if self.day_matrix is not None:
+            self.create_heatmap(stats_frame)
+            
+    def on_week_tab_shown(self):
+        """切换到本周总览时补上隐藏期间的变化"""
+        if self.week_overview_dirty:
+            self.update_week_overview()
             
+    def update_week_overview(self):
+        """更新本周总览（只改变化的数值，不重建控件）"""
+        if self.notebook.select() != str(self.week_frame):
+            self.week_overview_dirty = True
+            return
+        self.week_overview_dirty = False
+        values = overview_values(self.analyze_week_data())
+        values['hourly'] = tuple(tuple(row) for row in self.hourly.counts())
+        values['peak'] = self.hourly.peak()
+        self.week_view.update(values)
+        self.week_strip.set_weeks(self.config['week_num'], self.config['week_num'])
+        self.week_strip.invalidate(self.config['week_num'])
+        
+    def week_strip_stats(self, week):
+        """多周条带某一周的 (已完成, 任务数)：本周取事件计数，归档周取分析缓存
+
+        归档周的统计在清单版本变化后一次取齐，逐周绘制时只查字典。
+        """
+        if week == self.config['week_num']:
+            return self.task_counter.done, self.task_counter.done + self.task_counter.pending
+        version, weeks = self.strip_stats
+        if version != self.catalog.version:
+            weeks = {
+                w: (stats['done'], stats['done'] + stats['pending'])
+                for w, stats in self.analytics.archived_stats().items()
+            }
+            self.strip_stats = (self.catalog.version, weeks)
+        return weeks.get(week)
+        
+    def create_hourly_chart(self, parent):
+        """创建星期 × 小时的时段分布图（格子只创建一次，数值变化时改颜色）"""
+        chart_frame = ttk.LabelFrame(parent, text="时段分布", padding=15)
+        chart_frame.pack(fill=X, pady=10)
+        
+        peak_label = ttk.Label(chart_frame)
+        peak_label.pack(anchor=W, pady=(0, 5))
+        
+        def show_peak(peak):
+            text = f"最高效时段: {peak[0]:02d}:00-{peak[1]:02d}:00" if peak else ""
+            peak_label.configure(text=text)
+            
+        cell, left, top = 16, 40, 16
+        canvas = tk.Canvas(chart_frame, width=left + cell * 24, height=top + cell * 7, bg='#2b2b2b', highlightthickness=0)
+        canvas.pack(anchor=W)
+        
+        cells = []
+        for h in range(0, 24, 3):
+            canvas.create_text(left + h * cell + cell // 2, top // 2, text=str(h), fill='#aaaaaa', font=('Arial', 8))
+        for wd in range(7):
+            y = top + wd * cell
+            canvas.create_text(left // 2, y + cell // 2, text=WEEKDAY_NAMES[wd], fill='#aaaaaa', font=('Microsoft YaHei', 8))
+            row = []
+            for h in range(24):
+                x = left + h * cell
+                row.append(canvas.create_rectangle(x, y, x + cell - 2, y + cell - 2, fill='#2b2b2b', outline=''))
+            cells.append(row)
+            
+        def paint(counts):
+            max_count = max(max(row) for row in counts) or 1
+            for wd, row in enumerate(counts):
+                for h, count in enumerate(row):
+                    # 次数越多颜色越亮
+                    level = count / max_count
+                    color = '#%02x%02x%02x' % (int(43 + level * 31), int(43 + level * 101), int(43 + level * 183))
+                    canvas.itemconfigure(cells[wd][h], fill=color)
+                    
+        self.week_view.bind('peak', show_peak)
+        self.week_view.bind('hourly', paint)
+        
+    def create_heatmap(self, parent):
+        """创建贡献热力图（本周每日数据变化时重画）"""
+        heatmap_frame = ttk.LabelFrame(parent, text="贡献热力图", padding=15)
+        heatmap_frame.pack(fill=X, pady=10)
+        
+        metric_var = tk.StringVar(value='completed')
+        heatmap_label = ttk.Label(heatmap_frame)
+        
+        def draw():
+            image = render_heatmap(self.day_matrix, metric_var.get())
+            # 保留引用，避免图片被回收
+            self.heatmap_photo = ImageTk.PhotoImage(image)
+            heatmap_label.configure(image=self.heatmap_photo)
+            
+        metric_frame = ttk.Frame(heatmap_frame)
+        metric_frame.pack(fill=X, pady=(0, 10))
+        for metric in METRICS:
+            ttk.Radiobutton(
+                metric_frame,
+                text=METRIC_LABELS[metric],
+                variable=metric_var,
+                value=metric,
+                command=draw,
+                bootstyle="success-outline-toolbutton"
+            ).pack(side=LEFT, padx=5)
+            
+        heatmap_label.pack(anchor=W)
+        # 最近七天的数据变化时重画（今天的格子也在其中）
+        self.week_view.bind('days', lambda days: draw())
+        
     def analyze_week_data(self):
-        """分析本周数据"""
+        """分析本周数据（完成率取任务计数，每日数据取记录段统计，不读文件）"""
         week_data = {
             'completion_rate': 0,
-            'daily_stats': defaultdict(lambda: {'completed': 0, 'total': 0, 'rate': 0})
+            'daily_stats': {}
         }
         
-        if os.path.exists(self.current_file):
-            with open(self.current_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # 简单统计
-            completed = content.count('✓')
-            total = completed + content.count('□')
+        total = self.task_counter.done + self.task_counter.pending
+        if total > 0:
+            week_data['completion_rate'] = (self.task_counter.done / total) * 100
             
-            if total > 0:
-                week_data['completion_rate'] = (completed / total) * 100
-                
-            # 按日期分析（简化版）
-            today = datetime.date.today()
-            for i in range(7):
-                date = today - datetime.timedelta(days=i)
-                day_name = date.strftime("%A")[:3]
+        # 每日数据取自按天统计矩阵（包含上周末等归档的天），没有 numpy 时直接用记录段统计
+        today = datetime.date.today()
+        days = self.sections.day_stats()
+        rows = None
+        if self.day_matrix is not None:
+            self.day_matrix.update_current(days, today)
+            rows = self.day_matrix.window(end=today, days=7)
+            
+        for i in range(7):
+            date = today - datetime.timedelta(days=i)
+            day_name = date.strftime("%A")[:3]
+            
+            if rows is not None:
+                created, completed = int(rows[6 - i][0]), int(rows[6 - i][1])
+            else:
+                entry = days.get(str(date), {})
+                created, completed = entry.get('created', 0), entry.get('completed', 0)
                 
-                # 这里简化处理，实际应该解析文件内容
-                week_data['daily_stats'][day_name] = {
-                    'completed': completed // 7,
-                    'total': total // 7,
-                    'rate': week_data['completion_rate']
-                }
+            week_data['daily_stats'][day_name] = {
+                'completed': completed,
+                'total': created,
+                'rate': (completed / created * 100) if created else 0
+            }
                 
         return week_data
         
@@ -522,6 +782,12 @@ class WeeklyProgressTracker:
             bootstyle="primary"
         ).pack(pady=20)
         
+        # 定时器唤醒次数（确认托盘待机时界面刷新已暂停），切换到本页时更新
+        self.wakeup_label = ttk.Label(self.reminder_frame, bootstyle="secondary")
+        self.wakeup_label.pack(anchor=W, padx=20)
+        self.notebook.bind('<<NotebookTabChanged>>', lambda e: self.update_wakeup_label(), add='+')
+        self.update_wakeup_label()
+        
         # 添加自定义提醒
         custom_frame = ttk.LabelFrame(self.reminder_frame, text="添加自定义提醒", padding=20)
         custom_frame.pack(fill=X, padx=20, pady=10)
@@ -545,16 +811,22 @@ class WeeklyProgressTracker:
         """保存提醒设置"""
         self.config['reminder_times'] = [var.get() for var in self.time_entries]
         self.save_config()
+        self.schedule_next_reminder()
         self.show_notification("设置已保存", "提醒时间已更新")
         
+    def update_wakeup_label(self):
+        """显示最近一小时的定时唤醒次数"""
+        if self.notebook.select() == str(self.reminder_frame):
+            self.wakeup_label.config(text=f"最近一小时定时唤醒: {self.scheduler.wakeups_per_hour()} 次")
+            
     def add_custom_reminder(self):
         """添加自定义提醒"""
         text = self.custom_reminder_text.get()
-        time = self.custom_reminder_time.get()
+        remind_at = self.custom_reminder_time.get()
         
-        if text and time:
+        if text and remind_at:
             # 这里简化处理，实际应该保存到文件
-            self.show_notification("提醒已添加", f"{time} - {text}")
+            self.show_notification("提醒已添加", f"{remind_at} - {text}")
             self.custom_reminder_text.delete(0, tk.END)
             self.custom_reminder_time.delete(0, tk.END)
             
@@ -577,13 +849,20 @@ class WeeklyProgressTracker:
             bootstyle="inverse-secondary"
         )
         self.clock_label.pack(side=RIGHT, padx=10)
-        self.update_clock()
+        
+        # 分片载入进度（载入时才显示）
+        self.insert_progress = ttk.Progressbar(
+            status_frame, length=120, mode='determinate', maximum=100, bootstyle="info"
+        )
+        self.insert_cancel_button = ttk.Button(
+            status_frame, text="取消", width=5, bootstyle="secondary-outline"
+        )
+        self.scheduler.every('clock', 1000, self.update_clock, align=True)
         
     def update_clock(self):
         """更新时钟"""
         current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.clock_label.config(text=current_time)
-        self.root.after(1000, self.update_clock)
         
     def open_editor(self):
         """打开文本编辑器编辑今日记录"""
@@ -603,20 +882,77 @@ class WeeklyProgressTracker:
     def refresh_content(self):
         """刷新内容"""
         if os.path.exists(self.current_file):
-            with open(self.current_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                self.text_area.delete(1.0, tk.END)
-                self.text_area.insert(1.0, content)
+            with open(self.current_file, 'rb') as f:
+                data = f.read()
+            content = decode_text(data)
+            self.inserter.cancel()
+            self.load_incomplete = False
+            self.fold_view.render(
+                self.day_window.plan(data),
+                insert=lambda index, text: self.insert_large(index, text, cancellable=True, on_done=self.content_loaded)
+            )
+            self.tag_index.update_source(CURRENT_SOURCE, content)
+            self.streak.update_current(content)
+            self.day_index.update(content)
+            self.publish_section_edits(content)
                 
         self.update_status("内容已刷新")
         
+    def insert_large(self, index, content, cancellable=False, on_done=None):
+        """分片插入文本，状态栏显示进度"""
+        def progress(inserted, total):
+            if not self.insert_progress.winfo_ismapped():
+                self.insert_progress.pack(side=RIGHT, padx=5)
+                if cancellable:
+                    self.insert_cancel_button.pack(side=RIGHT)
+            self.insert_progress['value'] = inserted * 100 / total
+            self.update_status(f"载入中 {inserted * 100 // total}%")
+            
+        def finished(completed):
+            self.insert_progress.pack_forget()
+            self.insert_cancel_button.pack_forget()
+            if on_done:
+                on_done(completed)
+                
+        self.inserter.insert(index, content, on_done=finished, on_progress=progress)
+        
+    def content_loaded(self, completed):
+        """分片载入结束（取消时正文不完整，刷新前不保存）"""
+        if completed:
+            self.update_status("内容已刷新")
+        else:
+            self.load_incomplete = True
+            self.update_status("载入已取消，刷新前不会保存")
+            
     def save_current_content(self):
         """保存当前内容"""
-        content = self.text_area.get(1.0, tk.END)
+        if self.inserter.busy or self.load_incomplete:
+            # 载入未完成或被取消时正文不完整，不写入文件
+            if self.inserter.busy:
+                self.update_status("正在载入，本次未保存")
+            else:
+                self.update_status("载入已取消，本次未保存（请刷新后再编辑）")
+            return
+        # 折叠段从文件中按位置取回原文，和编辑器中的内容拼成全文
+        content = self.fold_view.content()
         with open(self.current_file, 'w', encoding='utf-8') as f:
             f.write(content)
+        self.fold_view.saved()
+        self.tag_index.update_source(CURRENT_SOURCE, content)
+        self.streak.update_current(content)
+        self.day_index.update(content)
+        self.publish_section_edits(content)
+        if self.config.get('auto_backup', True):
+            self.history.snapshot_if_due(content, self.config.get('backup_interval_minutes', 60))
         self.update_status("已保存")
         
+    def publish_section_edits(self, content):
+        """通知订阅者哪些日记录段被编辑过（没有订阅者时不比较）"""
+        if not self.events.has_subscribers(SECTION_EDITED):
+            return
+        for day, lineno in self.sections.update(content):
+            self.events.publish(SECTION_EDITED, day=day, lineno=lineno)
+            
     def quick_add_dialog(self):
         """快速添加对话框 - 美化版"""
         dialog = tk.Toplevel(self.root)
@@ -699,19 +1035,31 @@ class WeeklyProgressTracker:
         
     def quick_add(self, content):
         """快速添加记录"""
-        timestamp = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M]")
-        
-        # 添加到文件
-        with open(self.current_file, 'a', encoding='utf-8') as f:
-            f.write(f"{timestamp} 快速记录: {content}\n")
-            
-        # 更新显示
-        self.refresh_content()
+        now = datetime.datetime.now()
+        timestamp = now.strftime("[%Y-%m-%d %H:%M]")
+        
+        # 追加到文件末尾并插入编辑器，不重新载入整个文件
+        line = f"{timestamp} 快速记录: {content}"
+        self.day_index.appended(self.workspace.append_line(line))
+        self.hourly.add(now)
+        self.tag_index.add_line(line)
+        if self.streak.add_day(now.date()):
+            self.streak.save()
+        self.insert_appended_line(line)
         self.update_status(f"已添加: {content}")
         
         # 显示通知
         self.show_notification("快速记录", f"已添加: {content}")
         
+    def insert_appended_line(self, line):
+        """编辑器末尾插入已写入文件的一行（分片载入中则等载入完成）"""
+        if self.inserter.busy:
+            self.root.after(100, lambda: self.insert_appended_line(line))
+            return
+        last_char = self.text_area.get('end-2c', 'end-1c')
+        prefix = "\n" if last_char not in ("", "\n") else ""
+        self.text_area.insert('end-1c', f"{prefix}{line}\n")
+        
     def show_notification(self, title, message):
         """显示系统通知"""
         try:
@@ -736,81 +1084,80 @@ class WeeklyProgressTracker:
         except:
             pass
             
-    def start_reminder_thread(self):
-        """启动提醒线程"""
-        def check_reminders():
-            while True:
-                if self.config.get('reminders_enabled', True):
-                    current_time = datetime.datetime.now().strftime("%H:%M")
-                    
-                    # 检查定时提醒
-                    if current_time in self.config.get('reminder_times', []):
-                        # 检查是否有待办事项
-                        pending = self.get_pending_count()
-                        if pending > 0:
-                            self.root.after(0, lambda: self.show_notification(
-                                "任务提醒",
-                                f"你还有 {pending} 个待办事项需要完成"
-                            ))
-                    # 检查截止日期提醒  
-                    self.check_due_dates_reminder()
-                    
-                time.sleep(60)  # 每分钟检查一次
-                
-        reminder_thread = threading.Thread(target=check_reminders, daemon=True)
-        reminder_thread.start()
+    def schedule_next_reminder(self):
+        """在下一个提醒时间点精确唤醒，不再每分钟轮询"""
+        now = datetime.datetime.now()
+        upcoming = []
+        for text in self.config.get('reminder_times', []):
+            try:
+                hour, minute = map(int, text.split(':'))
+                when = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            except ValueError:
+                continue
+            if when <= now:
+                when += datetime.timedelta(days=1)
+            upcoming.append(when)
+        if upcoming:
+            self.scheduler.at_datetime('reminder', min(upcoming), self.fire_reminder)
+        else:
+            self.scheduler.cancel('reminder')
+            
+    def fire_reminder(self):
+        """到达提醒时间"""
+        if self.config.get('reminders_enabled', True):
+            # 检查是否有待办事项
+            pending = self.get_pending_count()
+            if pending > 0:
+                upcoming = "；".join(task['text'] for task in self.task_queue.top(3))
+                self.show_notification(
+                    "任务提醒",
+                    f"你还有 {pending} 个待办事项，接下来: {upcoming}"
+                )
+            # 检查截止日期提醒
+            self.check_due_dates_reminder()
+        self.schedule_next_reminder()
         
     def check_due_dates_reminder(self):
-        """检查截止日期提醒"""
-        if os.path.exists(self.current_file):
-            with open(self.current_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+        """检查截止日期提醒（从待办索引取任务，不读文件）"""
+        today = datetime.date.today()
+        for task in self.tag_index.filter(source=CURRENT_SOURCE, pending_only=True):
+            due_date = task_due(task, today)
+            if due_date is None:
+                continue
                 
-            # 查找所有Due日期
-            import re
-            due_pattern = r'\[Due:(\d{2}/\d{2})\](.+)'
-            matches = re.findall(due_pattern, content)
+            # 计算剩余天数
+            days_left = (due_date - today).days
             
-            today = datetime.date.today()
-            for due_date_str, task in matches:
-                # 解析日期
-                month, day = map(int, due_date_str.split('/'))
-                due_date = datetime.date(today.year, month, day)
-                
-                # 计算剩余天数
-                days_left = (due_date - today).days
-                
-                # 提前提醒
-                if days_left == 1:
-                    self.show_notification(
-                        "截止日期提醒",
-                        f"明天截止: {task.strip()}"
-                    )
-                elif days_left == 0:
-                    self.show_notification(
-                        "⚠️ 紧急提醒",
-                        f"今天截止: {task.strip()}"
-                    )
+            # 提前提醒
+            if days_left == 1:
+                self.show_notification(
+                    "截止日期提醒",
+                    f"明天截止: {task['text']}"
+                )
+            elif days_left == 0:
+                self.show_notification(
+                    "⚠️ 紧急提醒",
+                    f"今天截止: {task['text']}"
+                )
                     
     def get_pending_count(self):
         """获取待办数量"""
-        if os.path.exists(self.current_file):
-            with open(self.current_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                return content.count('□')
-        return 0
+        return len(self.task_queue)
+        
+    def update_tray_title(self):
+        """托盘提示显示优先级最高的待办"""
+        if getattr(self, 'icon', None):
+            top = self.task_queue.top(1)
+            title = f"周进度追踪器 Pro - 下一项: {top[0]['text']}" if top else "周进度追踪器 Pro"
+            self.icon.title = title[:120]
         
     def get_habit_streak(self):
         """获取习惯连续天数"""
-        if os.path.exists(self.habits_file):
-            with open(self.habits_file, 'r') as f:
-                data = json.load(f)
-                return data.get('streak', 0)
-        return 0
+        return self.streak.current()
         
     def mark_done_dialog(self):
         """标记完成对话框 - 美化版"""
-        tasks = self.get_all_tasks()
+        tasks = self.tag_index.filter(source=CURRENT_SOURCE, pending_only=True)
         if not tasks:
             messagebox.showinfo("提示", "没有待完成的任务")
             return
@@ -831,6 +1178,10 @@ class WeeklyProgressTracker:
             bootstyle="inverse-primary"
         ).pack(pady=15)
         
+        # 标签筛选
+        chip_frame = ttk.Frame(dialog)
+        chip_frame.pack(fill=X, padx=20, pady=(10, 0))
+        
         # 任务列表框架
         list_frame = ttk.Frame(dialog)
         list_frame.pack(fill=BOTH, expand=True, padx=20, pady=10)
@@ -846,16 +1197,45 @@ class WeeklyProgressTracker:
         )
         self.task_tree.pack(fill=BOTH, expand=True)
         
-        # 添加任务
-        for i, task in enumerate(tasks):
-            # 解析任务类型
-            tag = "normal"
-            if "#重要" in task or "!!" in task:
-                tag = "important"
-            elif "#紧急" in task:
-                tag = "urgent"
+        selected_tags = set()
+        
+        def populate():
+            """按选中的标签填充任务（在索引上求交集，不读文件）"""
+            self.task_tree.delete(*self.task_tree.get_children())
+            tasks = self.tag_index.filter(selected_tags, source=CURRENT_SOURCE, pending_only=True)
+            for task in self.task_queue.rank(tasks):
+                # 按优先级着色
+                level = task_priority(task)
+                tag = "normal"
+                if level == IMPORTANT:
+                    tag = "important"
+                elif level == URGENT:
+                    tag = "urgent"
+                    
+                self.task_tree.insert('', 'end', text=task['line'], values=(task['line'],), tags=(tag,))
                 
-            self.task_tree.insert('', 'end', values=(task,), tags=(tag,))
+        def toggle_tag(tag, var):
+            if var.get():
+                selected_tags.add(tag)
+            else:
+                selected_tags.discard(tag)
+            populate()
+            
+        counts = defaultdict(int)
+        for task in tasks:
+            for tag in task['tags']:
+                counts[tag] += 1
+        for tag in sorted(counts, key=lambda t: -counts[t])[:8]:
+            var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(
+                chip_frame,
+                text=f"{tag} {counts[tag]}",
+                variable=var,
+                command=lambda t=tag, v=var: toggle_tag(t, v),
+                bootstyle="info-outline-toolbutton"
+            ).pack(side=LEFT, padx=2)
+            
+        populate()
             
         # 设置标签样式
         self.task_tree.tag_configure('important', foreground='#ff6b6b')
@@ -889,16 +1269,45 @@ class WeeklyProgressTracker:
             bootstyle="secondary-outline",
             width=15
         ).pack(side=RIGHT)
-        
+
+    def show_timeline(self):
+        """历史周记：按周浏览归档，选中时才读取该周"""
+        timeline_window = tk.Toplevel(self.root)
+        timeline_window.title("历史周记")
+        timeline_window.geometry("950x600")
+        timeline_window.transient(self.root)
+
+        timeline = TimelineView(timeline_window, self.week_pages)
+        timeline.populate(self.catalog.list_weeks(include_gaps=True))
+
+        ttk.Button(
+            timeline_window,
+            text="关闭",
+            command=timeline_window.destroy,
+            bootstyle="secondary-outline"
+        ).pack(pady=(0, 10))
+
     def generate_report(self):
         """生成详细报告"""
-        report = self.create_detailed_report()
-        
         # 创建报告窗口
         report_window = tk.Toplevel(self.root)
         report_window.title("周进度报告")
         report_window.geometry("700x600")
         
+        # 周范围选择
+        range_frame = ttk.Frame(report_window)
+        range_frame.pack(fill=X, padx=10, pady=(10, 0))
+        
+        week_num = self.config['week_num']
+        first_var = tk.IntVar(value=max(1, week_num - 51))
+        last_var = tk.IntVar(value=week_num)
+        
+        ttk.Label(range_frame, text="从第").pack(side=LEFT)
+        ttk.Spinbox(range_frame, from_=1, to=week_num, textvariable=first_var, width=5).pack(side=LEFT, padx=5)
+        ttk.Label(range_frame, text="周到第").pack(side=LEFT)
+        ttk.Spinbox(range_frame, from_=1, to=week_num, textvariable=last_var, width=5).pack(side=LEFT, padx=5)
+        ttk.Label(range_frame, text="周").pack(side=LEFT)
+        
         # 报告显示
         report_text = scrolledtext.ScrolledText(
             report_window,
@@ -906,8 +1315,33 @@ class WeeklyProgressTracker:
             font=('Consolas', 10)
         )
         report_text.pack(fill=BOTH, expand=True, padx=10, pady=10)
-        report_text.insert(1.0, report)
-        report_text.config(state=tk.DISABLED)
+        
+        report = ""
+        
+        def show_report(text):
+            nonlocal report
+            report = text
+            report_text.config(state=tk.NORMAL)
+            report_text.delete(1.0, tk.END)
+            report_text.insert(1.0, text)
+            report_text.config(state=tk.DISABLED)
+            
+        # 先显示缓存的报告，输入有变化的段推迟到空闲时逐段重算
+        self.show_detailed_report(report_window, show_report)
+        
+        def range_report():
+            try:
+                first, last = sorted((first_var.get(), last_var.get()))
+            except tk.TclError:
+                return
+            self.show_detailed_report(report_window, show_report, first, last)
+            
+        ttk.Button(
+            range_frame,
+            text="生成区间报告",
+            command=range_report,
+            bootstyle="info-outline"
+        ).pack(side=LEFT, padx=10)
         
         # 导出按钮
         button_frame = ttk.Frame(report_window)
@@ -926,65 +1360,282 @@ class WeeklyProgressTracker:
             bootstyle="primary"
         ).pack(side=RIGHT)
         
-    def create_detailed_report(self):
-        """创建详细报告"""
-        # 这里应该有更复杂的分析逻辑
+        ttk.Button(
+            button_frame,
+            text="导出周记",
+            command=self.export_records,
+            bootstyle="secondary-outline"
+        ).pack(side=RIGHT, padx=5)
+        
+        def export_focus():
+            filename = f"focus_log_{datetime.date.today()}.csv"
+            count = self.focus_log.export_csv(filename)
+            self.show_notification("专注记录已导出", f"{count} 条记录已保存到: {filename}")
+            
+        ttk.Button(
+            button_frame,
+            text="导出专注记录",
+            command=export_focus,
+            bootstyle="secondary-outline"
+        ).pack(side=RIGHT, padx=5)
+        
+    def export_records(self):
+        """把本周和全部归档周导出为 Markdown/HTML/CSV/JSON/iCalendar
+
+        归档周在后台线程中批量导出（多进程），内容没变的周跳过；
+        导出目录和格式可在配置的 export_dir / export_formats 中修改。
+        """
+        out_dir = self.config.get('export_dir') or os.path.join(self.workspace.root, "exports")
+        formats = self.config.get('export_formats') or list(EXTENSIONS)
+        week_num = self.config['week_num']
+        start, end = self.weeks.week_range(week_num)
+        # 先保存，导出的是编辑器中的最新内容
+        self.save_current_content()
+        try:
+            export_file(self.current_file, out_dir, formats, {'week': week_num, 'start': str(start), 'end': str(end)})
+        except (OSError, ValueError) as e:
+            print(f"导出周记错误: {e}")
+            self.show_notification("导出失败", str(e))
+            return
+        catalog = self.catalog
+
+        def run():
+            try:
+                exported, skipped, errors = export_archive(catalog, out_dir, formats)
+            except Exception as e:
+                print(f"导出归档错误: {e}")
+                return
+            for error in errors:
+                print(f"导出归档错误: {error}")
+            self.root.after(0, lambda: self.show_notification(
+                "周记已导出", f"已保存到: {out_dir}（归档导出 {exported} 周，跳过 {skipped} 周）"
+            ))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_detailed_report(self, widget, render, first_week=None, last_week=None):
+        """显示报告：缓存立即显示，过期的段推迟到空闲时逐段重算"""
+        sections = self.report_sections(first_week, last_week)
+        assemble = lambda values: self.assemble_report(values, first_week, last_week)
+        self.report_memo.show(widget, sections, assemble, render)
+        
+    def create_detailed_report(self, first_week=None, last_week=None):
+        """创建详细报告
+        
+        不指定周范围时只统计本周；指定范围时合并范围内的归档周，范围包含本周时一并统计。
+        各段按输入版本缓存，只重算输入变化的段。
+        """
+        sections = self.report_sections(first_week, last_week)
+        return self.report_memo.build(sections, lambda values: self.assemble_report(values, first_week, last_week))
+        
+    def report_sections(self, first_week=None, last_week=None):
+        """报告各段 [(名称, 输入版本, 生成函数)]
+        
+        当前周文件版本只需一次 stat，归档部分用归档清单的版本号。
+        """
+        week_num = self.config['week_num']
+        today = datetime.date.today()
+        doc = file_version(self.current_file)
+        span = "current" if first_week is None else f"{first_week}-{last_week}"
+        includes_current = first_week is None or last_week >= week_num
+        since, until = self.report_period(first_week, last_week)
+        return [
+            (f"numbers:{span}", (doc if includes_current else None, self.catalog.version, week_num),
+             lambda: self.report_numbers_section(first_week, last_week)),
+            ("tasks", (doc, today), self.report_tasks_section),
+            ("streak", (doc, self.catalog.version, today), lambda: (self.get_habit_streak(), self.streak.longest)),
+            (f"focus:{span}", (len(self.focus_log), since, until), lambda: self.report_focus_section(since, until)),
+        ]
+        
+    def report_numbers_section(self, first_week=None, last_week=None):
+        """统计数字段：完成率、高效时段、最高产的一天、常用标签"""
+        week_num = self.config['week_num']
+        if first_week is None:
+            numbers = self.analytics.report_numbers(self.current_file)
+        else:
+            current = self.current_file if last_week >= week_num else None
+            numbers = self.analytics.report_numbers(current, (first_week, last_week))
+            
+        # 本周和全部历史的时段直接读时段统计，其余区间用分析结果
+        if first_week is None:
+            peak = self.hourly.peak(current_only=True)
+        elif first_week <= 1 and last_week >= week_num:
+            peak = self.hourly.peak()
+        else:
+            peak = numbers['peak']
+        peak_text = f"{peak[0]:02d}:00-{peak[1]:02d}:00" if peak else "暂无数据"
+        best_day = numbers['best_day']
+        if best_day is None:
+            best_day_text = "暂无数据"
+        elif first_week is None:
+            best_day_text = f"{best_day[1]} ({best_day[2]}个任务)"
+        else:
+            best_day_text = f"{best_day[0]} {best_day[1]} ({best_day[2]}个任务)"
+        # 本周和全部历史的标签直接读标签索引
+        if first_week is None:
+            top_tags = self.tag_index.top_tags(3, CURRENT_SOURCE)
+        elif first_week <= 1 and last_week >= week_num:
+            top_tags = self.tag_index.top_tags(3)
+        else:
+            top_tags = numbers['top_tags']
+        return {
+            'numbers': numbers,
+            'peak': peak_text,
+            'best_day': best_day_text,
+            'top_tags': " ".join(top_tags) or "暂无标签",
+        }
+        
+    def report_focus_section(self, since, until):
+        """专注统计段：从结构化日志按时间区间聚合"""
+        focus_total = self.focus_log.total_minutes(since, until)
+        focus_days = self.focus_log.minutes_by_day(since, until)
+        return {
+            'total': focus_total,
+            'avg': focus_total / len(focus_days) if focus_days else 0,
+            'tags': "\n".join(
+                f"• {tag or '无标签'}: {minutes} 分钟"
+                for tag, minutes in list(self.focus_log.minutes_by_tag(since, until).items())[:5]
+            ) or "• 暂无计时记录",
+            'tasks': "\n".join(
+                f"{i}. {task} ({minutes} 分钟)"
+                for i, (task, minutes) in enumerate(self.focus_log.top_tasks(3, since, until), 1)
+            ) or "暂无计时记录",
+        }
+        
+    def report_tasks_section(self):
+        """本周任务明细段：已完成、待办和逾期"""
+        done_tasks = defaultdict(int)
+        pending_tasks = []
+        overdue_tasks = []
+        today = datetime.date.today()
+        if os.path.exists(self.current_file):
+            with open(self.current_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    task = parse_task(line)
+                    if not task:
+                        continue
+                    done, text = task
+                    if done:
+                        done_tasks[text] += 1
+                        continue
+                    if text not in pending_tasks:
+                        pending_tasks.append(text)
+                    due = DUE_RE.search(text)
+                    if due:
+                        try:
+                            due_date = datetime.date(today.year, int(due.group(1)), int(due.group(2)))
+                        except ValueError:
+                            continue
+                        if due_date < today:
+                            overdue_tasks.append(text)
+                            
+        achievements = "\n".join(
+            f"✓ {text}" + (f" ×{count}" if count > 1 else "")
+            for text, count in list(done_tasks.items())[:5]
+        ) or "暂无已完成任务"
+        improvements = [f"• 仍有 {len(pending_tasks)} 项待办未完成"] if pending_tasks else []
+        improvements += [f"• 已逾期: {text}" for text in overdue_tasks[:3]]
+        return {
+            'achievements': achievements,
+            'improvements': "\n".join(improvements) or "• 暂无",
+            'next_plans': "\n".join(f"{i}. {text}" for i, text in enumerate(pending_tasks[:3], 1)) or "暂无待办",
+        }
+        
+    def assemble_report(self, values, first_week=None, last_week=None):
+        """把各段拼成报告文本"""
+        week_num = self.config['week_num']
+        if first_week is None:
+            title = f"第 {week_num} 周进度报告"
+            span = "current"
+        else:
+            title = f"第 {first_week}-{last_week} 周进度报告"
+            span = f"{first_week}-{last_week}"
+        stats = values[f"numbers:{span}"]
+        numbers = stats['numbers']
+        tasks = values['tasks']
+        streak, longest = values['streak']
+        focus = values[f"focus:{span}"]
+        
         report = f"""
 ╔══════════════════════════════════════╗
-║        第 {self.config['week_num']} 周进度报告         ║
+║        {title}         ║
 ╚══════════════════════════════════════╝
 
 生成时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 【本周概况】
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• 连续记录天数: {self.get_habit_streak()} 天
-• 任务完成率: {self.get_completion_rate():.1f}%
-• 最高效时段: 14:00-16:00
+• 连续记录天数: {streak} 天 (最长 {longest} 天)
+• 任务完成率: {numbers['completion_rate']:.1f}%
+• 最高效时段: {stats['peak']}
 
 【重要成就】
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-✓ 完成云计算大作业
-✓ HCI项目原型设计
-✓ 阅读AI论文3篇
+{tasks['achievements']}
 
 【待改进项】
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• 早起计划执行率较低
-• 社交计算课程进度滞后
+{tasks['improvements']}
 
 【下周计划】
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-1. 完成HCI期中项目
-2. 准备AI课程演讲
-3. 开始准备期末复习
+{tasks['next_plans']}
 
 【数据分析】
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-最高产的一天: 周三 (8个任务)
-平均每日完成: 5.2个任务
-最常用标签: #学习 #作业 #阅读
+最高产的一天: {stats['best_day']}
+平均每日完成: {numbers['avg_completed']:.1f}个任务
+最常用标签: {stats['top_tags']}
+记录天数: {numbers['active_days']} 天
+专注时长: {numbers['focus_minutes']} 分钟
+
+【专注统计】
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+计时总时长: {focus['total']} 分钟 (有计时的日子平均 {focus['avg']:.0f} 分钟)
+{focus['tags']}
+专注最多的任务:
+{focus['tasks']}
 
 ══════════════════════════════════════
 """
         return report
         
+    def report_period(self, first_week=None, last_week=None):
+        """报告覆盖的时间区间 (since, until)，本周从周一零点算起"""
+        today = datetime.date.today()
+        monday = datetime.datetime.combine(today - datetime.timedelta(days=today.weekday()), datetime.time())
+        if first_week is None:
+            return monday, None
+        first = self.catalog.get_week(first_week)
+        since = datetime.datetime.combine(datetime.date.fromisoformat(first['start']), datetime.time()) if first else None
+        if last_week >= self.config['week_num']:
+            return since, None
+        last = self.catalog.get_week(last_week)
+        until = datetime.datetime.combine(datetime.date.fromisoformat(last['end']), datetime.time()) + datetime.timedelta(days=1) if last else monday
+        return since, until
+        
     def get_completion_rate(self):
-        """计算完成率"""
-        if os.path.exists(self.current_file):
+        """计算完成率（当前周文件未变化时直接用上次的结果）"""
+        def build():
+            if not os.path.exists(self.current_file):
+                return 0
             with open(self.current_file, 'r', encoding='utf-8') as f:
                 content = f.read()
-                completed = content.count('✓')
-                total = completed + content.count('□')
-                if total > 0:
-                    return (completed / total) * 100
-        return 0
+            completed = content.count('✓')
+            total = completed + content.count('□')
+            return (completed / total) * 100 if total > 0 else 0
+        return self.report_memo.section('completion_rate', file_version(self.current_file), build)
         
     def show_timer(self):
-        """显示计时器窗口 - 美化版"""
+        """显示计时器窗口 - 美化版（关闭窗口不影响正在运行的计时器）"""
+        if getattr(self, 'timer_window', None) is not None and self.timer_window.winfo_exists():
+            self.timer_window.deiconify()
+            self.timer_window.lift()
+            return
+            
         self.timer_window = tk.Toplevel(self.root)
         self.timer_window.title("专注计时器")
-        self.timer_window.geometry("400x300")
+        self.timer_window.geometry("460x420")
         self.timer_window.configure(bg='#1a1a1a')
         
         # 计时器显示
@@ -1002,7 +1653,9 @@ class WeeklyProgressTracker:
                 font=('Consolas', 36),  # 备用字体
                 bootstyle="success"
         )
-        self.timer_label.pack(pady=40)
+        self.timer_label.pack(pady=(20, 5))
+        self.timer_phase_label = ttk.Label(self.timer_window, text="", bootstyle="secondary")
+        self.timer_phase_label.pack()
         
         # 任务输入
         task_frame = ttk.Frame(self.timer_window)
@@ -1012,92 +1665,156 @@ class WeeklyProgressTracker:
         self.timer_task = ttk.Entry(task_frame, width=30)
         self.timer_task.pack(side=LEFT, padx=10)
         
-        # 控制按钮
+        # 新建按钮
         button_frame = ttk.Frame(self.timer_window)
-        button_frame.pack(pady=20)
-        
-        self.timer_running = False
-        self.timer_start = None
+        button_frame.pack(pady=5)
         
-        self.start_btn = ttk.Button(
+        ttk.Button(
             button_frame,
-            text="▶ 开始",
+            text="▶ 开始计时",
             command=self.start_timer,
             bootstyle="success-outline",
             width=12
-        )
-        self.start_btn.pack(side=LEFT, padx=5)
-        
-        self.stop_btn = ttk.Button(
-            button_frame,
-            text="⏸ 停止",
-            command=self.stop_timer,
-            bootstyle="danger-outline",
-            width=12,
-            state=tk.DISABLED
-        )
-        self.stop_btn.pack(side=LEFT, padx=5)
+        ).pack(side=LEFT, padx=5)
         
-        # 番茄钟模式
+        pomodoro = self.timer_engine.pomodoro
         ttk.Button(
-            self.timer_window,
-            text="🍅 番茄钟模式 (25分钟)",
+            button_frame,
+            text=f"🍅 番茄钟 ({pomodoro['focus_minutes']}分钟)",
             command=self.start_pomodoro,
             bootstyle="warning"
-        ).pack(pady=10)
+        ).pack(side=LEFT, padx=5)
+        
+        # 进行中的计时器
+        self.timer_tree = ttk.Treeview(
+            self.timer_window,
+            columns=('phase', 'time'),
+            height=5
+        )
+        self.timer_tree.heading('#0', text='任务')
+        self.timer_tree.heading('phase', text='阶段')
+        self.timer_tree.heading('time', text='时间')
+        self.timer_tree.column('#0', width=220)
+        self.timer_tree.column('phase', width=90)
+        self.timer_tree.column('time', width=90)
+        self.timer_tree.pack(fill=X, padx=15, pady=5)
+        
+        # 控制按钮（作用于选中的计时器）
+        control_frame = ttk.Frame(self.timer_window)
+        control_frame.pack(pady=5)
+        
+        ttk.Button(control_frame, text="⏯ 暂停/继续", command=self.toggle_timer, bootstyle="info-outline").pack(side=LEFT, padx=5)
+        ttk.Button(control_frame, text="⏭ 下一阶段", command=self.skip_timer_phase, bootstyle="secondary-outline").pack(side=LEFT, padx=5)
+        ttk.Button(control_frame, text="⏹ 停止", command=self.stop_timer, bootstyle="danger-outline").pack(side=LEFT, padx=5)
+        
+        # 窗口隐藏或最小化时暂停刷新，显示时按单调时钟重新计算
+        self.scheduler.every('timer_display', 1000, self.update_timer, widget=self.timer_window)
+        
+    def selected_timer(self):
+        """计时器窗口中选中的计时器编号（未选中时取最新的一个）"""
+        selection = self.timer_tree.selection() if getattr(self, 'timer_tree', None) else ()
+        if selection:
+            return int(selection[0])
+        timers = self.timer_engine.list_timers()
+        return timers[-1]['id'] if timers else None
         
     def start_timer(self):
         """开始计时"""
-        self.timer_running = True
-        self.timer_start = datetime.datetime.now()
-        self.start_btn.config(state=tk.DISABLED)
-        self.stop_btn.config(state=tk.NORMAL)
+        task_name = self.timer_task.get() or "未命名任务"
+        timer_id = self.timer_engine.start(task_name, extract_tags(task_name))
         self.update_timer()
+        self.timer_tree.selection_set(str(timer_id))
         
-    def stop_timer(self):
-        """停止计时"""
-        self.timer_running = False
-        self.start_btn.config(state=tk.NORMAL)
-        self.stop_btn.config(state=tk.DISABLED)
+    def start_pomodoro(self):
+        """开始番茄钟"""
+        task_name = self.timer_task.get() or "番茄钟专注时间"
+        timer_id = self.timer_engine.start(task_name, extract_tags(task_name), kind=POMODORO)
+        self.update_timer()
+        self.timer_tree.selection_set(str(timer_id))
         
-        # 记录时长
-        duration = datetime.datetime.now() - self.timer_start
-        minutes = int(duration.total_seconds() / 60)
-        task_name = self.timer_task.get() or "未命名任务"
+    def toggle_timer(self):
+        """暂停或继续选中的计时器"""
+        timer_id = self.selected_timer()
+        if timer_id is None:
+            return
+        if self.timer_engine.is_running(timer_id):
+            self.timer_engine.pause(timer_id)
+        else:
+            self.timer_engine.resume(timer_id)
+        self.update_timer()
         
-        self.quick_add(f"⏱️ {task_name} - 用时 {minutes} 分钟")
-        self.show_notification("计时完成", f"{task_name} 用时 {minutes} 分钟")
+    def skip_timer_phase(self):
+        """番茄钟跳到下一阶段"""
+        timer_id = self.selected_timer()
+        if timer_id is not None:
+            self.timer_engine.skip(timer_id)
+            self.update_timer()
         
-    def update_timer(self):
-        """更新计时器"""
-        if self.timer_running and hasattr(self, 'timer_window'):
-            elapsed = datetime.datetime.now() - self.timer_start
-            hours = int(elapsed.total_seconds() // 3600)
-            minutes = int((elapsed.total_seconds() % 3600) // 60)
-            seconds = int(elapsed.total_seconds() % 60)
-            
-            time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            self.timer_label.config(text=time_str)
+    def stop_timer(self):
+        """停止计时"""
+        timer_id = self.selected_timer()
+        if timer_id is not None:
+            self.timer_engine.stop(timer_id)
+            self.update_timer()
             
-            self.timer_window.after(1000, self.update_timer)
+    def on_timer_event(self, event, timer, info):
+        """计时器引擎事件：记录专注时间并提醒"""
+        task_name = timer['task']
+        if event == 'segment':
+            self.focus_log.add(info[0], info[1], task_name, timer['tags'])
+        elif event == 'phase':
+            if info == FOCUS:
+                minutes = self.timer_engine.pomodoro['focus_minutes']
+                self.quick_add(f"⏱️ {task_name} - 用时 {minutes} 分钟")
+                self.show_notification(
+                    "🍅 番茄钟完成！",
+                    f"{PHASE_LABELS[timer['phase']]}{timer['duration'] // 60:.0f}分钟后继续加油！"
+                )
+            else:
+                self.show_notification("休息结束", f"开始第 {timer['cycle'] + 1} 个番茄钟: {task_name}")
+        elif event == 'stopped' and timer['kind'] == STOPWATCH:
+            # 记录时长（运行时间按单调时钟累计，不含暂停）
+            minutes = int(info / 60)
+            self.quick_add(f"⏱️ {task_name} - 用时 {minutes} 分钟")
+            self.show_notification("计时完成", f"{task_name} 用时 {minutes} 分钟")
             
-    def start_pomodoro(self):
-        """开始番茄钟"""
-        self.timer_task.delete(0, tk.END)
-        self.timer_task.insert(0, "番茄钟专注时间")
-        self.start_timer()
-        
-        # 25分钟后自动停止
-        self.timer_window.after(25 * 60 * 1000, self.pomodoro_complete)
-        
-    def pomodoro_complete(self):
-        """番茄钟完成"""
-        if self.timer_running:
-            self.stop_timer()
-            self.show_notification(
-                "🍅 番茄钟完成！",
-                "休息5分钟后继续加油！"
-            )
+    @staticmethod
+    def format_seconds(seconds):
+        seconds = int(seconds)
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+        
+    def update_timer(self):
+        """更新计时器显示（时间由引擎按单调时钟计算）"""
+        if getattr(self, 'timer_window', None) is None or not self.timer_window.winfo_exists():
+            return
+        engine = self.timer_engine
+        timers = engine.list_timers()
+        
+        ids = {str(timer['id']) for timer in timers}
+        for item in self.timer_tree.get_children():
+            if item not in ids:
+                self.timer_tree.delete(item)
+        for timer in timers:
+            remaining = engine.remaining(timer['id'])
+            shown = remaining if remaining is not None else engine.elapsed(timer['id'])
+            phase = PHASE_LABELS[timer['phase']] if timer['kind'] == POMODORO else "计时"
+            if not engine.is_running(timer['id']):
+                phase += " (暂停)"
+            values = (phase, self.format_seconds(shown))
+            item = str(timer['id'])
+            if self.timer_tree.exists(item):
+                self.timer_tree.item(item, values=values)
+            else:
+                self.timer_tree.insert('', END, iid=item, text=timer['task'], values=values)
+                
+        timer_id = self.selected_timer()
+        if timer_id is None:
+            self.timer_label.config(text="00:00:00")
+            self.timer_phase_label.config(text="")
+        else:
+            item = self.timer_tree.item(str(timer_id))
+            self.timer_label.config(text=item['values'][1])
+            self.timer_phase_label.config(text=f"{item['text']} · {item['values'][0]}")
             
     def create_tray_icon(self):
         """创建系统托盘图标"""
@@ -1137,6 +1854,7 @@ class WeeklyProgressTracker:
         # 在新线程中运行
         icon_thread = threading.Thread(target=self.icon.run, daemon=True)
         icon_thread.start()
+        self.update_tray_title()
         
     def show_reminder_settings(self):
         """显示提醒设置"""
@@ -1162,6 +1880,7 @@ class WeeklyProgressTracker:
         
     def quit_app(self):
         """退出应用"""
+        self.hourly.flush()
         self.icon.stop()
         self.root.quit()
         
@@ -1178,74 +1897,74 @@ class WeeklyProgressTracker:
         
     # 辅助方法
     def check_week_transition(self):
-        """检查周转换"""
+        """检查周转换（按日历周计算，跨多周时为空白周登记清单条目）"""
         today = datetime.date.today()
-        if today.weekday() == 0:  # 周一
-            last_check = datetime.datetime.strptime(self.config["last_check"], "%Y-%m-%d").date()
-            if last_check < today:
-                if os.path.exists(self.current_file):
-                    archive_name = f"week_{self.config['week_num']}_progress_{last_check}.txt"
-                    archive_path = os.path.join(self.archive_dir, archive_name)
-                    os.rename(self.current_file, archive_path)
-                    self.config["week_num"] += 1
-                    self.show_notification("新的一周", f"开始第 {self.config['week_num']} 周的记录")
+        self.weeks = WeekEngine.from_config(self.config, today)
+        week_num, archived, gaps = self.weeks.transition(
+            self.catalog, self.current_file, self.config['week_num'], today
+        )
+        if week_num != self.config['week_num']:
+            self.config['week_num'] = week_num
+            self.show_notification("新的一周", f"开始第 {week_num} 周的记录")
                     
         self.config["last_check"] = str(today)
         self.save_config()
         
+    def schedule_week_rollover(self):
+        """在下一个周一零点执行周转换"""
+        self.scheduler.at_datetime('week_rollover', self.weeks.next_boundary(), self.on_week_rollover)
+        
+    def on_week_rollover(self):
+        """运行中跨过周边界：保存、归档并切换到新一周"""
+        self.save_current_content()
+        self.check_week_transition()
+        if not os.path.exists(self.current_file):
+            self.create_week_file()
+        self.tag_index.sync_archives(self.catalog)
+        self.streak.sync(self.catalog, self.current_file)
+        self.hourly.build(self.analytics, self.current_file)
+        if self.day_matrix is not None:
+            self.day_matrix.sync_archives(self.analytics)
+        self.refresh_content()
+        self.schedule_week_rollover()
+        
+    def schedule_day_rollover(self):
+        """在下一个零点追加今日条目"""
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        self.scheduler.at_datetime('day_rollover', datetime.datetime.combine(tomorrow, datetime.time()), self.on_day_rollover)
+        
+    def on_day_rollover(self):
+        """运行中跨过零点：追加今日条目并通知订阅者（周一先完成周转换）"""
+        today = datetime.date.today()
+        _, sunday = self.weeks.week_range(self.config['week_num'])
+        if today > sunday:
+            self.on_week_rollover()
+        else:
+            self.save_current_content()
+        text = self.add_today_entry()
+        if text:
+            # 刚保存过，编辑器与文件一致，只需在末尾补上追加的部分
+            if self.inserter.busy or self.load_incomplete:
+                self.refresh_content()
+            else:
+                self.text_area.insert('end-1c', text)
+        self.events.publish(DAY_ROLLED, date=today, added=bool(text))
+        self.schedule_day_rollover()
+        
     def create_week_file(self):
-        """创建周文件"""
-        with open(self.current_file, 'w', encoding='utf-8') as f:
-            f.write(f"""═══════════════════════════════════════
-         📅 第 {self.config['week_num']} 周学习进度
-═══════════════════════════════════════
-
-【本周目标】
-- 
-
-【重要事项】 !!
-- 
-
-【待办清单】 (格式: [Due:MM/DD] #标签 事项)
-- 
-
-""")
+        """创建周文件（已存在时不覆盖，同时启动的另一个实例可能已经创建）"""
+        week_num = self.config['week_num']
+        create_week_file(self.current_file, self.week_template.render(
+            **template_values(datetime.date.today(), week_num, self.weeks.week_range(week_num))
+        ))
         self.add_today_entry()
         
     def add_today_entry(self):
-        """添加今日条目"""
+        """添加今日条目（按日期标题索引判断，已存在时不重复添加），返回追加的文本"""
         today = datetime.date.today()
-        weekday = today.strftime("%A")
-        
-        # 检查是否已存在
-        if os.path.exists(self.current_file):
-            with open(self.current_file, 'r', encoding='utf-8') as f:
-                if today.strftime("%Y-%m-%d") in f.read():
-                    return
-                    
-        with open(self.current_file, 'a', encoding='utf-8') as f:
-            f.write(f"""────────────────────────────────────
-📆 {today} ({weekday})
-
-【核心课程】
-□ 云计算 #课程
-□ AI #课程
-□ Advanced HCI #课程
-□ 社交计算 #课程
-
-【今日完成】
-- 
-
-【遗漏/新增】
-- 
-
-【明日计划】
-- 
-
-【备注/想法】
-
-
-""")
+        week_num = self.config['week_num']
+        text = render_day(self.day_template, today, week_num, self.weeks.week_range(week_num))
+        return text if self.day_index.ensure_day(today, text) else None
 
     def get_all_tasks(self):
         """获取所有任务"""
@@ -1274,12 +1993,7 @@ class WeeklyProgressTracker:
         """显示总结"""
         self.show_window()
         self.notebook.select(self.week_frame)
-        #添加安全检查
-        children = self.week_frame.winfo_children()
-        if children and hasattr(children[0], 'winfo_children'):
-            sub_children = children[0].winfo_children()
-            if sub_children:
-                self.update_week_overview(sub_children[0])
+        self.update_week_overview()
         
 
 if __name__ == "__main__":
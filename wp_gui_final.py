@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, simpledialog
+from tkinter import ttk, scrolledtext, messagebox, simpledialog, filedialog
 import pystray
 from PIL import Image, ImageDraw
 import threading
@@ -17,6 +17,22 @@ except ImportError:
     HAS_PLYER = False
     print("提示: 安装 plyer 可启用桌面通知功能: pip install plyer")
 
+from wp_tags import CURRENT_SOURCE
+from wp_editor import TextChangeHook, FindBar, SyntaxHighlighter, ChunkedInserter
+from wp_report import ReportMemo, file_version
+from wp_fold import DayWindow, FoldView, decode_text, DEFAULT_WINDOW_DAYS
+from wp_history import VersionHistory
+from wp_streak import HabitStreak, DEFAULT_TEMPLATE_LINES
+from wp_days import DayIndex, Template, render_day, template_values, create_week_file
+from wp_scheduler import Scheduler
+from wp_weeks import WeekEngine
+from wp_workspace import WorkspaceManager
+from wp_priority import PriorityQueue, task_priority, URGENT, IMPORTANT
+from wp_sync import SyncEngine, STATE_NAME as SYNC_STATE_NAME
+from wp_events import EventBus, SectionTracker, TASK_EVENTS, SECTION_EDITED, DAY_ROLLED
+from wp_timeline import WeekPages, TimelineView
+from wp_export import export_file, export_archive, FORMAT_LABELS
+
 # 设置控制台编码为UTF-8（Windows）
 if sys.platform == "win32":
     try:
@@ -26,6 +42,37 @@ if sys.platform == "win32":
     except:
         pass
 
+# 默认周/日模板（可在配置的 week_template / day_template 中自定义）
+WEEK_TEMPLATE = """═══════════════════════════════════════
+         第 {week_num} 周学习进度
+═══════════════════════════════════════
+
+【本周目标】
+- 
+
+【重要事项】
+- 
+
+【待办清单】
+- 
+
+"""
+
+DAY_TEMPLATE = """
+────────────────────────────────────
+{date} ({weekday_cn})
+
+【今日任务】
+□ 
+
+【学习记录】
+- 
+
+【备注想法】
+- 
+
+"""
+
 class WeeklyTracker:
     """周记应用 - 完全修复版本"""
     
@@ -39,9 +86,17 @@ class WeeklyTracker:
         self.icon = None
         self.context_menu = None
         self.is_closing = False
+        self.tag_filter = set()
+        self.task_bridge = None
+        
+        # 周记变化事件（任务列表、托盘等订阅增量变化）
+        self.events = EventBus()
         
         # 加载配置和初始化文件
         self.load_config()
+        self.load_templates()
+        self.workspaces = WorkspaceManager(self.config)
+        self.use_workspace()
         self.init_files()
         
         # 创建主窗口
@@ -53,9 +108,16 @@ class WeeklyTracker:
         # 创建系统托盘
         self.create_tray_icon()
         
+        # 待办变化后刷新任务列表和托盘提示（同一轮的变化只刷新一次）
+        self.events.subscribe_idle(TASK_EVENTS, self.root, lambda events: self.refresh_tasks())
+        
         # 启动提醒功能
         self.start_reminder_timer()
         
+        # 目录同步
+        self.sync_engine = None
+        self.schedule_sync()
+        
         # 初始隐藏主窗口
         self.root.withdraw()
         
@@ -71,6 +133,11 @@ class WeeklyTracker:
             self.root.geometry("1000x700")
             self.root.minsize(800, 600)
             
+            # 定时任务：窗口隐藏时暂停纯界面刷新
+            self.scheduler = Scheduler(self.root)
+            self.schedule_week_rollover()
+            self.schedule_day_rollover()
+            
             # 设置窗口图标（安全方式）
             self.setup_window_icon()
             
@@ -109,6 +176,11 @@ class WeeklyTracker:
             "theme": "clam",
             "font_size": 11,
             "auto_save": True,
+            "auto_backup": True,
+            "backup_interval_minutes": 60,  # 自动备份间隔（分钟）
+            "sync_dir": "",  # 共享同步文件夹，为空时不同步
+            "sync_interval_minutes": 10,  # 自动同步间隔（分钟），0 为只手动同步
+            "editor_window_days": DEFAULT_WINDOW_DAYS,  # 编辑器展开的最近天数，null 为载入整个文件
             "auto_startup": False,
             "reminder_enabled": True,
             "reminder_intervals": [9, 14, 18, 21],  # 提醒时间（小时）
@@ -128,6 +200,11 @@ class WeeklyTracker:
             print(f"配置加载错误: {e}")
             self.config = default_config
             
+    def load_templates(self):
+        """周/日模板（配置优先，缺省用内置模板），只编译一次"""
+        self.week_template = Template(self.config.get('week_template') or WEEK_TEMPLATE)
+        self.day_template = Template(self.config.get('day_template') or DAY_TEMPLATE)
+        
     def save_config(self):
         """保存配置"""
         try:
@@ -136,19 +213,69 @@ class WeeklyTracker:
         except Exception as e:
             print(f"配置保存错误: {e}")
             
+    def use_workspace(self):
+        """使用活动工作区的文件路径"""
+        self.workspace = self.workspaces.active
+        self.current_file = self.workspace.current_file
+        self.archive_dir = self.workspace.archive_dir
+        
     def init_files(self):
-        """初始化文件结构"""
+        """初始化文件结构（只加载活动工作区）"""
         try:
             # 创建归档目录
             if not os.path.exists(self.archive_dir):
                 os.makedirs(self.archive_dir)
             
+            # 归档清单
+            self.catalog = self.workspace.catalog
+            
             # 检查周转换
             self.check_week_transition()
             
+            # 标签索引（归档周只索引一次）
+            self.tag_index = self.workspace.tag_index
+            self.tag_index.sync_archives(self.catalog)
+            
+            # 待办优先级队列（随标签索引增量更新）
+            if getattr(self, 'task_queue', None):
+                self.task_queue.close()
+            week_start, _ = self.weeks.week_range(self.config['week_num'])
+            self.task_queue = PriorityQueue(self.tag_index, CURRENT_SOURCE, week_start)
+            
+            # 当前周任务变化转发到事件总线（切换工作区时换成新工作区的索引）
+            if self.task_bridge:
+                self.task_bridge[0].remove_listener(self.task_bridge[1])
+            self.task_bridge = (self.tag_index, self.events.bridge(self.tag_index, CURRENT_SOURCE))
+            
+            # 日期标题索引（判断今日记录段是否存在）
+            self.day_index = DayIndex(self.archive_dir, self.current_file)
+            
+            # 编辑窗口中各日记录段的位置（切换工作区时换成新文件的）
+            self.day_window = DayWindow(self.current_file, self.config.get('editor_window_days', DEFAULT_WINDOW_DAYS))
+            if getattr(self, 'fold_view', None):
+                self.fold_view.window = self.day_window
+            
             # 创建周文件
             if not os.path.exists(self.current_file):
                 self.create_week_file()
+                
+            # 连续记录天数
+            self.streak = HabitStreak(self.archive_dir, DEFAULT_TEMPLATE_LINES | self.day_template.static_lines())
+            self.streak.sync(self.catalog, self.current_file)
+            
+            # 版本历史
+            self.history = VersionHistory(self.workspace.root)
+            
+            # 日记录段摘要（保存时找出被编辑的段）
+            self.sections = SectionTracker()
+            
+            # 总结分段缓存（按当前周文件和归档清单的版本）
+            self.report_memo = ReportMemo()
+            
+            # 历史周记的读取缓存（切换工作区时换成新工作区的归档）
+            if getattr(self, 'week_pages', None):
+                self.week_pages.close()
+            self.week_pages = WeekPages(self.catalog)
         except Exception as e:
             print(f"文件初始化错误: {e}")
             
@@ -188,6 +315,19 @@ class WeeklyTracker:
             )
             title_label.pack(side=tk.LEFT, padx=10, pady=10)
             
+            # 工作区选择
+            self.workspace_var = tk.StringVar(value=self.workspace.name)
+            self.workspace_box = ttk.Combobox(
+                toolbar,
+                textvariable=self.workspace_var,
+                values=self.workspaces.names(),
+                state='readonly',
+                width=12
+            )
+            self.workspace_box.pack(side=tk.LEFT, padx=(10, 2))
+            self.workspace_box.bind('<<ComboboxSelected>>', lambda e: self.switch_workspace(self.workspace_var.get()))
+            ttk.Button(toolbar, text="➕", command=self.new_workspace, width=3).pack(side=tk.LEFT)
+            
             # 右侧按钮组
             button_frame = ttk.Frame(toolbar)
             button_frame.pack(side=tk.RIGHT, padx=10, pady=5)
@@ -196,6 +336,7 @@ class WeeklyTracker:
             buttons = [
                 ("📝 快记", self.quick_note),
                 ("✅ 任务", self.show_tasks),
+                ("📋 全部待办", self.show_pending_everywhere),
                 ("📊 总结", self.show_summary),
                 ("⚙️ 设置", self.show_settings)
             ]
@@ -252,6 +393,7 @@ class WeeklyTracker:
             ttk.Button(editor_toolbar, text="💾 保存", command=self.save_content, width=8).pack(side=tk.LEFT, padx=2)
             ttk.Button(editor_toolbar, text="🔄 刷新", command=self.refresh_content, width=8).pack(side=tk.LEFT, padx=2)
             ttk.Button(editor_toolbar, text="📋 模板", command=self.insert_template, width=8).pack(side=tk.LEFT, padx=2)
+            ttk.Button(editor_toolbar, text="🔍 查找", command=self.show_find_bar, width=8).pack(side=tk.LEFT, padx=2)
             
             # 右侧状态
             status_frame = ttk.Frame(editor_toolbar)
@@ -263,6 +405,10 @@ class WeeklyTracker:
             self.save_status_label = ttk.Label(status_frame, text="已保存", style='Status.TLabel')
             self.save_status_label.pack(side=tk.RIGHT, padx=5)
             
+            # 大段插入进度（插入时才显示）
+            self.insert_progress = ttk.Progressbar(status_frame, length=120, mode='determinate', maximum=100)
+            self.insert_cancel_button = ttk.Button(status_frame, text="取消", width=5)
+            
             # 文本区域
             text_frame = ttk.Frame(parent)
             text_frame.pack(fill=tk.BOTH, expand=True)
@@ -277,9 +423,22 @@ class WeeklyTracker:
             )
             self.text_area.pack(fill=tk.BOTH, expand=True)
             
+            # 文本变更钩子、查找栏和语法高亮
+            self.text_hook = TextChangeHook(self.text_area)
+            self.find_bar = FindBar(text_frame, self.text_area, self.text_hook)
+            self.highlighter = SyntaxHighlighter(self.text_area, self.text_hook)
+            self.inserter = ChunkedInserter(self.text_area, self.text_hook)
+            self.insert_cancel_button.config(command=self.inserter.cancel)
+            # 只载入今天和最近几天，较早的日记录段折叠为占位行（点击展开）
+            self.fold_view = FoldView(self.text_area, self.day_window, hook=self.text_hook)
+            # 同步时只比较编辑过的行
+            self.text_hook.add_listener(self.note_sync_change)
+            
             # 绑定事件
             self.text_area.bind('<KeyRelease>', self.on_text_change)
+            self.text_area.bind('<<Paste>>', lambda e: self.paste_text())
             self.text_area.bind('<Button-3>', self.show_context_menu)
+            self.text_area.bind('<Control-f>', lambda e: self.show_find_bar())
             
             # 创建右键菜单
             self.create_context_menu()
@@ -296,6 +455,8 @@ class WeeklyTracker:
             self.context_menu.add_separator()
             self.context_menu.add_command(label="📋 复制", command=self.copy_text)
             self.context_menu.add_command(label="📄 粘贴", command=self.paste_text)
+            self.context_menu.add_separator()
+            self.context_menu.add_command(label="📂 展开全部折叠", command=lambda: self.fold_view.expand_all())
         except Exception as e:
             print(f"创建右键菜单错误: {e}")
             
@@ -305,6 +466,10 @@ class WeeklyTracker:
             task_frame = ttk.LabelFrame(parent, text="✅ 待办任务", padding=10)
             task_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
             
+            # 标签筛选
+            self.tag_chip_frame = ttk.Frame(task_frame)
+            self.tag_chip_frame.pack(fill=tk.X, pady=(0, 5))
+            
             # 任务列表
             self.task_listbox = tk.Listbox(
                 task_frame,
@@ -337,6 +502,9 @@ class WeeklyTracker:
                 ("📝 时间戳", self.insert_timestamp),
                 ("📊 新周开始", self.new_week),
                 ("📤 导出记录", self.export_records),
+                ("🕘 版本历史", self.show_history),
+                ("📚 历史周记", self.show_timeline),
+                ("🔄 同步", self.sync_now),
                 ("🔧 打开文件夹", self.open_folder)
             ]
             
@@ -367,8 +535,8 @@ class WeeklyTracker:
             self.time_label = ttk.Label(status_content, text="", style='Status.TLabel')
             self.time_label.pack(side=tk.RIGHT)
             
-            # 启动时钟
-            self.update_clock()
+            # 启动时钟（窗口隐藏时暂停）
+            self.scheduler.every('clock', 1000, self.update_clock, align=True)
             
         except Exception as e:
             print(f"创建状态栏错误: {e}")
@@ -380,19 +548,32 @@ class WeeklyTracker:
             note = simpledialog.askstring("快速记录", "请输入要记录的内容：", parent=self.root)
             if note and note.strip():
                 timestamp = datetime.datetime.now().strftime("[%H:%M] ")
-                current_content = self.text_area.get(1.0, tk.END)
-                insertion_point = tk.END if current_content.strip() else 1.0
-                
-                if insertion_point == tk.END:
-                    self.text_area.insert(tk.END, f"\n{timestamp}{note.strip()}")
-                else:
-                    self.text_area.insert(1.0, f"{timestamp}{note.strip()}\n")
-                    
+                self.append_line(f"{timestamp}{note.strip()}")
                 self.update_status("已添加快速记录")
-                self.auto_save()
         except Exception as e:
             print(f"快速记录错误: {e}")
             
+    def append_line(self, line):
+        """追加一行：文件末尾落盘追加，编辑器末尾插入，不重读也不重写整个文件"""
+        self.day_index.appended(self.workspace.append_line(line))
+        self.tag_index.add_line(line)
+        if self.streak.add_day(datetime.date.today()):
+            self.streak.save()
+        self.insert_appended_line(line)
+        
+    def insert_appended_line(self, line):
+        """编辑器末尾插入已写入文件的一行（分片载入中则等载入完成）"""
+        try:
+            if self.inserter.busy:
+                self.root.after(100, lambda: self.insert_appended_line(line))
+                return
+            last_char = self.text_area.get('end-2c', 'end-1c')
+            prefix = "\n" if last_char not in ("", "\n") else ""
+            self.text_area.insert('end-1c', f"{prefix}{line}\n")
+            self.text_area.see('end-1c')
+        except Exception as e:
+            print(f"插入追加内容错误: {e}")
+            
     def show_tasks(self):
         """显示任务管理窗口"""
         try:
@@ -426,6 +607,75 @@ class WeeklyTracker:
         except Exception as e:
             print(f"显示任务错误: {e}")
             
+    def show_pending_everywhere(self):
+        """所有工作区的待办（读各工作区的待办索引）"""
+        try:
+            pending_window = tk.Toplevel(self.root)
+            pending_window.title("全部待办")
+            pending_window.geometry("600x400")
+            pending_window.transient(self.root)
+            
+            tree = ttk.Treeview(pending_window, columns=('workspace',), show='tree headings')
+            tree.heading('#0', text='任务')
+            tree.heading('workspace', text='工作区')
+            tree.column('workspace', width=120)
+            tree.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+            
+            groups = {}
+            for name, task in self.workspaces.pending_everywhere():
+                if name not in groups:
+                    groups[name] = tree.insert('', tk.END, text=f"📁 {name}", values=(name,), open=True)
+                tree.insert(groups[name], tk.END, text=task['line'], values=(name,))
+            if not groups:
+                tree.insert('', tk.END, text="暂无待办")
+                
+            def open_workspace(event=None):
+                selection = tree.selection()
+                if selection:
+                    name = tree.item(selection[0], 'values')
+                    if name and name[0] != self.workspace.name:
+                        self.switch_workspace(name[0])
+                        
+            tree.bind('<Double-1>', open_workspace)
+            ttk.Button(pending_window, text="关闭", command=pending_window.destroy).pack(pady=(0, 10))
+        except Exception as e:
+            print(f"显示全部待办错误: {e}")
+            
+    def new_workspace(self):
+        """新建工作区并切换过去"""
+        try:
+            name = simpledialog.askstring("新建工作区", "工作区名称（如课程或项目名）：", parent=self.root)
+            if not name:
+                return
+            try:
+                self.workspaces.create(name)
+            except ValueError as e:
+                messagebox.showerror("错误", str(e), parent=self.root)
+                return
+            self.workspace_box.config(values=self.workspaces.names())
+            self.switch_workspace(name.strip())
+        except Exception as e:
+            print(f"新建工作区错误: {e}")
+            
+    def switch_workspace(self, name):
+        """切换工作区：保存当前内容，换用目标工作区的文件和索引"""
+        try:
+            if name == self.workspace.name:
+                return
+            self.save_content()
+            self.workspaces.switch(name)
+            self.save_config()
+            self.use_workspace()
+            self.tag_filter.clear()
+            self.init_files()
+            self.refresh_content()
+            self.update_week_title()
+            self.schedule_week_rollover()
+            self.workspace_var.set(name)
+            self.update_status(f"已切换到工作区: {name}")
+        except Exception as e:
+            print(f"切换工作区错误: {e}")
+            
     def show_summary(self):
         """显示总结"""
         try:
@@ -438,10 +688,14 @@ class WeeklyTracker:
             text_widget = scrolledtext.ScrolledText(summary_window, wrap=tk.WORD, font=('Microsoft YaHei', 11))
             text_widget.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
             
-            # 生成总结
-            summary = self.generate_summary()
-            text_widget.insert(1.0, summary)
-            text_widget.config(state=tk.DISABLED)
+            def render(summary):
+                text_widget.config(state=tk.NORMAL)
+                text_widget.delete(1.0, tk.END)
+                text_widget.insert(1.0, summary)
+                text_widget.config(state=tk.DISABLED)
+                
+            # 先显示缓存的总结，周记有变化的段推迟到空闲时逐段重算
+            self.report_memo.show(summary_window, self.summary_sections(), self.assemble_summary, render)
             
         except Exception as e:
             print(f"显示总结错误: {e}")
@@ -504,6 +758,12 @@ class WeeklyTracker:
             reminder_times_var = tk.StringVar(value=",".join(map(str, self.config.get('reminder_intervals', [9, 14, 18, 21]))))
             ttk.Entry(reminder_frame, textvariable=reminder_times_var, width=30).pack(anchor=tk.W, pady=5)
             
+            ttk.Label(
+                reminder_frame,
+                text=f"最近一小时定时唤醒: {self.scheduler.wakeups_per_hour()} 次",
+                style='Status.TLabel'
+            ).pack(anchor=tk.W, pady=(10, 0))
+            
             # 按钮框架
             button_frame = ttk.Frame(scrollable_frame)
             button_frame.pack(fill=tk.X, padx=20, pady=20)
@@ -523,6 +783,7 @@ class WeeklyTracker:
                         self.config['reminder_intervals'] = [9, 14, 18, 21]
                     
                     self.save_config()
+                    self.start_reminder_timer()
                     
                     # 应用设置
                     if hasattr(self, 'text_area'):
@@ -555,8 +816,9 @@ class WeeklyTracker:
     def on_text_change(self, event):
         """文本变化事件"""
         try:
-            content = self.text_area.get(1.0, tk.END)
-            word_count = len(content.split())
+            if self.inserter.busy:
+                return
+            word_count = self.fold_view.word_count()
             self.word_count_label.config(text=f"字数: {word_count}")
             self.save_status_label.config(text="未保存")
         except Exception as e:
@@ -583,6 +845,14 @@ class WeeklyTracker:
         except Exception as e:
             print(f"标记完成错误: {e}")
             
+    def show_find_bar(self):
+        """显示查找栏"""
+        try:
+            self.find_bar.show()
+        except Exception as e:
+            print(f"显示查找栏错误: {e}")
+        return "break"
+            
     def insert_timestamp(self):
         """插入时间戳"""
         try:
@@ -625,12 +895,40 @@ class WeeklyTracker:
             print(f"复制文本错误: {e}")
             
     def paste_text(self):
-        """粘贴文本"""
+        """粘贴文本（大段内容分片插入，可取消）"""
         try:
+            if self.inserter.busy:
+                return "break"
             clipboard_content = self.root.clipboard_get()
-            self.text_area.insert(tk.INSERT, clipboard_content)
+            if self.text_area.tag_ranges(tk.SEL):
+                self.text_area.delete(tk.SEL_FIRST, tk.SEL_LAST)
+            self.insert_large(
+                tk.INSERT, clipboard_content, cancellable=True,
+                on_done=lambda completed: completed and self.on_text_change(None)
+            )
         except Exception as e:
             print(f"粘贴文本错误: {e}")
+        return "break"
+        
+    def insert_large(self, index, content, cancellable=False, on_done=None):
+        """分片插入文本，状态栏显示进度"""
+        def progress(inserted, total):
+            if not self.insert_progress.winfo_ismapped():
+                self.insert_progress.pack(side=tk.RIGHT, padx=5)
+                if cancellable:
+                    self.insert_cancel_button.pack(side=tk.RIGHT)
+            self.insert_progress['value'] = inserted * 100 / total
+            self.save_status_label.config(text=f"插入中 {inserted * 100 // total}%")
+            
+        def finished(completed):
+            self.insert_progress.pack_forget()
+            self.insert_cancel_button.pack_forget()
+            if not completed:
+                self.save_status_label.config(text="已取消")
+            if on_done:
+                on_done(completed)
+                
+        self.inserter.insert(index, content, on_done=finished, on_progress=progress)
             
     # 任务管理方法
     def add_task(self):
@@ -639,14 +937,7 @@ class WeeklyTracker:
             task = simpledialog.askstring("添加任务", "请输入任务内容：", parent=self.root)
             if task and task.strip():
                 timestamp = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M] ")
-                task_line = f"{timestamp}□ {task.strip()}\n"
-                
-                # 添加到文件
-                with open(self.current_file, 'a', encoding='utf-8') as f:
-                    f.write(task_line)
-                    
-                self.refresh_content()
-                self.refresh_tasks()
+                self.append_line(f"{timestamp}□ {task.strip()}")
                 self.update_status(f"已添加任务: {task}")
         except Exception as e:
             print(f"添加任务错误: {e}")
@@ -669,7 +960,6 @@ class WeeklyTracker:
                             f.write(content)
                             
                         self.refresh_content()
-                        self.refresh_tasks()
                         self.update_status("任务已完成")
         except Exception as e:
             print(f"完成任务错误: {e}")
@@ -678,12 +968,62 @@ class WeeklyTracker:
         """刷新任务列表"""
         try:
             self.task_listbox.delete(0, tk.END)
-            tasks = self.get_pending_tasks()
+            if self.tag_filter:
+                tasks = self.task_queue.rank(self.tag_index.filter(self.tag_filter, source=CURRENT_SOURCE, pending_only=True))
+            else:
+                tasks = self.task_queue.top(10)  # 未筛选时只显示优先级最高的10个
             for task in tasks:
-                self.task_listbox.insert(tk.END, task)
+                self.task_listbox.insert(tk.END, task['line'])
+                level = task_priority(task)
+                if level == URGENT:
+                    self.task_listbox.itemconfig(tk.END, foreground='#c62828')
+                elif level == IMPORTANT:
+                    self.task_listbox.itemconfig(tk.END, foreground='#e65100')
+            self.refresh_tag_chips()
+            self.update_tray_title()
         except Exception as e:
             print(f"刷新任务错误: {e}")
             
+    def update_tray_title(self):
+        """托盘提示显示优先级最高的待办"""
+        try:
+            if self.icon:
+                top = self.task_queue.top(1)
+                title = f"Weekly Tracker - 下一项: {top[0]['text']}" if top else "Weekly Tracker"
+                self.icon.title = title[:120]
+        except Exception as e:
+            print(f"更新托盘提示错误: {e}")
+            
+    def refresh_tag_chips(self):
+        """刷新标签筛选按钮"""
+        try:
+            for widget in self.tag_chip_frame.winfo_children():
+                widget.destroy()
+                
+            counts = self.tag_index.tag_counts(CURRENT_SOURCE)
+            tags = sorted(counts, key=lambda t: -counts[t])[:8]
+            tags += [t for t in sorted(self.tag_filter) if t not in tags]
+            
+            for tag in tags:
+                var = tk.BooleanVar(value=tag in self.tag_filter)
+                ttk.Checkbutton(
+                    self.tag_chip_frame,
+                    text=f"{tag} {counts.get(tag, 0)}",
+                    variable=var,
+                    style='Toolbutton',
+                    command=lambda t=tag, v=var: self.toggle_tag_filter(t, v.get())
+                ).pack(side=tk.LEFT, padx=1)
+        except Exception as e:
+            print(f"刷新标签筛选错误: {e}")
+            
+    def toggle_tag_filter(self, tag, selected):
+        """切换标签筛选"""
+        if selected:
+            self.tag_filter.add(tag)
+        else:
+            self.tag_filter.discard(tag)
+        self.refresh_tasks()
+            
     def get_all_tasks(self):
         """获取所有任务"""
         tasks = []
@@ -717,11 +1057,21 @@ class WeeklyTracker:
         """刷新内容"""
         try:
             if os.path.exists(self.current_file):
-                with open(self.current_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    self.text_area.delete(1.0, tk.END)
-                    self.text_area.insert(1.0, content)
-                self.save_status_label.config(text="已保存")
+                with open(self.current_file, 'rb') as f:
+                    data = f.read()
+                content = decode_text(data)
+                self.inserter.cancel()
+                loaded = lambda completed: self.save_status_label.config(text="已保存")
+                self.fold_view.render(
+                    self.day_window.plan(data),
+                    insert=lambda index, text: self.insert_large(index, text, on_done=loaded)
+                )
+                self.tag_index.update_source(CURRENT_SOURCE, content)
+                self.streak.update_current(content)
+                self.day_index.update(content)
+                self.workspace.record_pending(content)
+                self.publish_section_edits(content)
+                # 切换工作区时索引可能没有变化事件，列表直接重绘
                 self.refresh_tasks()
         except Exception as e:
             print(f"刷新内容错误: {e}")
@@ -729,14 +1079,47 @@ class WeeklyTracker:
     def save_content(self):
         """保存内容"""
         try:
-            content = self.text_area.get(1.0, tk.END)
+            if self.inserter.busy:
+                # 插入未完成时正文不完整，不写入文件
+                return
+            # 折叠段从文件中按位置取回原文，和编辑器中的内容拼成全文
+            content = self.fold_view.content()
             with open(self.current_file, 'w', encoding='utf-8') as f:
                 f.write(content)
+            self.fold_view.saved()
+            self.tag_index.update_source(CURRENT_SOURCE, content)
+            self.streak.update_current(content)
+            self.day_index.update(content)
+            self.workspace.record_pending(content)
+            self.publish_section_edits(content)
+            self.backup_content(content)
             self.save_status_label.config(text="已保存")
             self.update_status("内容已保存")
         except Exception as e:
             print(f"保存内容错误: {e}")
             
+    def publish_section_edits(self, content):
+        """通知订阅者哪些日记录段被编辑过（没有订阅者时不比较）"""
+        try:
+            if not self.events.has_subscribers(SECTION_EDITED):
+                return
+            for day, lineno in self.sections.update(content):
+                self.events.publish(SECTION_EDITED, day=day, lineno=lineno)
+        except Exception as e:
+            print(f"通知记录段变化错误: {e}")
+            
+    def backup_content(self, content, force=False):
+        """自动备份：按间隔保存一个历史版本，内容未变时不占空间"""
+        try:
+            if not self.config.get('auto_backup', True):
+                return
+            if force:
+                self.history.snapshot(content)
+            else:
+                self.history.snapshot_if_due(content, self.config.get('backup_interval_minutes', 60))
+        except Exception as e:
+            print(f"自动备份错误: {e}")
+            
     def auto_save(self):
         """自动保存"""
         try:
@@ -750,39 +1133,272 @@ class WeeklyTracker:
         try:
             result = messagebox.askyesno("新的一周", "确定要开始新的一周吗？当前内容将被归档。", parent=self.root)
             if result:
-                # 归档当前文件
-                if os.path.exists(self.current_file):
-                    archive_name = f"week_{self.config['week_num']}_{datetime.date.today()}.txt"
-                    archive_path = os.path.join(self.archive_dir, archive_name)
-                    
-                    import shutil
-                    shutil.copy2(self.current_file, archive_path)
+                # 经周次引擎归档当前文件，起始日期随之调整，下一个周一照常转换
+                self.save_content()
+                today = datetime.date.today()
+                week_num, archived, gaps = self.weeks.start_new_week(
+                    self.catalog, self.current_file, self.config['week_num'], today
+                )
+                if archived:
+                    self.tag_index.sync_archives(self.catalog)
+                    self.streak.sync(self.catalog, self.current_file)
                     
-                self.config['week_num'] += 1
+                self.config['week_num'] = week_num
+                self.config['start_date'] = str(self.weeks.start_date)
+                self.config['last_check'] = str(today)
                 self.save_config()
                 self.create_week_file()
                 self.refresh_content()
                 self.update_status(f"开始第 {self.config['week_num']} 周")
                 
                 # 更新标题
-                title_label = self.root.winfo_children()[0].winfo_children()[0].winfo_children()[0]
-                if hasattr(title_label, 'config'):
-                    title_label.config(text=f"第 {self.config['week_num']} 周记录")
+                self.update_week_title()
                     
         except Exception as e:
             print(f"新周开始错误: {e}")
             
     def export_records(self):
-        """导出记录"""
+        """导出记录：本周导出为所选格式，可同时批量导出全部归档周"""
         try:
-            export_file = f"weekly_export_{datetime.date.today()}.txt"
-            import shutil
-            shutil.copy2(self.current_file, export_file)
-            self.update_status(f"已导出到: {export_file}")
-            messagebox.showinfo("导出完成", f"记录已导出到: {export_file}", parent=self.root)
+            export_window = tk.Toplevel(self.root)
+            export_window.title("导出记录")
+            export_window.transient(self.root)
+            
+            frame = ttk.Frame(export_window, padding=15)
+            frame.pack(fill=tk.BOTH, expand=True)
+            
+            chosen = self.config.get('export_formats', list(FORMAT_LABELS))
+            format_vars = {}
+            for fmt, label in FORMAT_LABELS.items():
+                format_vars[fmt] = tk.BooleanVar(value=fmt in chosen)
+                ttk.Checkbutton(frame, text=label, variable=format_vars[fmt]).pack(anchor=tk.W)
+            archive_var = tk.BooleanVar(value=False)
+            ttk.Separator(frame, orient=tk.HORIZONTAL).pack(fill=tk.X, pady=8)
+            ttk.Checkbutton(frame, text="同时导出全部归档周（只导出有变化的周）", variable=archive_var).pack(anchor=tk.W)
+            
+            def start():
+                formats = [fmt for fmt, var in format_vars.items() if var.get()]
+                if not formats:
+                    return
+                out_dir = filedialog.askdirectory(
+                    title="选择导出文件夹", parent=export_window,
+                    initialdir=self.config.get('export_dir') or os.getcwd()
+                )
+                if not out_dir:
+                    return
+                self.config['export_dir'] = out_dir
+                self.config['export_formats'] = formats
+                self.save_config()
+                export_window.destroy()
+                self.export_to(out_dir, formats, archive_var.get())
+                
+            ttk.Button(frame, text="📤 导出", command=start).pack(fill=tk.X, pady=(10, 0))
         except Exception as e:
             print(f"导出记录错误: {e}")
             
+    def export_to(self, out_dir, formats, include_archive):
+        """导出本周；归档周在后台线程中批量导出（多进程），完成后在状态栏报告"""
+        try:
+            self.save_content()
+            week_num = self.config['week_num']
+            start, end = self.weeks.week_range(week_num)
+            export_file(self.current_file, out_dir, formats, {'week': week_num, 'start': str(start), 'end': str(end)})
+            self.update_status(f"本周已导出到: {out_dir}")
+            if not include_archive:
+                return
+            catalog = self.catalog
+            
+            def run():
+                try:
+                    result = export_archive(catalog, out_dir, formats)
+                except Exception as e:
+                    result = (0, 0, [str(e)])
+                self.root.after(0, lambda: finished(*result))
+                
+            def finished(exported, skipped, errors):
+                self.update_status(f"归档导出完成：导出 {exported} 周，未变化跳过 {skipped} 周")
+                if errors:
+                    messagebox.showerror("部分导出失败", "\n".join(errors), parent=self.root)
+                    
+            self.update_status("正在导出归档周...")
+            threading.Thread(target=run, daemon=True).start()
+        except Exception as e:
+            print(f"导出记录错误: {e}")
+            
+    def get_sync_engine(self):
+        """当前工作区当前周的同步引擎（换周或切换工作区后重新创建）"""
+        doc = f"{self.workspace.name}/week_{self.config['week_num']}"
+        if self.sync_engine is None or self.sync_engine.doc != doc:
+            state_path = os.path.join(self.archive_dir, SYNC_STATE_NAME)
+            self.sync_engine = SyncEngine(self.config['sync_dir'], doc, state_path)
+        return self.sync_engine
+        
+    def schedule_sync(self):
+        """按间隔自动同步（托盘待机时也运行）"""
+        try:
+            interval = self.config.get('sync_interval_minutes', 0)
+            if self.config.get('sync_dir') and interval > 0:
+                self.scheduler.every('sync', interval * 60 * 1000, lambda: self.sync_now(quiet=True), ui_only=False)
+            else:
+                self.scheduler.cancel('sync')
+        except Exception as e:
+            print(f"同步定时错误: {e}")
+            
+    def note_sync_change(self, start, removed, added):
+        """编辑器变更转给同步引擎（行号换算成全文行号，涉及折叠占位行时按范围未知处理）"""
+        try:
+            if self.sync_engine is None:
+                return
+            if start is not None:
+                if any(start <= line <= start + max(removed, added) for line in self.fold_view.fold_lines()):
+                    start = None
+                else:
+                    start = self.fold_view.file_line(start)
+            self.sync_engine.note_change(start, removed, added)
+        except Exception as e:
+            print(f"同步变更记录错误: {e}")
+            
+    def sync_now(self, quiet=False):
+        """与共享文件夹交换操作日志并合并"""
+        try:
+            if not self.config.get('sync_dir'):
+                if quiet:
+                    return
+                sync_dir = filedialog.askdirectory(title="选择共享同步文件夹", parent=self.root)
+                if not sync_dir:
+                    return
+                self.config['sync_dir'] = sync_dir
+                self.save_config()
+                self.schedule_sync()
+                return
+                
+            if self.inserter.busy:
+                return
+            content = self.fold_view.content('end-1c')
+            merged, sent, received = self.get_sync_engine().sync(content)
+            if merged != content:
+                with open(self.current_file, 'w', encoding='utf-8') as f:
+                    f.write(merged)
+                position = self.text_area.index(tk.INSERT)
+                self.refresh_content()
+                self.text_area.mark_set(tk.INSERT, position)
+                # 重新载入的就是合并后的文本
+                self.sync_engine.forget_changes()
+            self.update_status(f"同步完成：发送 {sent} 条修改，收到 {received} 条")
+        except Exception as e:
+            print(f"同步错误: {e}")
+            if not quiet:
+                messagebox.showerror("同步失败", str(e), parent=self.root)
+            
+    def show_history(self):
+        """版本历史：查看差异并恢复任意版本"""
+        try:
+            history_window = tk.Toplevel(self.root)
+            history_window.title("版本历史")
+            history_window.geometry("900x550")
+            history_window.transient(self.root)
+            
+            paned = ttk.PanedWindow(history_window, orient=tk.HORIZONTAL)
+            paned.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            
+            # 版本列表
+            list_frame = ttk.Frame(paned)
+            paned.add(list_frame, weight=1)
+            version_list = tk.Listbox(list_frame, font=('Microsoft YaHei', 10))
+            version_list.pack(fill=tk.BOTH, expand=True)
+            usage_label = ttk.Label(list_frame, style='Status.TLabel')
+            usage_label.pack(fill=tk.X, pady=(5, 0))
+            
+            # 差异视图
+            diff_view = scrolledtext.ScrolledText(paned, wrap=tk.NONE, font=('Consolas', 10))
+            paned.add(diff_view, weight=3)
+            diff_view.tag_configure('added', foreground='#2e7d32', background='#e8f5e9')
+            diff_view.tag_configure('removed', foreground='#c62828', background='#ffebee')
+            diff_view.tag_configure('hunk', foreground='#1565c0')
+            
+            versions = []
+            
+            def populate():
+                versions[:] = self.history.list_versions()
+                version_list.delete(0, tk.END)
+                for v in versions:
+                    stamp = datetime.datetime.fromtimestamp(v['time']).strftime("%Y-%m-%d %H:%M")
+                    version_list.insert(tk.END, f"{stamp}  ({v['size']} 字节)")
+                usage_label.config(text=f"共 {len(versions)} 个版本，占用 {self.history.disk_usage() // 1024} KB")
+                
+            def show_diff(event=None):
+                selection = version_list.curselection()
+                if not selection:
+                    return
+                version = versions[selection[0]]
+                current = self.fold_view.content()
+                diff_view.config(state=tk.NORMAL)
+                diff_view.delete(1.0, tk.END)
+                try:
+                    lines = self.history.diff(version['id'], current)
+                except ValueError as e:
+                    diff_view.insert(tk.END, f"无法读取该版本: {e}")
+                    diff_view.config(state=tk.DISABLED)
+                    return
+                if not lines:
+                    diff_view.insert(tk.END, "与当前内容相同")
+                for line in lines:
+                    if line.startswith('@@'):
+                        tag = 'hunk'
+                    elif line.startswith('+') and not line.startswith('+++'):
+                        tag = 'added'
+                    elif line.startswith('-') and not line.startswith('---'):
+                        tag = 'removed'
+                    else:
+                        tag = ()
+                    diff_view.insert(tk.END, line + "\n", tag)
+                diff_view.config(state=tk.DISABLED)
+                
+            def restore():
+                selection = version_list.curselection()
+                if not selection:
+                    return
+                version = versions[selection[0]]
+                if not messagebox.askyesno("恢复版本", "确定恢复到该版本吗？当前内容会先保存为一个版本。", parent=history_window):
+                    return
+                try:
+                    content = self.history.restore(version['id'])
+                except ValueError as e:
+                    messagebox.showerror("恢复失败", f"无法读取该版本: {e}", parent=history_window)
+                    return
+                self.history.snapshot(self.fold_view.content())
+                with open(self.current_file, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                self.refresh_content()
+                self.update_status("已恢复历史版本")
+                populate()
+                
+            version_list.bind('<<ListboxSelect>>', show_diff)
+            
+            button_frame = ttk.Frame(list_frame)
+            button_frame.pack(fill=tk.X, pady=(5, 0))
+            ttk.Button(button_frame, text="↩️ 恢复", command=restore).pack(side=tk.LEFT, padx=2, fill=tk.X, expand=True)
+            ttk.Button(button_frame, text="关闭", command=history_window.destroy).pack(side=tk.LEFT, padx=2, fill=tk.X, expand=True)
+            
+            populate()
+        except Exception as e:
+            print(f"显示版本历史错误: {e}")
+            
+    def show_timeline(self):
+        """历史周记：按周浏览归档，选中时才读取该周"""
+        try:
+            timeline_window = tk.Toplevel(self.root)
+            timeline_window.title("历史周记")
+            timeline_window.geometry("950x600")
+            timeline_window.transient(self.root)
+            
+            timeline = TimelineView(timeline_window, self.week_pages)
+            timeline.populate(self.catalog.list_weeks(include_gaps=True))
+            
+            ttk.Button(timeline_window, text="关闭", command=timeline_window.destroy).pack(pady=(0, 10))
+        except Exception as e:
+            print(f"显示历史周记错误: {e}")
+            
     def open_folder(self):
         """打开文件夹"""
         try:
@@ -797,28 +1413,50 @@ class WeeklyTracker:
             
     # 辅助方法
     def generate_summary(self):
-        """生成总结"""
+        """生成总结（各段按输入版本缓存，只重算周记变化后过期的段）"""
         try:
-            all_tasks = self.get_all_tasks()
-            total_tasks = len(all_tasks)
-            completed_tasks = len([t for t in all_tasks if '✓' in t])
-            completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-            
-            # 统计字数
-            if os.path.exists(self.current_file):
-                with open(self.current_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    word_count = len(content.split())
-            else:
-                word_count = 0
+            return self.report_memo.build(self.summary_sections(), self.assemble_summary)
+        except Exception as e:
+            print(f"生成总结错误: {e}")
+            return f"生成总结时出错: {e}"
             
-            return f"""
+    def summary_sections(self):
+        """总结各段 [(名称, 输入版本, 生成函数)]"""
+        doc = file_version(self.current_file)
+        return [
+            ('tasks', doc, self.summary_task_counts),
+            ('words', doc, self.summary_word_count),
+            ('streak', (doc, self.catalog.version, datetime.date.today()),
+             lambda: (self.streak.current(), self.streak.longest)),
+        ]
+        
+    def summary_task_counts(self):
+        """任务统计段 (总数, 已完成, 完成率)"""
+        all_tasks = self.get_all_tasks()
+        total_tasks = len(all_tasks)
+        completed_tasks = len([t for t in all_tasks if '✓' in t])
+        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+        return total_tasks, completed_tasks, completion_rate
+        
+    def summary_word_count(self):
+        """字数统计段"""
+        if not os.path.exists(self.current_file):
+            return 0
+        with open(self.current_file, 'r', encoding='utf-8') as f:
+            return len(f.read().split())
+            
+    def assemble_summary(self, values):
+        """把各段拼成总结文本"""
+        total_tasks, completed_tasks, completion_rate = values['tasks']
+        streak, longest = values['streak']
+        return f"""
 ╔═══════════════════════════════════════╗
 ║          第 {self.config['week_num']} 周总结报告              ║
 ╚═══════════════════════════════════════╝
 
 生成日期: {datetime.date.today()}
-总字数: {word_count}
+总字数: {values['words']}
+连续记录: {streak} 天 (最长 {longest} 天)
 
 任务统计:
 • 总任务数: {total_tasks}
@@ -838,10 +1476,7 @@ class WeeklyTracker:
 ═══════════════════════════════════════
 生成时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
-        except Exception as e:
-            print(f"生成总结错误: {e}")
-            return f"生成总结时出错: {e}"
-            
+        
     def update_status(self, message):
         """更新状态"""
         try:
@@ -857,7 +1492,6 @@ class WeeklyTracker:
             if hasattr(self, 'time_label') and not self.is_closing:
                 current_time = datetime.datetime.now().strftime("%H:%M:%S")
                 self.time_label.config(text=current_time)
-                self.root.after(1000, self.update_clock)
         except Exception as e:
             print(f"更新时钟错误: {e}")
             
@@ -916,71 +1550,97 @@ class WeeklyTracker:
             
     # 文件初始化方法
     def check_week_transition(self):
-        """检查周转换"""
+        """检查周转换（按日历周计算，跨多周时为空白周登记清单条目）"""
         try:
             today = datetime.date.today()
-            last_check = datetime.datetime.strptime(self.config.get("last_check", str(today)), "%Y-%m-%d").date()
-            
-            # 简化周转换逻辑
-            if (today - last_check).days > 7:
-                self.config["week_num"] += 1
+            self.weeks = WeekEngine.from_config(self.config, today)
+            week_num, archived, gaps = self.weeks.transition(
+                self.catalog, self.current_file, self.config['week_num'], today
+            )
+            if week_num != self.config['week_num']:
+                self.config['week_num'] = week_num
+                self.show_notification("新的一周", f"开始第 {week_num} 周的记录")
                 
             self.config["last_check"] = str(today)
             self.save_config()
         except Exception as e:
             print(f"检查周转换错误: {e}")
             
+    def schedule_week_rollover(self):
+        """在下一个周一零点执行周转换"""
+        try:
+            self.scheduler.at_datetime('week_rollover', self.weeks.next_boundary(), self.on_week_rollover)
+        except Exception as e:
+            print(f"周转换定时错误: {e}")
+            
+    def on_week_rollover(self):
+        """运行中跨过周边界：保存、归档并切换到新一周"""
+        try:
+            self.save_content()
+            self.check_week_transition()
+            if not os.path.exists(self.current_file):
+                self.create_week_file()
+            self.tag_index.sync_archives(self.catalog)
+            self.streak.sync(self.catalog, self.current_file)
+            self.refresh_content()
+            self.update_week_title()
+        except Exception as e:
+            print(f"周转换错误: {e}")
+        self.schedule_week_rollover()
+        
+    def schedule_day_rollover(self):
+        """在下一个零点追加今日条目"""
+        try:
+            tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+            self.scheduler.at_datetime('day_rollover', datetime.datetime.combine(tomorrow, datetime.time()), self.on_day_rollover)
+        except Exception as e:
+            print(f"跨天定时错误: {e}")
+            
+    def on_day_rollover(self):
+        """运行中跨过零点：追加今日条目并通知订阅者（周一先完成周转换）"""
+        try:
+            today = datetime.date.today()
+            _, sunday = self.weeks.week_range(self.config['week_num'])
+            if today > sunday:
+                self.on_week_rollover()
+            else:
+                self.save_content()
+            text = self.add_today_entry()
+            if text:
+                # 刚保存过，编辑器与文件一致，只需在末尾补上追加的部分
+                if self.inserter.busy:
+                    self.refresh_content()
+                else:
+                    self.text_area.insert('end-1c', text)
+            self.events.publish(DAY_ROLLED, date=today, added=bool(text))
+        except Exception as e:
+            print(f"跨天处理错误: {e}")
+        self.schedule_day_rollover()
+        
+    def update_week_title(self):
+        """更新标题中的周数"""
+        title_label = self.root.winfo_children()[0].winfo_children()[0].winfo_children()[0]
+        if hasattr(title_label, 'config'):
+            title_label.config(text=f"第 {self.config['week_num']} 周记录")
+            
     def create_week_file(self):
-        """创建周文件"""
+        """创建周文件（已存在时不覆盖，同时启动的另一个实例可能已经创建）"""
         try:
-            template = f"""═══════════════════════════════════════
-         第 {self.config['week_num']} 周学习进度
-═══════════════════════════════════════
-
-【本周目标】
-- 
-
-【重要事项】
-- 
-
-【待办清单】
-- 
-
-"""
-            with open(self.current_file, 'w', encoding='utf-8') as f:
-                f.write(template)
-                
+            week_num = self.config['week_num']
+            create_week_file(self.current_file, self.week_template.render(
+                **template_values(datetime.date.today(), week_num, self.weeks.week_range(week_num))
+            ))
             self.add_today_entry()
         except Exception as e:
             print(f"创建周文件错误: {e}")
             
     def add_today_entry(self):
-        """添加今日条目"""
+        """添加今日条目（按日期标题索引判断，已存在时不重复添加），返回追加的文本"""
         try:
             today = datetime.date.today()
-            weekday_names = {
-                0: "星期一", 1: "星期二", 2: "星期三", 3: "星期四",
-                4: "星期五", 5: "星期六", 6: "星期日"
-            }
-            weekday = weekday_names.get(today.weekday(), "")
-            
-            today_template = f"""
-────────────────────────────────────
-{today} ({weekday})
-
-【今日任务】
-□ 
-
-【学习记录】
-- 
-
-【备注想法】
-- 
-
-"""
-            
-            with open(self.current_file, 'a', encoding='utf-8') as f:
-                f.write(today_template)
+            week_num = self.config['week_num']
+            text = render_day(self.day_template, today, week_num, self.weeks.week_range(week_num))
+            return text if self.day_index.ensure_day(today, text) else None
         except Exception as e:
             print(f"添加今日条目错误: {e}")
             
@@ -1013,12 +1673,17 @@ class WeeklyTracker:
             
     # 提醒功能
     def start_reminder_timer(self):
-        """启动提醒定时器"""
+        """启动提醒定时器：在下一个提醒整点精确唤醒，不再每10分钟轮询"""
         try:
-            if self.config.get('reminder_enabled', True):
-                self.check_reminder()
-                # 每10分钟检查一次提醒
-                self.root.after(600000, self.start_reminder_timer)  # 10分钟 = 600000毫秒
+            self.check_reminder()
+            hours = sorted(h for h in self.config.get('reminder_intervals', [9, 14, 18, 21]) if 0 <= h <= 23)
+            if not self.config.get('reminder_enabled', True) or not hours:
+                self.scheduler.cancel('reminder')
+                return
+            now = datetime.datetime.now()
+            upcoming = [now.replace(hour=h, minute=0, second=0, microsecond=0) for h in hours]
+            upcoming = [t if t > now else t + datetime.timedelta(days=1) for t in upcoming]
+            self.scheduler.at_datetime('reminder', min(upcoming), self.start_reminder_timer)
         except Exception as e:
             print(f"提醒定时器错误: {e}")
             
@@ -1058,6 +1723,9 @@ class WeeklyTracker:
             
             import random
             message = random.choice(messages)
+            upcoming = self.task_queue.top(3)
+            if upcoming:
+                message = "接下来: " + "；".join(task['text'] for task in upcoming)
             
             if HAS_PLYER:
                 notification.notify(
@@ -1107,6 +1775,7 @@ class WeeklyTracker:
         try:
             self.is_closing = True
             self.save_content()
+            self.backup_content(self.fold_view.content(), force=True)
             if self.icon:
                 self.icon.stop()
             self.root.quit()
@@ -0,0 +1,494 @@
+"""版本历史 - 内容寻址分块存储，块按相近的旧块做差量压缩，版本清单按增量记录"""
+import os
+import re
+import json
+import zlib
+import time
+import struct
+import difflib
+import hashlib
+
+HISTORY_DIR = ".history"
+PACK_NAME = "chunks.pack"
+# 清理后重写的块文件按代数命名 (chunks.<代数>.pack)，由版本日志第一行 {"pack": 文件名} 指定
+PACK_GENERATION_RE = re.compile(r'^chunks(?:\.(\d+))?\.pack$')
+LOG_NAME = "versions.log"
+# 块文件开头的格式标记；没有标记的是旧格式，改名保留后重新开始
+PACK_MAGIC = b"WPH2"
+# 块记录头: sha1 摘要 + 差量基准块序号 (+1，0 表示完整压缩) + 压缩后长度
+CHUNK_HEADER = struct.Struct('>20sII')
+
+# 按行内容切块：行哈希低 5 位为 0 时断开（平均约 32 行一块），单块最多 8KB
+CHUNK_MASK = 0x1F
+MAX_CHUNK_BYTES = 8192
+# 差量链的最大长度，超过后整块压缩（读取一个块最多解压这么多次）
+MAX_DELTA_DEPTH = 64
+# 每隔多少个版本保存一次完整清单，恢复时最多回放这么多个增量
+KEYFRAME_INTERVAL = 32
+# 保留策略：最近 2 天全部保留，30 天内每小时一个，之后每天一个
+KEEP_ALL_SECONDS = 2 * 86400
+KEEP_HOURLY_SECONDS = 30 * 86400
+# 清单中版本数超过该值时执行保留策略
+PRUNE_THRESHOLD = 2000
+
+
+def split_chunks(data):
+    """按内容切块，插入或修改只影响附近的块"""
+    chunks = []
+    start = 0
+    size = 0
+    pos = 0
+    while pos < len(data):
+        end = data.find(b'\n', pos)
+        end = len(data) if end == -1 else end + 1
+        size += end - pos
+        if (zlib.crc32(data[pos:end]) & CHUNK_MASK) == 0 or size >= MAX_CHUNK_BYTES:
+            chunks.append(data[start:end])
+            start, size = end, 0
+        pos = end
+    if start < len(data):
+        chunks.append(data[start:])
+    return chunks
+
+
+def compress_chunk(chunk, base=None):
+    """压缩一个块；给出基准块时以它为预设字典，只改了几行的块压缩后只有几十字节"""
+    if base is None:
+        return zlib.compress(chunk, 9)
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, base)
+    return compressor.compress(chunk) + compressor.flush()
+
+
+def decompress_chunk(packed, base=None):
+    if base is None:
+        return zlib.decompress(packed)
+    decompressor = zlib.decompressobj(15, base)
+    return decompressor.decompress(packed) + decompressor.flush()
+
+
+class VersionHistory:
+    """周记文件的版本历史
+
+    文本切成按内容寻址的块，相同的块只存一份，追加到 chunks.pack；新块以上一版本
+    同一位置被替换的块为字典压缩（差量）。块在块文件中按序号引用，每个版本只记录
+    相对上一版本的块序号列表增量，每 KEYFRAME_INTERVAL 个版本存一次完整列表。
+    写到一半中断时，加载时把块文件截断到最后一个完整的块，版本日志去掉不完整的行。
+
+    清理时块序号会变：新块文件以下一代的文件名写完，再替换版本日志（第一行指向新块文件），
+    最后删除旧块文件。任一步中断，日志和它指向的块文件总是配套的，多余的块文件下次加载时删除。
+    """
+
+    def __init__(self, base_dir=".", history_dir=HISTORY_DIR):
+        self.dir = os.path.join(base_dir, history_dir)
+        self.pack_path = os.path.join(self.dir, PACK_NAME)
+        self.log_path = os.path.join(self.dir, LOG_NAME)
+        # 版本日志第一行的块文件名记录（旧日志没有这一行，使用 PACK_NAME）
+        self.log_header = None
+        # 摘要 -> 序号；序号 -> (摘要, 偏移, 长度, 基准序号或 None, 差量深度)
+        self.chunks = {}
+        self.records = []
+        self.versions = []
+        self._manifest_cache = {}
+        self.load()
+
+    def load(self):
+        """扫描块文件头重建块索引，读取版本日志（中断留下的不完整部分截掉）"""
+        self.chunks, self.records, self.versions = {}, [], []
+        try:
+            self._read_log_header()
+            if os.path.exists(self.pack_path):
+                self._load_pack()
+            if os.path.exists(self.log_path):
+                self._load_log()
+            self._remove_stale_packs()
+        except (OSError, ValueError) as e:
+            print(f"读取版本历史错误: {e}")
+            self.chunks, self.records, self.versions = {}, [], []
+
+    def _read_log_header(self):
+        """版本日志第一行是 {"pack": 文件名} 时，按它确定当前的块文件"""
+        self.log_header = None
+        self.pack_path = os.path.join(self.dir, PACK_NAME)
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'rb') as f:
+            first = f.readline()
+        if not first.endswith(b"\n"):
+            return
+        try:
+            header = json.loads(first)
+        except ValueError:
+            return
+        if isinstance(header, dict) and 'pack' in header and PACK_GENERATION_RE.match(header['pack']):
+            self.log_header = header
+            self.pack_path = os.path.join(self.dir, header['pack'])
+
+    def _remove_stale_packs(self):
+        """删除清理中断留下的块文件（没写完的下一代，或已被替换的上一代）"""
+        current = os.path.basename(self.pack_path)
+        for name in os.listdir(self.dir) if os.path.isdir(self.dir) else ():
+            if name != current and PACK_GENERATION_RE.match(name):
+                os.remove(os.path.join(self.dir, name))
+
+    def _next_pack_path(self):
+        match = PACK_GENERATION_RE.match(os.path.basename(self.pack_path))
+        generation = int(match.group(1) or 0) if match else 0
+        return os.path.join(self.dir, f"chunks.{generation + 1}.pack")
+
+    def _load_pack(self):
+        size = os.path.getsize(self.pack_path)
+        with open(self.pack_path, 'rb') as f:
+            if f.read(len(PACK_MAGIC)) != PACK_MAGIC:
+                self._retire_old_format()
+                return
+            offset = len(PACK_MAGIC)
+            while offset + CHUNK_HEADER.size <= size:
+                digest, base, length = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+                end = offset + CHUNK_HEADER.size + length
+                if end > size or base > len(self.records):
+                    break
+                base = base - 1 if base else None
+                depth = self.records[base][4] + 1 if base is not None else 0
+                self.chunks[digest.hex()] = len(self.records)
+                self.records.append((digest.hex(), offset + CHUNK_HEADER.size, length, base, depth))
+                offset = end
+                f.seek(offset)
+        if offset < size:
+            # 最后一个块没写完：截掉，免得之后的版本去重到损坏的块上
+            print(f"版本历史块文件不完整，已截断 {size - offset} 字节")
+            with open(self.pack_path, 'r+b') as f:
+                f.truncate(offset)
+
+    def _retire_old_format(self):
+        """旧格式的历史改名保留，不再读取"""
+        print("版本历史为旧格式，已改名保留为 *.old，重新开始记录")
+        for path in (self.pack_path, self.log_path):
+            if os.path.exists(path):
+                os.replace(path, path + ".old")
+
+    def _load_log(self):
+        valid = 0
+        truncated = False
+        with open(self.log_path, 'rb') as f:
+            if self.log_header is not None:
+                valid = len(f.readline())
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    truncated = True
+                    break
+                if raw.strip():
+                    try:
+                        entry = json.loads(raw)
+                    except ValueError:
+                        truncated = True
+                        break
+                    if not self._entry_valid(entry):
+                        truncated = True
+                        break
+                    self.versions.append(entry)
+                valid += len(raw)
+        if truncated:
+            print(f"版本历史日志不完整，保留前 {len(self.versions)} 个版本")
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(valid)
+
+    def _entry_valid(self, entry):
+        """版本引用的块都在块文件中，且增量前面有完整清单"""
+        if 'keyframe' in entry:
+            refs = entry['keyframe']
+        elif self.versions and 'delta' in entry:
+            refs = [n for op in entry['delta'] if op[0] == 'a' for n in op[1]]
+        else:
+            return False
+        return all(0 <= n < len(self.records) for n in refs)
+
+    def _append_log(self, entry):
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_log(self, pack_path):
+        """重写版本日志，第一行指向 pack_path（写完并落盘后才替换）"""
+        header = {'pack': os.path.basename(pack_path)}
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header) + "\n")
+            for entry in self.versions:
+                f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_path)
+        self.log_header = header
+
+    # 块存储
+    def _store_chunks(self, chunks, previous):
+        """写入新块，返回块序号列表
+
+        previous 是上一版本的块序号列表；新块以它在上一版本中替换掉的块为差量基准。
+        """
+        keys = [hashlib.sha1(chunk).hexdigest() for chunk in chunks]
+        old_keys = [self.records[n][0] for n in previous]
+        bases = {}
+        matcher = difflib.SequenceMatcher(None, old_keys, keys, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal' or not previous:
+                continue
+            for j in range(j1, j2):
+                i = min(i1 + (j - j1), i2 - 1) if i2 > i1 else min(i1, len(previous) - 1)
+                bases[j] = previous[i]
+
+        new = [(j, key) for j, key in enumerate(keys) if key not in self.chunks]
+        if new:
+            if not os.path.exists(self.pack_path) or os.path.getsize(self.pack_path) == 0:
+                with open(self.pack_path, 'wb') as f:
+                    f.write(PACK_MAGIC)
+            base_cache = {}
+            with open(self.pack_path, 'ab') as f:
+                offset = f.tell()
+                for j, key in new:
+                    if key in self.chunks:
+                        # 同一版本中重复的块
+                        continue
+                    base = bases.get(j)
+                    if base is not None and self.records[base][4] >= MAX_DELTA_DEPTH:
+                        base = None
+                    base_data = self._read_chunk(base, base_cache) if base is not None else None
+                    packed = compress_chunk(chunks[j], base_data)
+                    f.write(CHUNK_HEADER.pack(bytes.fromhex(key), base + 1 if base is not None else 0, len(packed)))
+                    f.write(packed)
+                    offset += CHUNK_HEADER.size
+                    depth = self.records[base][4] + 1 if base is not None else 0
+                    self.chunks[key] = len(self.records)
+                    self.records.append((key, offset, len(packed), base, depth))
+                    offset += len(packed)
+                f.flush()
+                os.fsync(f.fileno())
+        return [self.chunks[key] for key in keys]
+
+    def _read_chunk(self, number, cache, f=None):
+        """读取并解压一个块（沿差量链先解出基准块）"""
+        if number in cache:
+            return cache[number]
+        if f is None:
+            with open(self.pack_path, 'rb') as f:
+                return self._read_chunk(number, cache, f)
+        _, offset, length, base, _ = self.records[number]
+        base_data = self._read_chunk(base, cache, f) if base is not None else None
+        f.seek(offset)
+        data = decompress_chunk(f.read(length), base_data)
+        cache[number] = data
+        return data
+
+    def _read_chunks(self, numbers):
+        cache = {}
+        with open(self.pack_path, 'rb') as f:
+            return b''.join(self._read_chunk(n, cache, f) for n in numbers)
+
+    # 版本清单
+    def _manifest(self, index):
+        """第 index 个版本的完整块序号列表（从最近的完整清单回放增量）"""
+        cached = self._manifest_cache.get(index)
+        if cached is not None:
+            return cached
+        start = index
+        while 'keyframe' not in self.versions[start]:
+            start -= 1
+        numbers = list(self.versions[start]['keyframe'])
+        for i in range(start + 1, index + 1):
+            numbers = self._apply_delta(numbers, self.versions[i]['delta'])
+        self._manifest_cache = {index: numbers}
+        return numbers
+
+    @staticmethod
+    def _make_delta(old, new):
+        """块列表增量: ["c", 起点, 数量] 复制旧列表片段，["a", [序号...]] 新增"""
+        ops = []
+        matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                ops.append(['c', i1, i2 - i1])
+            elif j2 > j1:
+                ops.append(['a', new[j1:j2]])
+        return ops
+
+    @staticmethod
+    def _apply_delta(old, ops):
+        numbers = []
+        for op in ops:
+            if op[0] == 'c':
+                numbers.extend(old[op[1]:op[1] + op[2]])
+            else:
+                numbers.extend(op[1])
+        return numbers
+
+    def _append_version(self, numbers, timestamp, size, digest):
+        entry = {'id': (self.versions[-1]['id'] + 1) if self.versions else 1,
+                 'time': timestamp, 'size': size, 'sha1': digest}
+        since_keyframe = 0
+        for version in reversed(self.versions):
+            if 'keyframe' in version:
+                break
+            since_keyframe += 1
+        if not self.versions or since_keyframe + 1 >= KEYFRAME_INTERVAL:
+            entry['keyframe'] = numbers
+        else:
+            entry['delta'] = self._make_delta(self._manifest(len(self.versions) - 1), numbers)
+        self.versions.append(entry)
+        self._manifest_cache = {len(self.versions) - 1: numbers}
+
+    # 对外接口
+    def snapshot(self, content, timestamp=None):
+        """保存一个版本，内容与最新版本相同时跳过，返回版本号或 None"""
+        data = content.encode('utf-8')
+        # 只用来跳过与上一版本相同的内容，64 位足够
+        digest = hashlib.sha1(data).hexdigest()[:16]
+        if self.versions and self.versions[-1]['sha1'] == digest:
+            return None
+        if not os.path.exists(self.dir):
+            os.makedirs(self.dir)
+        previous = self._manifest(len(self.versions) - 1) if self.versions else []
+        numbers = self._store_chunks(split_chunks(data), previous)
+        self._append_version(numbers, int(timestamp or time.time()), len(data), digest)
+        self._append_log(self.versions[-1])
+        if len(self.versions) > PRUNE_THRESHOLD:
+            self.prune()
+        return self.versions[-1]['id']
+
+    def snapshot_if_due(self, content, interval_minutes, now=None):
+        """距上次快照超过间隔时才保存，用于保存时的自动备份"""
+        now = now or time.time()
+        if now - self.last_time() < interval_minutes * 60:
+            return None
+        return self.snapshot(content, now)
+
+    def last_time(self):
+        """最新版本的时间戳"""
+        return self.versions[-1]['time'] if self.versions else 0
+
+    def list_versions(self):
+        """所有版本 (新到旧)"""
+        return [{'id': v['id'], 'time': v['time'], 'size': v['size']} for v in reversed(self.versions)]
+
+    def _position(self, version_id):
+        for i in range(len(self.versions) - 1, -1, -1):
+            if self.versions[i]['id'] == version_id:
+                return i
+        raise KeyError(version_id)
+
+    def restore(self, version_id):
+        """取出某个版本的内容；与保存时的哈希不符时抛出 ValueError（历史已损坏）"""
+        index = self._position(version_id)
+        version = self.versions[index]
+        data = self._read_chunks(self._manifest(index))
+        if hashlib.sha1(data).hexdigest()[:len(version['sha1'])] != version['sha1']:
+            raise ValueError(f"版本 {version_id} 的内容校验失败")
+        return data.decode('utf-8')
+
+    def restore_at(self, timestamp):
+        """取出某一时刻的内容（该时刻之前最新的版本），没有则返回 None"""
+        candidates = [v for v in self.versions if v['time'] <= timestamp]
+        if not candidates:
+            return None
+        return self.restore(candidates[-1]['id'])
+
+    def diff(self, version_id, other):
+        """某个版本与另一版本号或一段文本的统一差异"""
+        old = self.restore(version_id)
+        new = self.restore(other) if isinstance(other, int) else other
+        return list(difflib.unified_diff(
+            old.splitlines(), new.splitlines(),
+            fromfile=f"版本 {version_id}",
+            tofile=f"版本 {other}" if isinstance(other, int) else "当前",
+            lineterm=''
+        ))
+
+    def prune(self, now=None):
+        """按保留策略清理旧版本，并回收不再引用的块"""
+        now = now or time.time()
+        manifests = [self._manifest(i) for i in range(len(self.versions))]
+        kept = []
+        seen_buckets = set()
+        for version, numbers in reversed(list(zip(self.versions, manifests))):
+            age = now - version['time']
+            if age <= KEEP_ALL_SECONDS:
+                bucket = None
+            elif age <= KEEP_HOURLY_SECONDS:
+                bucket = ('h', int(version['time'] // 3600))
+            else:
+                bucket = ('d', int(version['time'] // 86400))
+            if bucket is not None:
+                if bucket in seen_buckets:
+                    continue
+                seen_buckets.add(bucket)
+            kept.append((version, numbers))
+        kept.reverse()
+
+        # 先把保留的块写成下一代块文件（序号会变），再按新序号重新编码增量链，
+        # 日志替换完成后才切换到新块文件并删除旧的
+        new_pack, records, renumber = self.compact({n for _, numbers in kept for n in numbers})
+        if new_pack is None:
+            return
+        try:
+            self.versions = []
+            self._manifest_cache = {}
+            for version, numbers in kept:
+                self._append_version([renumber[n] for n in numbers], version['time'], version['size'], version['sha1'])
+                self.versions[-1]['id'] = version['id']
+            self._rewrite_log(new_pack)
+        except Exception:
+            # 日志没有替换：仍按旧块文件和旧日志重新加载（新块文件在加载时删除）
+            self.load()
+            raise
+        old_pack, self.pack_path = self.pack_path, new_pack
+        self.records = records
+        self.chunks = {record[0]: n for n, record in enumerate(records)}
+        try:
+            os.remove(old_pack)
+        except OSError as e:
+            print(f"删除旧版本块文件错误: {e}")
+
+    def compact(self, live):
+        """把仍被引用的块写成下一代块文件，返回 (新块文件路径, 新块记录, {旧序号: 新序号})
+
+        差量基准已不再被引用的块改以差量链上最近的仍保留的块为基准重新压缩（没有则整块压缩），
+        被清理掉的版本不会因为差量链而继续占用空间。当前块文件和索引不变，由调用方在
+        版本日志改为指向新块文件之后切换；没有块文件时返回 (None, [], {})。
+        """
+        renumber = {}
+        if not os.path.exists(self.pack_path):
+            return None, [], renumber
+        new_pack = self._next_pack_path()
+        records = []
+        cache = {}
+        with open(self.pack_path, 'rb') as src, open(new_pack, 'wb') as dst:
+            dst.write(PACK_MAGIC)
+            # 基准块的序号总比引用它的块小，按旧序号顺序写出即可
+            for number in sorted(live):
+                key, offset, length, base, _ = self.records[number]
+                ancestor = base
+                while ancestor is not None and ancestor not in live:
+                    ancestor = self.records[ancestor][3]
+                if ancestor == base:
+                    src.seek(offset)
+                    packed = src.read(length)
+                else:
+                    data = self._read_chunk(number, cache, src)
+                    packed = compress_chunk(data, self._read_chunk(ancestor, cache, src) if ancestor is not None else None)
+                new_base = renumber[ancestor] if ancestor is not None else None
+                depth = records[new_base][4] + 1 if new_base is not None else 0
+                dst.write(CHUNK_HEADER.pack(bytes.fromhex(key), new_base + 1 if new_base is not None else 0, len(packed)))
+                renumber[number] = len(records)
+                records.append((key, dst.tell(), len(packed), new_base, depth))
+                dst.write(packed)
+            dst.flush()
+            os.fsync(dst.fileno())
+        return new_pack, records, renumber
+
+    def disk_usage(self):
+        """历史占用的磁盘字节数"""
+        total = 0
+        for path in (self.pack_path, self.log_path):
+            if os.path.exists(path):
+                total += os.path.getsize(path)
+        return total
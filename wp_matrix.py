@@ -0,0 +1,172 @@
+"""按天统计矩阵与贡献热力图"""
+import os
+import datetime
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+    print("提示: 安装 numpy 可启用日历热力图: pip install numpy")
+
+MATRIX_NAME = ".day_matrix.npz"
+# 列顺序: 新建任务、完成任务、快速记录、专注分钟
+METRICS = ('created', 'completed', 'notes', 'focus')
+METRIC_LABELS = {'created': "新建", 'completed': "完成", 'notes': "快记", 'focus': "专注"}
+
+# GitHub 风格配色（0 级为空白）
+HEATMAP_COLORS = [
+    (235, 237, 240),
+    (155, 233, 168),
+    (64, 196, 99),
+    (48, 161, 78),
+    (33, 110, 57),
+]
+
+
+class DayMatrix:
+    """天 × 指标 的紧凑数组
+
+    已结束的天写入数组并持久化；归档周按内容哈希只合并一次，
+    当前周只覆盖今天之前的几行，今天的数据实时叠加，不写入文件。
+    """
+
+    def __init__(self, archive_dir, matrix_name=MATRIX_NAME):
+        self.path = os.path.join(archive_dir, matrix_name)
+        self.origin = None
+        self.data = np.zeros((0, len(METRICS)), dtype=np.int32)
+        self.merged = set()
+        self.live_date = None
+        self.live_row = np.zeros(len(METRICS), dtype=np.int32)
+        self.load()
+
+    def load(self):
+        """加载已保存的矩阵"""
+        try:
+            if os.path.exists(self.path):
+                with np.load(self.path) as saved:
+                    self.data = saved['data'].astype(np.int32)
+                    origin = int(saved['origin'])
+                    self.origin = datetime.date.fromordinal(origin) if origin else None
+                    self.merged = set(saved['merged'].tolist())
+        except (OSError, ValueError, KeyError) as e:
+            print(f"读取统计矩阵错误: {e}")
+            self.origin = None
+            self.data = np.zeros((0, len(METRICS)), dtype=np.int32)
+            self.merged = set()
+
+    def save(self):
+        """保存矩阵"""
+        tmp_path = self.path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            data=self.data,
+            origin=np.int64(self.origin.toordinal() if self.origin else 0),
+            merged=np.array(sorted(self.merged), dtype=str),
+        )
+        os.replace(tmp_path, self.path)
+
+    def _row_index(self, date):
+        """日期对应的行号，必要时扩展数组"""
+        if self.origin is None:
+            self.origin = date
+        if date < self.origin:
+            shift = (self.origin - date).days
+            self.data = np.vstack([np.zeros((shift, len(METRICS)), dtype=np.int32), self.data])
+            self.origin = date
+        index = (date - self.origin).days
+        if index >= len(self.data):
+            grow = max(index + 1 - len(self.data), 64)
+            self.data = np.vstack([self.data, np.zeros((grow, len(METRICS)), dtype=np.int32)])
+        return index
+
+    def _write_days(self, days, before=None):
+        """把 analyze_text 的按天统计写入数组，返回有变化的行数"""
+        changed = 0
+        for date_str, entry in days.items():
+            date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+            if before is not None and date >= before:
+                continue
+            row = [entry.get(m, 0) for m in METRICS]
+            index = self._row_index(date)
+            if self.data[index].tolist() != row:
+                self.data[index] = row
+                changed += 1
+        return changed
+
+    def sync_archives(self, analytics):
+        """合并新归档的周（按内容哈希只合并一次），归档变化后调用"""
+        changed = False
+        for week, stats in analytics.archived_stats().items():
+            sha1 = analytics.catalog.get_week(week)['sha1']
+            if sha1 not in self.merged:
+                self._write_days(stats['days'])
+                self.merged.add(sha1)
+                changed = True
+        if changed:
+            self.save()
+
+    def update_current(self, days, today=None):
+        """写入当前周已结束的天（days 为按天统计），今天的数据只作为实时行"""
+        today = today or datetime.date.today()
+        changed = self._write_days(days, before=today)
+        entry = days.get(str(today), {})
+        self.live_date = today
+        self.live_row = np.array([entry.get(m, 0) for m in METRICS], dtype=np.int32)
+        if changed:
+            self.save()
+
+    def window(self, end=None, days=371):
+        """返回截至 end 的最近 days 天数据 (days, 指标)，包含今天的实时行"""
+        end = end or self.live_date or datetime.date.today()
+        start = end - datetime.timedelta(days=days - 1)
+        result = np.zeros((days, len(METRICS)), dtype=np.int32)
+        if self.origin is not None and len(self.data):
+            lo = (start - self.origin).days
+            hi = (end - self.origin).days + 1
+            src_lo, src_hi = max(lo, 0), min(hi, len(self.data))
+            if src_lo < src_hi:
+                result[src_lo - lo:src_hi - lo] = self.data[src_lo:src_hi]
+        if self.live_date and start <= self.live_date <= end:
+            result[(self.live_date - start).days] = self.live_row
+        return result
+
+    def day(self, date):
+        """单日统计 {指标: 数值}"""
+        row = self.window(end=date, days=1)[0]
+        return dict(zip(METRICS, row.tolist()))
+
+    def totals(self, start, end):
+        """日期范围内各指标合计"""
+        days = (end - start).days + 1
+        return dict(zip(METRICS, self.window(end=end, days=days).sum(axis=0).tolist()))
+
+
+def render_heatmap(matrix, metric='completed', weeks=53, end=None, cell=11, gap=2):
+    """渲染 GitHub 风格贡献热力图，返回 PIL Image（列为周，行为周一到周日）"""
+    from PIL import Image
+
+    end = end or matrix.live_date or datetime.date.today()
+    # 最后一列补齐到周日
+    last = end + datetime.timedelta(days=6 - end.weekday())
+    values = matrix.window(end=last, days=weeks * 7)[:, METRICS.index(metric)]
+    future = (last - end).days
+    if future:
+        values[-future:] = 0
+
+    # 按非零值的分位数分 4 级
+    levels = np.zeros(values.shape, dtype=np.int8)
+    nonzero = values[values > 0]
+    if nonzero.size:
+        bounds = np.percentile(nonzero, [25, 50, 75])
+        levels = np.where(values > 0, 1 + np.searchsorted(bounds, values, side='left'), 0).astype(np.int8)
+        levels = np.minimum(levels, len(HEATMAP_COLORS) - 1)
+
+    grid = levels.reshape(weeks, 7).T
+    palette = np.array(HEATMAP_COLORS, dtype=np.uint8)
+    pitch = cell + gap
+    pixels = np.repeat(np.repeat(palette[grid], pitch, axis=0), pitch, axis=1)
+    # 每格右侧和下方留白
+    mask = (np.arange(pitch * 7) % pitch < cell)[:, None] & (np.arange(pitch * weeks) % pitch < cell)[None, :]
+    pixels[~mask] = 255
+    return Image.fromarray(pixels, 'RGB')
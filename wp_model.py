@@ -0,0 +1,139 @@
+"""周记文本解析 - 供归档目录、统计和索引共用"""
+import re
+import hashlib
+import datetime
+
+# 日期标题: "📆 2025-08-05 (Tuesday)" 或 "2025-08-14 (星期四)"
+DAY_HEADER_RE = re.compile(r'^(?:📆\s*)?(\d{4}-\d{2}-\d{2})\s*\(([^)]*)\)\s*$')
+# 行首时间戳: "[2025-08-05 15:54] ..."
+TIMESTAMP_RE = re.compile(r'^\[(\d{4}-\d{2}-\d{2}) (\d{2}):(\d{2})\]\s*')
+TAG_RE = re.compile(r'#([^\s#]+)')
+DUE_RE = re.compile(r'\[Due:(\d{2})/(\d{2})\]')
+SECTION_RE = re.compile(r'^【([^】]+)】')
+TIMER_RE = re.compile(r'⏱️\s*(.+?)\s*-\s*用时\s*(\d+)\s*分钟')
+
+QUICK_NOTE_MARK = "快速记录:"
+PENDING_MARK = "□"
+DONE_MARK = "✓"
+
+
+def parse_date(text):
+    """解析 YYYY-MM-DD，失败返回 None"""
+    try:
+        return datetime.datetime.strptime(text, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_day_header(line):
+    """解析日期标题行，返回日期或 None"""
+    match = DAY_HEADER_RE.match(line.strip())
+    if match:
+        return parse_date(match.group(1))
+    return None
+
+
+def parse_timestamp(line):
+    """解析行首时间戳，返回 (datetime, 去掉时间戳后的正文) 或 (None, 原行)"""
+    match = TIMESTAMP_RE.match(line)
+    if not match:
+        return None, line
+    date = parse_date(match.group(1))
+    if date is None:
+        return None, line
+    hour, minute = int(match.group(2)), int(match.group(3))
+    if hour > 23 or minute > 59:
+        return None, line
+    stamp = datetime.datetime(date.year, date.month, date.day, hour, minute)
+    return stamp, line[match.end():]
+
+
+def parse_task(line):
+    """解析任务行，返回 (是否完成, 任务正文) 或 None
+
+    支持 "□ 任务"、"✓ 任务" 和 "[时间] □ 任务" 三种写法，空白模板项不算任务。
+    """
+    _, body = parse_timestamp(line.strip())
+    body = body.strip()
+    if body.startswith(PENDING_MARK):
+        done = False
+    elif body.startswith(DONE_MARK):
+        done = True
+    else:
+        return None
+    text = body[1:].strip()
+    if not text:
+        return None
+    return done, text
+
+
+def extract_tags(text):
+    """提取 #标签（保留 # 前缀）"""
+    return ["#" + tag for tag in TAG_RE.findall(text)]
+
+
+def summarize_text(content):
+    """统计一周文本的概要数据"""
+    summary = {
+        'done': 0,
+        'pending': 0,
+        'notes': 0,
+        'timers': 0,
+        'days': 0,
+        'words': len(content.split()),
+        'first_date': None,
+        'last_date': None,
+    }
+    dates = []
+    for line in content.splitlines():
+        day = parse_day_header(line)
+        if day:
+            summary['days'] += 1
+            dates.append(day)
+            continue
+        stamp, body = parse_timestamp(line)
+        if stamp:
+            dates.append(stamp.date())
+            if body.startswith(QUICK_NOTE_MARK):
+                summary['notes'] += 1
+                if TIMER_RE.search(body):
+                    summary['timers'] += 1
+        task = parse_task(line)
+        if task:
+            if task[0]:
+                summary['done'] += 1
+            else:
+                summary['pending'] += 1
+    if dates:
+        summary['first_date'] = str(min(dates))
+        summary['last_date'] = str(max(dates))
+    return summary
+
+
+def task_digest(text):
+    """任务正文的短哈希"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:10]
+
+
+def iter_tasks(content, source):
+    """逐个解析任务，返回任务字典
+
+    任务 ID 由来源、任务正文哈希和同名序号组成，勾选状态变化或行号移动时保持不变。
+    """
+    seen = {}
+    for lineno, line in enumerate(content.splitlines(), 1):
+        task = parse_task(line)
+        if not task:
+            continue
+        done, text = task
+        digest = task_digest(text)
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        yield {
+            'id': f"{source}:{digest}:{occurrence}",
+            'line': line.strip(),
+            'lineno': lineno,
+            'done': done,
+            'text': text,
+            'tags': extract_tags(text),
+        }
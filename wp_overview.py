@@ -0,0 +1,174 @@
+"""本周总览的视图模型 - 控件只创建一次，数值变化时原地更新"""
+import tkinter as tk
+from tkinter import ttk
+
+# 多周条带：每周一列的宽度、条带高度，以及可见范围两侧多画的列数
+WEEK_COLUMN = 36
+STRIP_HEIGHT = 110
+STRIP_MARGIN = 4
+
+
+class ViewModel:
+    """键值视图模型
+
+    控件通过 bind(key, setter) 绑定到某个值，update() 只对真正变化的值调用 setter，
+    刷新总览不销毁也不重建控件。
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.bindings = {}
+
+    def bind(self, key, setter):
+        self.bindings.setdefault(key, []).append(setter)
+        if key in self.values:
+            setter(self.values[key])
+
+    def set(self, key, value):
+        if key in self.values and self.values[key] == value:
+            return False
+        self.values[key] = value
+        for setter in self.bindings.get(key, ()):
+            try:
+                setter(value)
+            except Exception as e:
+                print(f"更新界面错误: {e}")
+        return True
+
+    def update(self, values):
+        """批量更新，返回变化的键"""
+        return [key for key, value in values.items() if self.set(key, value)]
+
+
+def overview_values(week_data):
+    """本周总览的显示值（analyze_week_data 的结果 -> 视图模型键值）"""
+    rate = week_data['completion_rate']
+    values = {
+        'rate': round(rate, 1),
+        'rate_text': f"{rate:.1f}% 完成",
+    }
+    days = []
+    for i, (day, data) in enumerate(week_data['daily_stats'].items()):
+        text = f"{data['completed']}/{data['total']}"
+        values[f'day{i}.name'] = day
+        values[f'day{i}.rate'] = round(data['rate'], 1)
+        values[f'day{i}.text'] = text
+        days.append((day, text))
+    # 七天合在一起的值，供按天整体重画的控件（热力图）绑定
+    values['days'] = tuple(days)
+    return values
+
+
+def visible_weeks(left, right, count, column=WEEK_COLUMN, margin=STRIP_MARGIN):
+    """横向像素区间 [left, right) 覆盖的周（从 1 开始），两侧各多留 margin 列"""
+    first = max(int(left // column) - margin, 0)
+    last = min(int(right // column) + margin, count - 1)
+    return range(first + 1, last + 2)
+
+
+class WeekStrip:
+    """可横向滚动的多周完成率条带
+
+    只绘制可见范围内的周，滚出范围的列随即删除，画布上的图元数量与总周数无关；
+    每周的 (已完成, 任务数) 在第一次显示时才通过 source(week) 取得并缓存，
+    source 返回 None 表示该周没有数据（空白周）。
+    """
+
+    def __init__(self, parent, source, bg='#2b2b2b', fg='#aaaaaa', bar='#4a90e2', current='#5cb85c'):
+        self.source = source
+        self.colors = {'bg': bg, 'fg': fg, 'bar': bar, 'current': current}
+        self.count = 0
+        self.current_week = None
+        self.stats = {}
+        self.drawn = {}
+        self.render_job = None
+        # 用户滚动之前一直停在最新的周
+        self.follow_end = True
+
+        self.canvas = tk.Canvas(parent, height=STRIP_HEIGHT, bg=bg, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.HORIZONTAL, command=self._on_scrollbar)
+        self.canvas.configure(xscrollcommand=self._on_scroll)
+        self.canvas.pack(fill=tk.X)
+        self.scrollbar.pack(fill=tk.X)
+        self.canvas.bind('<Configure>', self._on_configure)
+        self.canvas.bind('<MouseWheel>', self._on_wheel)
+
+    def set_weeks(self, count, current_week):
+        """设置总周数和当前周"""
+        if current_week != self.current_week and self.current_week is not None:
+            self.invalidate(self.current_week)
+        self.count = count
+        self.current_week = current_week
+        for week in [w for w in self.drawn if w > count]:
+            self._erase(week)
+        self.canvas.configure(scrollregion=(0, 0, count * WEEK_COLUMN, STRIP_HEIGHT))
+        if self.follow_end:
+            self.canvas.xview_moveto(1.0)
+        self.schedule_render()
+
+    def invalidate(self, week):
+        """某周的数据变化（通常是当前周），下次显示时重新取"""
+        self.stats.pop(week, None)
+        if week in self.drawn:
+            self._erase(week)
+            self.schedule_render()
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.schedule_render()
+
+    def _on_scrollbar(self, *args):
+        self.follow_end = False
+        self.canvas.xview(*args)
+
+    def _on_wheel(self, event):
+        self.follow_end = False
+        self.canvas.xview_scroll(-1 if event.delta > 0 else 1, 'units')
+
+    def _on_configure(self, event):
+        if self.follow_end:
+            self.canvas.xview_moveto(1.0)
+        self.schedule_render()
+
+    def schedule_render(self):
+        if self.render_job is None:
+            self.render_job = self.canvas.after_idle(self.render)
+
+    def render(self):
+        """补画可见的周，删除远离可见范围的周"""
+        self.render_job = None
+        if not self.count:
+            return
+        left = self.canvas.canvasx(0)
+        right = left + max(self.canvas.winfo_width(), 1)
+        weeks = visible_weeks(left, right, self.count)
+        for week in [w for w in self.drawn if w not in weeks]:
+            self._erase(week)
+        for week in weeks:
+            if week not in self.drawn:
+                self._draw(week)
+
+    def _erase(self, week):
+        for item in self.drawn.pop(week, ()):
+            self.canvas.delete(item)
+
+    def _draw(self, week):
+        if week not in self.stats:
+            self.stats[week] = self.source(week)
+        stats = self.stats[week]
+        x = (week - 1) * WEEK_COLUMN
+        top, bottom = 8, STRIP_HEIGHT - 22
+        items = [self.canvas.create_text(
+            x + WEEK_COLUMN // 2, STRIP_HEIGHT - 10, text=str(week), fill=self.colors['fg'], font=('Arial', 8)
+        )]
+        items.append(self.canvas.create_rectangle(
+            x + 8, top, x + WEEK_COLUMN - 8, bottom, outline=self.colors['fg']
+        ))
+        if stats and stats[1]:
+            done, total = stats
+            height = (bottom - top) * done / total
+            color = self.colors['current'] if week == self.current_week else self.colors['bar']
+            items.append(self.canvas.create_rectangle(
+                x + 8, bottom - height, x + WEEK_COLUMN - 8, bottom, fill=color, outline=''
+            ))
+        self.drawn[week] = items
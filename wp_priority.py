@@ -0,0 +1,138 @@
+"""任务优先级队列 - 按明确优先级、截止日期、标签和创建时间排序的待办"""
+import re
+import heapq
+import datetime
+import itertools
+
+from wp_model import DUE_RE, parse_timestamp
+
+# 明确优先级: "[P0]" 最高 ~ "[P3]" 最低
+PRIORITY_RE = re.compile(r'\[P([0-3])\]', re.IGNORECASE)
+URGENT, IMPORTANT, NORMAL, LOW = 0, 1, 2, 3
+PRIORITY_LABELS = {URGENT: "紧急", IMPORTANT: "重要", NORMAL: "普通", LOW: "低"}
+# 没有明确优先级时由标签/标记推断
+TAG_PRIORITY = {'#紧急': URGENT, '#重要': IMPORTANT, '#低优先': LOW}
+IMPORTANT_MARK = "!!"
+# 没有截止日期的任务：创建后多少天算到期
+HORIZON_DAYS = {URGENT: 0, IMPORTANT: 2, NORMAL: 7, LOW: 14}
+# 高优先级的任务比同一天到期的普通任务提前多少天
+LEAD_DAYS = {URGENT: 2, IMPORTANT: 1, NORMAL: 0, LOW: 0}
+
+
+def task_priority(task):
+    """任务的优先级等级（0 最高）"""
+    match = PRIORITY_RE.search(task['text'])
+    if match:
+        return int(match.group(1))
+    level = min((TAG_PRIORITY[tag] for tag in task['tags'] if tag in TAG_PRIORITY), default=NORMAL)
+    if IMPORTANT_MARK in task['text']:
+        level = min(level, IMPORTANT)
+    return level
+
+
+def task_due(task, created):
+    """任务的截止日期（[Due:MM/DD] 按创建日期推断年份），没有时返回 None"""
+    match = DUE_RE.search(task['text'])
+    if not match:
+        return None
+    try:
+        due = datetime.date(created.year, int(match.group(1)), int(match.group(2)))
+    except ValueError:
+        return None
+    # 年底创建、次年截止
+    if (created - due).days > 180:
+        due = due.replace(year=due.year + 1)
+    return due
+
+
+def priority_key(task, default_date):
+    """排序键（越小越靠前）
+
+    只由任务本身决定，不随当前日期变化，队列不必每天重建：
+    有效日期 = 截止日期（没有时为创建日期 + 该优先级的期限）- 该优先级的提前天数，
+    同一天按优先级、再按创建先后。
+    """
+    stamp, _ = parse_timestamp(task['line'])
+    created = stamp.date() if stamp else default_date
+    level = task_priority(task)
+    due = task_due(task, created) or created + datetime.timedelta(days=HORIZON_DAYS[level])
+    return (due.toordinal() - LEAD_DAYS[level], level, created.toordinal())
+
+
+class PriorityQueue:
+    """待办任务的堆索引
+
+    订阅标签索引的变化，任务新增、完成、删除时只做一次 O(log n) 的入堆或标记作废，
+    取前 N 项只弹出 N 个有效条目再放回，不重新排序也不读文件。
+    """
+
+    def __init__(self, tag_index, source, default_date=None):
+        self.tag_index = tag_index
+        self.source = source
+        self.default_date = default_date or datetime.date.today()
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+        self.stale = 0
+        for task in tag_index.filter(source=source, pending_only=True):
+            self._push(task)
+        tag_index.add_listener(self.on_change)
+
+    def close(self):
+        """停止订阅（切换工作区时）"""
+        self.tag_index.remove_listener(self.on_change)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, task):
+        return priority_key(task, self.default_date)
+
+    def _push(self, task):
+        entry = [self.key(task), next(self.counter), task, True]
+        self.entries[task['id']] = entry
+        heapq.heappush(self.heap, entry)
+
+    def _discard(self, task_id):
+        entry = self.entries.pop(task_id, None)
+        if entry is None:
+            return
+        entry[3] = False
+        self.stale += 1
+        # 作废条目过多时重建堆
+        if self.stale > len(self.entries) and self.stale > 64:
+            self.heap = [e for e in self.heap if e[3]]
+            heapq.heapify(self.heap)
+            self.stale = 0
+
+    def on_change(self, event, task):
+        """标签索引的任务变化"""
+        if task['source'] != self.source:
+            return
+        if event == 'remove' or task['done']:
+            self._discard(task['id'])
+        elif task['id'] not in self.entries:
+            self._push(task)
+        elif self.entries[task['id']][0] != self.key(task):
+            self._discard(task['id'])
+            self._push(task)
+
+    def top(self, n=5):
+        """优先级最高的 n 个待办"""
+        taken = []
+        while self.heap and len(taken) < n:
+            entry = heapq.heappop(self.heap)
+            if entry[3]:
+                taken.append(entry)
+            else:
+                self.stale -= 1
+        for entry in taken:
+            heapq.heappush(self.heap, entry)
+        return [entry[2] for entry in taken]
+
+    def rank(self, tasks):
+        """按优先级排列一组任务（标签筛选的结果）"""
+        def sort_key(task):
+            entry = self.entries.get(task['id'])
+            return (entry[0], entry[1]) if entry else (self.key(task), 0)
+        return sorted(tasks, key=sort_key)
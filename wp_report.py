@@ -0,0 +1,83 @@
+"""报告分段缓存 - 按输入版本记住每段结果，只重算输入变化的段"""
+import os
+
+
+def file_version(path):
+    """文件版本 (mtime, 大小)，只需一次 stat"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ReportMemo:
+    """报告分段缓存
+
+    一份报告由若干段组成，每段是 (名称, 版本, 生成函数)：版本是该段全部输入的版本
+    （当前周文件版本、归档清单版本、日期等）组成的元组，版本不变时直接用上次的结果。
+    打开窗口时先用缓存（哪怕已过期）立即显示，过期的段推迟到界面空闲时逐段重算，算完后再刷新一次。
+    重算仍在界面线程中进行（生成函数会读写分析缓存、连续记录等界面共用的对象），
+    每次回调只算一段，两段之间界面可以处理事件。
+    """
+
+    def __init__(self):
+        self.cache = {}
+        self.jobs = {}
+
+    def is_fresh(self, name, version):
+        cached = self.cache.get(name)
+        return cached is not None and cached[0] == version
+
+    def section(self, name, version, build):
+        """取一段的结果，版本变化时重新生成"""
+        cached = self.cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = build()
+        self.cache[name] = (version, value)
+        return value
+
+    def build(self, sections, assemble):
+        """同步生成报告（过期的段立即重算）"""
+        return assemble({name: self.section(name, version, build) for name, version, build in sections})
+
+    def peek(self, sections, assemble):
+        """用缓存拼出报告（可能已过期），有段从未生成过时返回 None"""
+        if any(name not in self.cache for name, _, _ in sections):
+            return None
+        return assemble({name: self.cache[name][1] for name, _, _ in sections})
+
+    def show(self, widget, sections, assemble, render, job_name='report'):
+        """立即显示缓存的报告，过期的段推迟到空闲时（界面线程中）逐段重算后再显示一次
+
+        没有缓存时同步生成；render(text) 负责显示。
+        """
+        self.cancel(widget, job_name)
+        text = self.peek(sections, assemble)
+        if text is None:
+            render(self.build(sections, assemble))
+            return
+        render(text)
+        stale = [s for s in sections if not self.is_fresh(s[0], s[1])]
+        if not stale:
+            return
+
+        def step():
+            self.jobs.pop(job_name, None)
+            name, version, build = stale.pop(0)
+            self.section(name, version, build)
+            if stale:
+                self.jobs[job_name] = widget.after(1, step)
+            elif widget.winfo_exists():
+                render(self.build(sections, assemble))
+
+        self.jobs[job_name] = widget.after_idle(step)
+
+    def cancel(self, widget, job_name='report'):
+        job = self.jobs.pop(job_name, None)
+        if job:
+            try:
+                widget.after_cancel(job)
+            except Exception:
+                pass
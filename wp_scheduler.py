@@ -0,0 +1,162 @@
+"""定时任务调度 - 窗口隐藏时暂停纯界面刷新，按截止时间精确触发"""
+import time
+import datetime
+from collections import deque
+
+WAKEUP_WINDOW = 3600
+
+
+class Scheduler:
+    """基于 Tk after 的调度器
+
+    every() 注册周期任务，ui_only 的任务只在所属窗口可见时运行，窗口隐藏（withdraw/最小化）
+    时停止排队，重新显示时立即补跑一次再恢复；at() 按 time.monotonic 截止时间单次触发。
+    每次唤醒都会计数，wakeups_per_hour() 用于确认托盘待机时的唤醒频率。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.jobs = {}
+        self.wakeups = deque()
+        self.watched = set()
+
+    def _count_wakeup(self):
+        now = time.monotonic()
+        self.wakeups.append(now)
+        while self.wakeups and now - self.wakeups[0] > WAKEUP_WINDOW:
+            self.wakeups.popleft()
+
+    def wakeups_per_hour(self):
+        """最近一小时的唤醒次数"""
+        now = time.monotonic()
+        while self.wakeups and now - self.wakeups[0] > WAKEUP_WINDOW:
+            self.wakeups.popleft()
+        return len(self.wakeups)
+
+    def _watch(self, widget):
+        """跟踪窗口显示/隐藏，只绑定一次"""
+        if str(widget) in self.watched:
+            return
+        self.watched.add(str(widget))
+        widget.bind('<Map>', lambda e: e.widget is widget and self._set_visible(widget, True), add='+')
+        widget.bind('<Unmap>', lambda e: e.widget is widget and self._set_visible(widget, False), add='+')
+        widget.bind('<Destroy>', lambda e: e.widget is widget and self._forget(widget), add='+')
+
+    def _is_visible(self, widget):
+        try:
+            return bool(widget.winfo_viewable())
+        except Exception:
+            return False
+
+    def _set_visible(self, widget, visible):
+        for name, job in list(self.jobs.items()):
+            if job.get('widget') is not widget:
+                continue
+            if visible and job['parked']:
+                job['parked'] = False
+                self._run(name)
+            elif not visible and not job['parked']:
+                job['parked'] = True
+                self._cancel_after(job)
+
+    def _forget(self, widget):
+        self.watched.discard(str(widget))
+        for name, job in list(self.jobs.items()):
+            if job.get('widget') is widget:
+                self.cancel(name)
+
+    def _cancel_after(self, job):
+        if job.get('after_id'):
+            try:
+                self.root.after_cancel(job['after_id'])
+            except Exception:
+                pass
+            job['after_id'] = None
+
+    def every(self, name, interval_ms, callback, ui_only=True, widget=None, align=False):
+        """注册周期任务（同名任务会被替换）
+
+        ui_only 为 True 时任务随 widget（默认主窗口）的显示/隐藏暂停和恢复；
+        align 为 True 时对齐到整间隔（例如时钟在整秒刷新）。
+        """
+        self.cancel(name)
+        widget = widget or self.root
+        job = {
+            'interval': interval_ms,
+            'callback': callback,
+            'widget': widget if ui_only else None,
+            'align': align,
+            'parked': False,
+            'after_id': None,
+        }
+        self.jobs[name] = job
+        if ui_only:
+            self._watch(widget)
+            if not self._is_visible(widget):
+                job['parked'] = True
+                return
+        self._run(name)
+
+    def _run(self, name):
+        job = self.jobs.get(name)
+        if job is None or job['parked']:
+            return
+        job['after_id'] = None
+        self._count_wakeup()
+        try:
+            job['callback']()
+        except Exception as e:
+            print(f"定时任务 {name} 错误: {e}")
+        if self.jobs.get(name) is job and not job['parked']:
+            delay = job['interval']
+            if job['align']:
+                delay -= int(time.time() * 1000) % job['interval']
+            job['after_id'] = self.root.after(max(delay, 1), lambda: self._run(name))
+
+    def at(self, name, deadline, callback):
+        """在 time.monotonic() 到达 deadline 时执行一次（同名任务会被替换）"""
+        self.cancel(name)
+        job = {'deadline': deadline, 'callback': callback, 'parked': False, 'after_id': None}
+        self.jobs[name] = job
+        self._arm(name)
+
+    def at_datetime(self, name, when, callback):
+        """在本地时间 when 执行一次；提前唤醒（休眠、调时钟）时按剩余时间重新排队"""
+        def fire():
+            remaining = (when - datetime.datetime.now()).total_seconds()
+            if remaining > 1:
+                self.at(name, time.monotonic() + remaining, fire)
+            else:
+                callback()
+        remaining = max((when - datetime.datetime.now()).total_seconds(), 0)
+        self.at(name, time.monotonic() + remaining, fire)
+
+    def _arm(self, name):
+        job = self.jobs[name]
+        delay_ms = int(max(job['deadline'] - time.monotonic(), 0) * 1000)
+        job['after_id'] = self.root.after(delay_ms, lambda: self._fire(name))
+
+    def _fire(self, name):
+        job = self.jobs.get(name)
+        if job is None:
+            return
+        # after 可能提前几毫秒返回，未到截止时间就补足剩余部分
+        if time.monotonic() < job['deadline'] - 0.001:
+            self._arm(name)
+            return
+        del self.jobs[name]
+        self._count_wakeup()
+        try:
+            job['callback']()
+        except Exception as e:
+            print(f"定时任务 {name} 错误: {e}")
+
+    def cancel(self, name):
+        """取消任务"""
+        job = self.jobs.pop(name, None)
+        if job:
+            self._cancel_after(job)
+
+    def pending(self, name):
+        """任务是否仍在排队"""
+        return name in self.jobs
@@ -0,0 +1,186 @@
+"""记录习惯连续天数 - 由每天是否有真实内容推算"""
+import os
+import re
+import json
+import hashlib
+import datetime
+
+from wp_model import parse_day_header, parse_timestamp, SECTION_RE
+
+STREAK_NAME = ".streak.json"
+
+# 每日模板自带、未经修改的行（不算当天有记录）
+DEFAULT_TEMPLATE_LINES = frozenset([
+    "□ 云计算 #课程",
+    "□ AI #课程",
+    "□ Advanced HCI #课程",
+    "□ 社交计算 #课程",
+    "□",
+    "-",
+    "•",
+])
+TIME_SLOT_RE = re.compile(r'^\[\d{2}:\d{2}-\d{2}:\d{2}\]$')
+RULE_CHARS = "─═-•·* "
+
+
+def is_template_line(line, template_lines=DEFAULT_TEMPLATE_LINES):
+    """空行、分隔线、段落标题和未填写的模板项"""
+    text = line.strip()
+    if not text or not text.strip(RULE_CHARS):
+        return True
+    if SECTION_RE.match(text) or TIME_SLOT_RE.match(text):
+        return True
+    return text in template_lines
+
+
+def active_days(content, template_lines=DEFAULT_TEMPLATE_LINES):
+    """有真实内容的日期集合（字符串）
+
+    带时间戳的行算在时间戳那天，其余非模板行算在所属的日期标题下。
+    """
+    days = set()
+    current = None
+    for line in content.splitlines():
+        day = parse_day_header(line)
+        if day:
+            current = day
+            continue
+        stamp, body = parse_timestamp(line.strip())
+        if stamp:
+            if body.strip():
+                days.add(str(stamp.date()))
+            continue
+        if current and not is_template_line(line, template_lines):
+            days.add(str(current))
+    return days
+
+
+class HabitStreak:
+    """连续记录天数
+
+    归档周按内容哈希只扫描一次，活跃日期持久化；新的一天只需在末尾延长当前连续段，
+    当前和最长连续天数都是直接读取的字段。
+    """
+
+    def __init__(self, archive_dir, template_lines=DEFAULT_TEMPLATE_LINES, streak_name=STREAK_NAME):
+        self.path = os.path.join(archive_dir, streak_name)
+        self.template_lines = template_lines
+        self.archived_days = set()
+        self.current_days = set()
+        self.merged = set()
+        self.current_sha1 = None
+        self.days = set()
+        self.longest = 0
+        self.run_start = None
+        self.run_end = None
+        self.load()
+
+    def load(self):
+        """加载已扫描的日期"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.archived_days = set(data.get('archived', []))
+                self.current_days = set(data.get('current', []))
+                self.merged = set(data.get('merged', []))
+                self.current_sha1 = data.get('current_sha1')
+        except (OSError, ValueError) as e:
+            print(f"读取连续记录错误: {e}")
+            self.archived_days, self.current_days, self.merged = set(), set(), set()
+            self.current_sha1 = None
+        self._recompute()
+
+    def save(self):
+        """保存扫描结果"""
+        data = {
+            'archived': sorted(self.archived_days),
+            'current': sorted(self.current_days),
+            'merged': sorted(self.merged),
+            'current_sha1': self.current_sha1,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def _recompute(self):
+        """从全部日期重算连续段（只在补入旧日期或删除日期时需要）"""
+        self.days = self.archived_days | self.current_days
+        self.longest = 0
+        self.run_start = self.run_end = None
+        for date_str in sorted(self.days):
+            self._extend(datetime.date.fromisoformat(date_str))
+
+    def _extend(self, date):
+        """按时间顺序追加一天"""
+        if self.run_end is not None and date == self.run_end + datetime.timedelta(days=1):
+            self.run_end = date
+        elif self.run_end is None or date > self.run_end:
+            self.run_start = self.run_end = date
+        self.longest = max(self.longest, (self.run_end - self.run_start).days + 1)
+
+    def add_day(self, date):
+        """记录某天有内容，返回是否为新日期"""
+        date_str = str(date)
+        if date_str in self.days:
+            return False
+        self.days.add(date_str)
+        self.current_days.add(date_str)
+        if self.run_end is None or date > self.run_end:
+            self._extend(date)
+        else:
+            self._recompute()
+        return True
+
+    def sync(self, catalog, current_file):
+        """合并新归档周，当前周内容变化时重新扫描当前文件"""
+        changed = False
+        for entry in catalog.list_weeks():
+            if entry.get('sha1') in self.merged:
+                continue
+            try:
+                with open(catalog.path_for(entry), 'r', encoding='utf-8', errors='replace') as f:
+                    self.archived_days |= active_days(f.read(), self.template_lines)
+            except OSError:
+                continue
+            self.merged.add(entry.get('sha1'))
+            changed = True
+        if changed:
+            self._recompute()
+
+        if os.path.exists(current_file):
+            with open(current_file, 'rb') as f:
+                data = f.read()
+            digest = hashlib.sha1(data).hexdigest()
+            if digest != self.current_sha1:
+                self.update_current(data.decode('utf-8', errors='replace'), digest)
+                return
+        if changed:
+            self.save()
+
+    def update_current(self, content, digest=None):
+        """当前周内容变化：只新增日期时在末尾延长，有日期消失时才重算"""
+        digest = digest or hashlib.sha1(content.encode('utf-8')).hexdigest()
+        if digest == self.current_sha1:
+            return
+        days = active_days(content, self.template_lines)
+        removed = self.current_days - days - self.archived_days
+        self.current_sha1 = digest
+        if removed:
+            self.current_days = days
+            self._recompute()
+        else:
+            for date_str in sorted(days - self.days):
+                self.add_day(datetime.date.fromisoformat(date_str))
+            self.current_days = days
+        self.save()
+
+    def current(self, today=None):
+        """当前连续天数（今天还没记录时，截至昨天的连续段仍然有效）"""
+        if self.run_end is None:
+            return 0
+        today = today or datetime.date.today()
+        if (today - self.run_end).days > 1:
+            return 0
+        return (self.run_end - self.run_start).days + 1
@@ -0,0 +1,362 @@
+"""目录同步 - 通过共享文件夹交换按行的操作日志，多台设备无冲突合并"""
+import os
+import json
+import uuid
+import socket
+import difflib
+
+STATE_NAME = ".sync_state.json"
+LOG_SUFFIX = ".log"
+JOURNAL_SUFFIX = ".journal"
+# 本机日志中的操作超过该数量时重写一次状态快照
+COMPACT_OPS = 5000
+# 链表头（不对应任何行）
+HEAD = (0, "")
+
+
+class SyncEngine:
+    """按行的复制序列（RGA）
+
+    每台设备有自己的编号，只向共享目录中自己的日志文件追加操作，从不改写别人的文件，
+    同步盘不会产生冲突副本。每行有全局唯一的编号 (Lamport 计数, 设备号)：
+      插入 {"i": 编号, "o": 左邻行编号, "t": 文本}
+      删除 {"d": 编号}（只做标记，保留位置供并发插入定位）
+    并发插入同一位置时编号大的排在前面，所有设备按任意顺序收到相同的操作后得到相同的文本。
+    修改一行记为删除旧行 + 插入新行，两台设备同时修改同一行时两个版本都会保留。
+
+    每个日志记录已读到的字节位置，同步只读取新追加的操作；本机修改由编辑器报告的
+    变更行范围 (note_change) 确定，只比较这一段，范围未知时才整篇比较。收到的操作先
+    全部接入链表，再一次性重建可见行顺序。
+    本机状态是一份快照加一个只追加的操作日志，每次同步只追加本次的操作。本机操作先写入
+    本机状态（待发出），再追加到共享日志，之后记一条“已发出”：中途中断时下次同步重发，
+    编号不会被重复使用（重复的操作对方会忽略）。
+    """
+
+    def __init__(self, shared_dir, doc, state_path):
+        self.dir = os.path.join(shared_dir, doc)
+        self.doc = doc
+        self.state_path = state_path
+        self.journal_path = os.path.splitext(state_path)[0] + JOURNAL_SUFFIX
+        self.host = socket.gethostname()
+        self.replica = None
+        self.clock = 0
+        self.offsets = {}
+        self.pending = []
+        # 已写入本机状态、还没确认追加到共享日志的本机操作
+        self.outbox = []
+        # 编号 -> [文本, 已删除, 下一行编号]
+        self.nodes = {HEAD: [None, True, None]}
+        # 可见行的编号（按文本顺序）
+        self.order = []
+        self.journal_ops = 0
+        self.snapshot_due = False
+        self.fresh = True
+        # 上次同步以来编辑器中的变更: None 表示没有变更，否则为 [未变的开头行数, 未变的结尾行数]；
+        # length 是按变更推算的当前行数。刚创建时不知道编辑器里改过什么，整篇比较一次
+        self.changes = [0, 0]
+        self.length = 0
+        self.load()
+
+    # 持久化
+    def load(self):
+        """读取本机状态快照并回放操作日志；换了文档从头开始，状态文件被复制到另一台电脑时换新设备号"""
+        try:
+            if os.path.exists(self.state_path):
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get('doc') == self.doc:
+                    self.clock = state['clock']
+                    self.offsets = state['offsets']
+                    self.pending = state['pending']
+                    self.outbox = state.get('outbox', [])
+                    prev = HEAD
+                    for counter, replica, text, deleted in state['lines']:
+                        node_id = (counter, replica)
+                        self.nodes[prev][2] = node_id
+                        self.nodes[node_id] = [text, deleted, None]
+                        prev = node_id
+                    self._rebuild_order()
+                    self.fresh = False
+                    if state.get('host') == self.host:
+                        self.replica = state['replica']
+                    self._replay_journal()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"读取同步状态错误: {e}")
+        if self.replica is None:
+            self.replica = uuid.uuid4().hex[:12]
+
+    def _replay_journal(self):
+        """回放快照之后追加的操作；同步中断留下的不完整行截掉，日志不可用时下次同步重写快照"""
+        self.snapshot_due = True
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'rb') as f:
+            data = f.read()
+        complete = data.rfind(b'\n') + 1
+        lines = data[:complete].split(b'\n')[:-1]
+        if not lines or json.loads(lines[0]).get('doc') != self.doc:
+            return
+        if complete < len(data):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(complete)
+        self.snapshot_due = False
+        ops = []
+        for line in lines[1:]:
+            record = json.loads(line)
+            if record.get('pushed'):
+                self.outbox = []
+                continue
+            # 插入/删除都是幂等的，快照之后的操作再应用一次不影响结果
+            ops.extend(record.get('ops', []))
+            self.outbox.extend(record.get('ops', [])[:record.get('sent', 0)])
+            self.offsets.update(record.get('offsets', {}))
+        self._apply_remote(ops)
+        self.journal_ops += len(ops)
+
+    def save(self):
+        """写状态快照，并清空操作日志"""
+        lines = []
+        node_id = self.nodes[HEAD][2]
+        while node_id is not None:
+            text, deleted, next_id = self.nodes[node_id]
+            lines.append([node_id[0], node_id[1], text, deleted])
+            node_id = next_id
+        state = {
+            'doc': self.doc,
+            'host': self.host,
+            'replica': self.replica,
+            'clock': self.clock,
+            'offsets': self.offsets,
+            'pending': self.pending,
+            'outbox': self.outbox,
+            'lines': lines,
+        }
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+        with open(self.journal_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'doc': self.doc}) + "\n")
+        self.journal_ops = 0
+        self.snapshot_due = False
+
+    def _journal(self, sent, remote, offsets):
+        """追加一次同步的操作（本机操作在前）和日志读取位置"""
+        if not sent and not remote and not offsets:
+            return
+        record = {'ops': sent + remote, 'sent': len(sent), 'offsets': offsets}
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_ops += len(sent) + len(remote)
+
+    # 编辑器变更
+    def note_change(self, start, removed, added):
+        """编辑器报告的变更：从第 start 行（从 1 开始）起 removed+1 行换成 added+1 行
+
+        start 为 None 表示范围未知，下次同步整篇比较。
+        """
+        if start is None or self.changes is not None and self.changes[0] < 0:
+            self.changes = [-1, -1]
+            return
+        head, tail = self.changes if self.changes is not None else (self.length, self.length)
+        self.changes = [max(min(head, start - 1), 0), max(min(tail, self.length - start - removed), 0)]
+        self.length += added - removed
+
+    def forget_changes(self):
+        """编辑器刚载入了同步后的文本，与本机状态一致"""
+        self.changes = None
+        self.length = len(self.order)
+
+    # 序列
+    def text(self):
+        return "\n".join(self.nodes[node_id][0] for node_id in self.order)
+
+    def _rebuild_order(self):
+        """沿链表重建可见行顺序（收到一批操作后调用一次）"""
+        self.order = []
+        node_id = self.nodes[HEAD][2]
+        while node_id is not None:
+            text, deleted, next_id = self.nodes[node_id]
+            if not deleted:
+                self.order.append(node_id)
+            node_id = next_id
+
+    def _integrate(self, op, index=None):
+        """应用一个操作；依赖的行还没收到时返回 False
+
+        index 是本机操作在可见行中的位置，同时更新可见行顺序；收到的操作不给 index，
+        只接入链表，由调用方在整批应用后重建顺序。
+        """
+        if 'd' in op:
+            node_id = tuple(op['d'])
+            node = self.nodes.get(node_id)
+            if node is None:
+                return False
+            if not node[1]:
+                node[1] = True
+                if index is not None:
+                    del self.order[index]
+            return True
+        node_id, origin = tuple(op['i']), tuple(op['o'])
+        if node_id in self.nodes:
+            return True
+        if origin not in self.nodes:
+            return False
+        # 跳过左邻之后编号更大的行（并发插入及其后续插入）
+        prev = origin
+        next_id = self.nodes[prev][2]
+        while next_id is not None and next_id > node_id:
+            prev = next_id
+            next_id = self.nodes[prev][2]
+        self.nodes[node_id] = [op['t'], False, next_id]
+        self.nodes[prev][2] = node_id
+        self.clock = max(self.clock, node_id[0])
+        if index is not None:
+            self.order.insert(index, node_id)
+        return True
+
+    def _apply_remote(self, ops):
+        """应用收到的操作，缺少依赖的暂存到下次，返回应用数量
+
+        逐个接入链表，最后重建一次可见行顺序：一批操作的开销是 O(操作数 + 行数)，
+        而不是每个操作都在可见行列表中查找位置。
+        """
+        applied = 0
+        queue = self.pending + ops
+        while queue:
+            waiting = []
+            for op in queue:
+                if self._integrate(op):
+                    applied += 1
+                else:
+                    waiting.append(op)
+            if len(waiting) == len(queue):
+                break
+            queue = waiting
+        self.pending = queue
+        if applied:
+            self._rebuild_order()
+        return applied
+
+    def _local_ops(self, content):
+        """本机修改（相对上次同步的文本）转换为操作并应用
+
+        只比较编辑器报告的变更范围；推算的行数与实际不符或范围未知时整篇比较。
+        """
+        new = content.split("\n")
+        old_count = len(self.order)
+        if self.changes is None:
+            head, tail = old_count, 0
+        else:
+            head, tail = self.changes
+        if head < 0 or len(new) != self.length or head + tail > min(old_count, len(new)):
+            head, tail = 0, 0
+        old = [self.nodes[node_id][0] for node_id in self.order[head:old_count - tail]]
+        ops = []
+        pos = head
+        prev = self.order[head - 1] if head else HEAD
+        matcher = difflib.SequenceMatcher(None, old, new[head:len(new) - tail], autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                pos += i2 - i1
+                prev = self.order[pos - 1]
+                continue
+            for _ in range(i2 - i1):
+                op = {'d': list(self.order[pos])}
+                self._integrate(op, pos)
+                ops.append(op)
+            for line in new[head + j1:head + j2]:
+                self.clock += 1
+                node_id = (self.clock, self.replica)
+                op = {'i': list(node_id), 'o': list(prev), 't': line}
+                self._integrate(op, pos)
+                ops.append(op)
+                pos += 1
+                prev = node_id
+        return ops
+
+    # 共享目录
+    def _pull(self):
+        """读取其他设备日志中新追加的操作，返回 (操作, 有变化的读取位置)"""
+        ops = []
+        offsets = {}
+        own = self.replica + LOG_SUFFIX
+        for name in sorted(os.listdir(self.dir)):
+            if not name.endswith(LOG_SUFFIX) or name == own:
+                continue
+            path = os.path.join(self.dir, name)
+            offset = self.offsets.get(name, 0)
+            if os.path.getsize(path) < offset:
+                # 日志被重建过，从头读（重复的插入会被忽略）
+                offset = 0
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            # 同步盘可能只传了一半，只处理完整的行
+            data = data[:data.rfind(b'\n') + 1]
+            for line in data.decode('utf-8').splitlines():
+                if line.strip():
+                    ops.append(json.loads(line))
+            if offset + len(data) != self.offsets.get(name):
+                offsets[name] = offset + len(data)
+        self.offsets.update(offsets)
+        return ops, offsets
+
+    def _push(self, ops):
+        """把本机操作追加到自己的共享日志；上次中断留下的半行先截掉，免得和新操作连成一行"""
+        if not ops:
+            return
+        data = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops).encode('utf-8')
+        with open(os.path.join(self.dir, self.replica + LOG_SUFFIX), 'a+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b'\n':
+                    f.truncate(self._last_line_end(f, size))
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _last_line_end(f, size, block=65536):
+        """文件中最后一个换行符之后的位置（没有换行符时为 0）"""
+        end = size
+        while end > 0:
+            start = max(end - block, 0)
+            f.seek(start)
+            pos = f.read(end - start).rfind(b'\n')
+            if pos != -1:
+                return start + pos + 1
+            end = start
+        return 0
+
+    def sync(self, content):
+        """同步一次，返回 (合并后的文本, 发出的操作数, 收到的操作数)
+
+        第一次同步时先接收其他设备的操作再比较本机文本，两边相同的内容不会重复插入。
+        """
+        os.makedirs(self.dir, exist_ok=True)
+        if self.fresh:
+            remote, offsets = self._pull()
+            received = self._apply_remote(remote)
+            sent = self._local_ops(content)
+        else:
+            sent = self._local_ops(content)
+            remote, offsets = self._pull()
+            received = self._apply_remote(remote)
+        # 先把本机操作（连同更新后的计数器）写入本机状态，再发出
+        self.outbox.extend(sent)
+        if self.fresh or self.snapshot_due or self.journal_ops + len(sent) + len(remote) > COMPACT_OPS:
+            self.save()
+        else:
+            self._journal(sent, remote, offsets)
+        self.fresh = False
+        if self.outbox:
+            self._push(self.outbox)
+            self.outbox = []
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'pushed': True}) + "\n")
+        self.forget_changes()
+        return (self.text() if received else content), len(sent), received
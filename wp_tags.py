@@ -0,0 +1,189 @@
+"""标签倒排索引 - 标签到任务 ID，覆盖当前周和归档周"""
+import os
+import json
+from collections import Counter
+
+from wp_model import iter_tasks, parse_task, extract_tags, task_digest
+
+INDEX_NAME = ".tag_index.json"
+CURRENT_SOURCE = "current"
+
+
+class TagIndex:
+    """标签倒排索引
+
+    归档周按内容哈希只索引一次并持久化；当前周每次变化只调整增删的任务，
+    过滤和计数都在内存集合上完成，不读文件。
+
+    listener(event, task) 接收任务变化：'add'、'remove'、勾选状态变化的 'toggle'，
+    以及只有行文本变化的 'update'。
+    """
+
+    def __init__(self, archive_dir, index_name=INDEX_NAME):
+        self.path = os.path.join(archive_dir, index_name)
+        self.tasks = {}
+        self.postings = {}
+        self.by_source = {}
+        self.sources = {}
+        self.listeners = []
+        self.load()
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def _emit(self, event, task):
+        for callback in self.listeners:
+            try:
+                callback(event, task)
+            except Exception as e:
+                print(f"标签索引回调错误: {e}")
+
+    def load(self):
+        """加载归档部分的索引"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.sources = data.get('sources', {})
+                for task in data.get('tasks', []):
+                    self._add(task)
+        except (OSError, ValueError) as e:
+            print(f"读取标签索引错误: {e}")
+            self.tasks, self.postings, self.by_source, self.sources = {}, {}, {}, {}
+
+    def save(self):
+        """保存归档部分的索引（当前周每次启动时重建）"""
+        archived = [t for t in self.tasks.values() if t['source'] != CURRENT_SOURCE]
+        data = {
+            'sources': {k: v for k, v in self.sources.items() if k != CURRENT_SOURCE},
+            'tasks': archived,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _add(self, task):
+        self.tasks[task['id']] = task
+        self.by_source.setdefault(task['source'], set()).add(task['id'])
+        for tag in task['tags']:
+            self.postings.setdefault(tag, set()).add(task['id'])
+        if self.listeners:
+            self._emit('add', task)
+
+    def _remove(self, task_id):
+        task = self.tasks.pop(task_id, None)
+        if not task:
+            return
+        self.by_source.get(task['source'], set()).discard(task_id)
+        for tag in task['tags']:
+            ids = self.postings.get(tag)
+            if ids is not None:
+                ids.discard(task_id)
+                if not ids:
+                    del self.postings[tag]
+        if self.listeners:
+            self._emit('remove', task)
+
+    def sync_archives(self, catalog):
+        """索引尚未收录的归档周"""
+        changed = False
+        for entry in catalog.list_weeks():
+            source = f"week_{entry['week']}"
+            if self.sources.get(source) == entry.get('sha1'):
+                continue
+            try:
+                with open(catalog.path_for(entry), 'r', encoding='utf-8', errors='replace') as f:
+                    content = f.read()
+            except OSError:
+                continue
+            self.update_source(source, content)
+            self.sources[source] = entry.get('sha1')
+            changed = True
+        if changed:
+            self.save()
+
+    def update_source(self, source, content):
+        """按新内容更新某个来源，只调整有变化的任务，返回 (新增数, 删除数)"""
+        new_tasks = {}
+        for task in iter_tasks(content, source):
+            task['source'] = source
+            new_tasks[task['id']] = task
+        old_ids = set(self.by_source.get(source, ()))
+
+        removed = old_ids - new_tasks.keys()
+        for task_id in removed:
+            self._remove(task_id)
+        added = 0
+        for task_id, task in new_tasks.items():
+            old = self.tasks.get(task_id)
+            if old is None:
+                self._add(task)
+                added += 1
+            else:
+                # 标签由正文决定，ID 相同则标签相同，只更新状态和位置
+                toggled = old['done'] != task['done']
+                changed = toggled or old['line'] != task['line']
+                old.update(done=task['done'], line=task['line'], lineno=task['lineno'])
+                if changed and self.listeners:
+                    self._emit('toggle' if toggled else 'update', old)
+        return added, len(removed)
+
+    def add_line(self, line, lineno=None, source=CURRENT_SOURCE):
+        """追加一行任务时直接加入索引"""
+        task = parse_task(line)
+        if not task:
+            return None
+        done, text = task
+        base = f"{source}:{task_digest(text)}"
+        occurrence = 0
+        while f"{base}:{occurrence}" in self.tasks:
+            occurrence += 1
+        entry = {
+            'id': f"{base}:{occurrence}",
+            'line': line.strip(),
+            'lineno': lineno,
+            'done': done,
+            'text': text,
+            'tags': extract_tags(text),
+            'source': source,
+        }
+        self._add(entry)
+        return entry
+
+    def filter(self, tags=(), source=None, pending_only=False):
+        """返回同时带有所有指定标签的任务，按来源内的行号排序"""
+        if tags:
+            sets = [self.postings.get(tag, set()) for tag in tags]
+            ids = set.intersection(*sorted(sets, key=len))
+        elif source is not None:
+            ids = self.by_source.get(source, ())
+        else:
+            ids = self.tasks.keys()
+        result = []
+        for task_id in ids:
+            task = self.tasks[task_id]
+            if source is not None and task['source'] != source:
+                continue
+            if pending_only and task['done']:
+                continue
+            result.append(task)
+        result.sort(key=lambda t: (t['source'], t['lineno'] if t['lineno'] is not None else float('inf')))
+        return result
+
+    def tag_counts(self, source=None):
+        """各标签的任务数"""
+        if source is None:
+            return {tag: len(ids) for tag, ids in self.postings.items()}
+        counts = Counter()
+        for task_id in self.by_source.get(source, ()):
+            counts.update(self.tasks[task_id]['tags'])
+        return dict(counts)
+
+    def top_tags(self, n=3, source=None):
+        """最常用的标签"""
+        return [tag for tag, _ in Counter(self.tag_counts(source)).most_common(n)]
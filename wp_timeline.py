@@ -0,0 +1,199 @@
+"""归档时间线 - 按周浏览历史周记，选中时才读取，相邻周在后台预取"""
+import threading
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from wp_model import parse_day_header, parse_task
+from wp_fold import decode_text
+
+# 缓存的已渲染周数，以及选中一周时两侧各预取的周数
+DEFAULT_CAPACITY = 12
+PREFETCH_RADIUS = 2
+
+
+def week_label(entry):
+    """时间线列表中一周的标题（只用清单里的概要统计，不读归档文件）"""
+    span = f"{entry['start'][5:]} ~ {entry['end'][5:]}"
+    if entry.get('gap'):
+        return f"第 {entry['week']} 周  {span}  (空白)"
+    stats = entry.get('stats', {})
+    return f"第 {entry['week']} 周  {span}  ✓{stats.get('done', 0)} □{stats.get('pending', 0)}"
+
+
+def week_summary(entry):
+    """选中一周时显示的统计行"""
+    if entry.get('gap'):
+        return f"第 {entry['week']} 周没有归档记录"
+    stats = entry.get('stats', {})
+    return (f"第 {entry['week']} 周 ({entry['start']} ~ {entry['end']})  "
+            f"完成 {stats.get('done', 0)} · 待办 {stats.get('pending', 0)} · "
+            f"记录 {stats.get('days', 0)} 天 · {stats.get('words', 0)} 词")
+
+
+def render_week(text):
+    """周记文本 -> 插入 Text 的片段 [(文字, 标签)]，同类的相邻行合并成一段"""
+    runs = []
+    for line in text.splitlines(keepends=True):
+        if parse_day_header(line.strip()):
+            tag = 'day'
+        else:
+            task = parse_task(line)
+            tag = ('done' if task[0] else 'pending') if task else ''
+        if runs and runs[-1][1] == tag:
+            runs[-1][0].append(line)
+        else:
+            runs.append(([line], tag))
+    return [("".join(lines), tag) for lines, tag in runs]
+
+
+class WeekPages:
+    """归档周的读取与缓存
+
+    按 (周数, 哈希) 缓存渲染好的片段，最近最少使用的先淘汰；归档文件被重新登记后
+    哈希变化，旧的缓存自然失效。预取在后台线程中只读文件、生成片段，不碰界面。
+    """
+
+    def __init__(self, catalog, capacity=DEFAULT_CAPACITY):
+        self.catalog = catalog
+        self.capacity = capacity
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    @staticmethod
+    def _key(entry):
+        return (entry['week'], entry.get('sha1'))
+
+    def _load(self, entry):
+        with open(self.catalog.path_for(entry), 'rb') as f:
+            return render_week(decode_text(f.read()))
+
+    def _store(self, key, runs):
+        with self.lock:
+            self.cache[key] = runs
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.capacity:
+                self.cache.popitem(last=False)
+
+    def get(self, entry):
+        """一周的片段：先查缓存，正在预取时等它读完，否则直接读取"""
+        key = self._key(entry)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            future = self.pending.get(key)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                print(f"预取归档错误: {e}")
+        runs = self._load(entry)
+        self._store(key, runs)
+        return runs
+
+    def prefetch(self, entries):
+        """在后台读取还没缓存的周（空白周跳过）"""
+        for entry in entries:
+            if not entry.get('file'):
+                continue
+            key = self._key(entry)
+            with self.lock:
+                if key in self.cache or key in self.pending:
+                    continue
+                self.pending[key] = self.executor.submit(self._prefetch_one, key, entry)
+
+    def _prefetch_one(self, key, entry):
+        try:
+            runs = self._load(entry)
+            self._store(key, runs)
+            return runs
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def close(self):
+        """不再使用时结束后台线程（未开始的预取直接取消）"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class TimelineView:
+    """时间线浏览：左侧按周列出归档（含空白周），右侧显示选中的一周
+
+    列表只用清单条目生成；选中某周才读取该周文件，随后预取前后各 PREFETCH_RADIUS 周，
+    连续翻页时多次选择合并为一次显示。
+    """
+
+    def __init__(self, parent, pages, font=('Microsoft YaHei', 10)):
+        self.pages = pages
+        self.entries = []
+        self.show_job = None
+
+        paned = ttk.PanedWindow(parent, orient=tk.HORIZONTAL)
+        paned.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        list_frame = ttk.Frame(paned)
+        paned.add(list_frame, weight=1)
+        self.week_list = tk.Listbox(list_frame, font=font, exportselection=False)
+        self.week_list.pack(fill=tk.BOTH, expand=True)
+
+        view_frame = ttk.Frame(paned)
+        paned.add(view_frame, weight=3)
+        self.summary_label = ttk.Label(view_frame, font=font)
+        self.summary_label.pack(fill=tk.X, pady=(0, 5))
+        self.view = scrolledtext.ScrolledText(view_frame, wrap=tk.WORD, font=font)
+        self.view.pack(fill=tk.BOTH, expand=True)
+        self.view.tag_configure('day', font=(font[0], font[1], 'bold'), foreground='#1565c0')
+        self.view.tag_configure('done', foreground='#2e7d32')
+        self.view.tag_configure('pending', foreground='#e65100')
+        self.view.config(state=tk.DISABLED)
+
+        self.week_list.bind('<<ListboxSelect>>', self._on_select)
+
+    def populate(self, entries):
+        """设置时间线条目（清单条目，按周数排列），默认选中最近一周"""
+        self.entries = list(entries)
+        self.week_list.delete(0, tk.END)
+        for entry in self.entries:
+            self.week_list.insert(tk.END, week_label(entry))
+        if self.entries:
+            last = len(self.entries) - 1
+            self.week_list.selection_set(last)
+            self.week_list.see(last)
+            self.show(last)
+        else:
+            self.summary_label.config(text="还没有归档的周记")
+
+    def _on_select(self, event=None):
+        if self.show_job is None:
+            self.show_job = self.week_list.after_idle(self._show_selected)
+
+    def _show_selected(self):
+        self.show_job = None
+        selection = self.week_list.curselection()
+        if selection:
+            self.show(selection[0])
+
+    def show(self, index):
+        """显示第 index 个条目，并预取相邻的周"""
+        entry = self.entries[index]
+        self.summary_label.config(text=week_summary(entry))
+        self.view.config(state=tk.NORMAL)
+        self.view.delete('1.0', tk.END)
+        if entry.get('file'):
+            try:
+                runs = self.pages.get(entry)
+            except OSError as e:
+                print(f"读取归档错误: {e}")
+                runs = [(f"无法读取归档文件: {e}", '')]
+            if runs:
+                # 一次插入所有片段（文字、标签交替传入）
+                self.view.insert('1.0', *[item for run in runs for item in run])
+        self.view.config(state=tk.DISABLED)
+        neighbours = []
+        for distance in range(1, PREFETCH_RADIUS + 1):
+            neighbours += [i for i in (index - distance, index + distance) if 0 <= i < len(self.entries)]
+        self.pages.prefetch(self.entries[i] for i in neighbours)
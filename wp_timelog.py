@@ -0,0 +1,185 @@
+"""专注时间日志 - 计时器和番茄钟的结构化记录"""
+import os
+import csv
+import json
+import bisect
+import datetime
+from array import array
+from collections import Counter
+
+LOG_NAME = ".focus.bin"
+STRINGS_NAME = ".focus_strings.txt"
+# 每条记录 4 个 int64: 开始时间戳、结束时间戳、任务字符串号、标签字符串号
+FIELDS = 4
+
+
+class FocusLog:
+    """追加写入的专注记录
+
+    记录按列存放在 array 中（本机字节序），任务名和标签组合存入字符串表只存一次；
+    按结束时间追加，区间查询用二分定位，聚合只遍历区间内的记录。
+    """
+
+    def __init__(self, archive_dir, log_name=LOG_NAME, strings_name=STRINGS_NAME):
+        self.path = os.path.join(archive_dir, log_name)
+        self.strings_path = os.path.join(archive_dir, strings_name)
+        self.starts = array('q')
+        self.ends = array('q')
+        self.task_ids = array('q')
+        self.tag_ids = array('q')
+        self.strings = []
+        self.string_ids = {}
+        self.load()
+
+    def load(self):
+        """加载日志和字符串表"""
+        try:
+            if os.path.exists(self.strings_path):
+                with open(self.strings_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.endswith("\n"):
+                            text = json.loads(line)
+                            self.string_ids.setdefault(text, len(self.strings))
+                            self.strings.append(text)
+            if os.path.exists(self.path):
+                records = array('q')
+                with open(self.path, 'rb') as f:
+                    data = f.read()
+                # 忽略写到一半的末尾记录
+                record_size = FIELDS * records.itemsize
+                records.frombytes(data[:len(data) - len(data) % record_size])
+                self.starts = records[0::FIELDS]
+                self.ends = records[1::FIELDS]
+                self.task_ids = records[2::FIELDS]
+                self.tag_ids = records[3::FIELDS]
+                if any(self.ends[i] < self.ends[i - 1] for i in range(1, len(self.ends))):
+                    self._sort()
+        except (OSError, ValueError) as e:
+            print(f"读取专注记录错误: {e}")
+
+    def _sort(self):
+        """按结束时间排序（时钟回拨后追加的记录在文件中不一定有序）"""
+        order = sorted(range(len(self.ends)), key=self.ends.__getitem__)
+        self.starts = array('q', (self.starts[i] for i in order))
+        self.ends = array('q', (self.ends[i] for i in order))
+        self.task_ids = array('q', (self.task_ids[i] for i in order))
+        self.tag_ids = array('q', (self.tag_ids[i] for i in order))
+
+    def _intern(self, text):
+        """取字符串编号，新字符串追加到字符串表"""
+        string_id = self.string_ids.get(text)
+        if string_id is None:
+            string_id = len(self.strings)
+            with open(self.strings_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(text, ensure_ascii=False) + "\n")
+            self.strings.append(text)
+            self.string_ids[text] = string_id
+        return string_id
+
+    def add(self, start, end, task, tags=()):
+        """追加一段专注时间（datetime），返回分钟数"""
+        start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+        if end_ts < start_ts:
+            start_ts, end_ts = end_ts, start_ts
+        record = array('q', [start_ts, end_ts, self._intern(task), self._intern(" ".join(sorted(set(tags))))])
+        with open(self.path, 'ab') as f:
+            f.write(record.tobytes())
+
+        # 结束时间通常递增，时钟回拨时插入到正确位置保持有序
+        index = bisect.bisect_right(self.ends, end_ts)
+        for column, value in zip((self.starts, self.ends, self.task_ids, self.tag_ids), record):
+            column.insert(index, value)
+        return (end_ts - start_ts) // 60
+
+    def __len__(self):
+        return len(self.ends)
+
+    def _range(self, since=None, until=None):
+        """结束时间落在 [since, until) 内的记录下标范围"""
+        lo = bisect.bisect_left(self.ends, int(since.timestamp())) if since else 0
+        hi = bisect.bisect_left(self.ends, int(until.timestamp())) if until else len(self.ends)
+        return range(lo, hi)
+
+    def sessions(self, since=None, until=None):
+        """逐条返回 {start, end, task, tags, minutes}"""
+        for i in self._range(since, until):
+            tags = self.strings[self.tag_ids[i]]
+            yield {
+                'start': datetime.datetime.fromtimestamp(self.starts[i]),
+                'end': datetime.datetime.fromtimestamp(self.ends[i]),
+                'task': self.strings[self.task_ids[i]],
+                'tags': tags.split() if tags else [],
+                'minutes': (self.ends[i] - self.starts[i]) // 60,
+            }
+
+    def total_minutes(self, since=None, until=None):
+        """区间内专注总分钟数"""
+        return sum(self.ends[i] - self.starts[i] for i in self._range(since, until)) // 60
+
+    def minutes_by_tag(self, since=None, until=None):
+        """各标签的专注分钟数（无标签记为空字符串）"""
+        seconds = Counter()
+        for i in self._range(since, until):
+            duration = self.ends[i] - self.starts[i]
+            tags = self.strings[self.tag_ids[i]]
+            for tag in tags.split() if tags else [""]:
+                seconds[tag] += duration
+        return {tag: s // 60 for tag, s in seconds.most_common()}
+
+    def minutes_by_day(self, since=None, until=None):
+        """每天的专注分钟数，跨零点的记录按实际时长拆到两天"""
+        seconds = Counter()
+        for i in self._range(since, until):
+            start = datetime.datetime.fromtimestamp(self.starts[i])
+            end = datetime.datetime.fromtimestamp(self.ends[i])
+            while start.date() < end.date():
+                midnight = datetime.datetime.combine(start.date() + datetime.timedelta(days=1), datetime.time())
+                seconds[str(start.date())] += (midnight - start).total_seconds()
+                start = midnight
+            seconds[str(start.date())] += (end - start).total_seconds()
+        return {day: int(s // 60) for day, s in sorted(seconds.items())}
+
+    def minutes_by_week(self, since=None, until=None):
+        """每个 ISO 周的专注分钟数，键为 "2025-W33" """
+        weeks = Counter()
+        for day, minutes in self.minutes_by_day(since, until).items():
+            year, week, _ = datetime.date.fromisoformat(day).isocalendar()
+            weeks[f"{year}-W{week:02d}"] += minutes
+        return dict(sorted(weeks.items()))
+
+    def top_tasks(self, n=5, since=None, until=None):
+        """专注时间最长的任务 [(任务, 分钟)]"""
+        seconds = Counter()
+        for i in self._range(since, until):
+            seconds[self.task_ids[i]] += self.ends[i] - self.starts[i]
+        return [(self.strings[task_id], s // 60) for task_id, s in seconds.most_common(n)]
+
+    def export_csv(self, path, since=None, until=None):
+        """导出为 CSV，返回记录数"""
+        count = 0
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["开始", "结束", "分钟", "任务", "标签"])
+            for session in self.sessions(since, until):
+                writer.writerow([
+                    session['start'].strftime("%Y-%m-%d %H:%M"),
+                    session['end'].strftime("%Y-%m-%d %H:%M"),
+                    session['minutes'],
+                    session['task'],
+                    " ".join(session['tags']),
+                ])
+                count += 1
+        return count
+
+    def export_json(self, path, since=None, until=None):
+        """导出为 JSON 数组，返回记录数"""
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("[\n")
+            for session in self.sessions(since, until):
+                session['start'] = session['start'].isoformat()
+                session['end'] = session['end'].isoformat()
+                f.write((",\n" if count else "") + json.dumps(session, ensure_ascii=False))
+                count += 1
+            f.write("\n]\n")
+        return count
@@ -0,0 +1,261 @@
+"""计时器与番茄钟引擎 - 基于单调时钟，与计时窗口无关"""
+import os
+import json
+import time
+import datetime
+
+STATE_NAME = ".timers.json"
+
+STOPWATCH = 'stopwatch'
+POMODORO = 'pomodoro'
+
+FOCUS = 'focus'
+SHORT_BREAK = 'short_break'
+LONG_BREAK = 'long_break'
+PHASE_LABELS = {FOCUS: "专注", SHORT_BREAK: "短休息", LONG_BREAK: "长休息"}
+
+DEFAULT_POMODORO = {
+    'focus_minutes': 25,
+    'short_break_minutes': 5,
+    'long_break_minutes': 15,
+    'cycles_before_long_break': 4,
+}
+
+
+class TimerEngine:
+    """多个并行计时器
+
+    运行时间 = 已累计秒数 + (time.monotonic() - 本段开始)，不依赖每秒回调计数，
+    系统休眠和修改时间都不会造成漂移。番茄钟阶段到期通过调度器在截止时间精确触发；
+    状态在每次启停时保存，重启后用墙钟时间差补上关闭期间经过的时间。
+
+    listener(event, timer, info) 接收事件:
+      'segment'  一段专注结束，info = (开始 datetime, 结束 datetime)
+      'phase'    番茄钟阶段结束，info = 结束的阶段
+      'stopped'  计时器停止，info = 总运行秒数
+    """
+
+    def __init__(self, archive_dir, scheduler=None, pomodoro=None, state_name=STATE_NAME):
+        self.path = os.path.join(archive_dir, state_name)
+        self.scheduler = scheduler
+        self.pomodoro = dict(DEFAULT_POMODORO, **(pomodoro or {}))
+        self.timers = {}
+        self.listeners = []
+        self.next_id = 1
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def _emit(self, event, timer, info=None):
+        for callback in self.listeners:
+            try:
+                callback(event, timer, info)
+            except Exception as e:
+                print(f"计时器回调错误: {e}")
+
+    # 持久化
+    def load(self):
+        """恢复上次退出时的计时器，补上关闭期间经过的时间"""
+        try:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取计时器状态错误: {e}")
+            return
+        self.next_id = data.get('next_id', 1)
+        now_wall, now_mono = time.time(), time.monotonic()
+        for timer in data.get('timers', []):
+            timer['run_mono'] = timer['run_wall'] = None
+            if timer.get('run_since') is not None:
+                # 运行中：关闭期间的时间按墙钟计入（时钟回拨时不倒扣）
+                away = max(now_wall - timer.pop('run_since'), 0)
+                timer['run_mono'] = now_mono - away
+                timer['run_wall'] = now_wall - away
+            self.timers[timer['id']] = timer
+        # 关闭太久的番茄钟最多补一轮长休息周期，之后停在当前阶段开头等待继续
+        limit = 2 * self.pomodoro['cycles_before_long_break']
+        for timer_id in list(self.timers):
+            self._catch_up(timer_id, limit)
+            self._arm(timer_id)
+
+    def save(self):
+        """保存状态（运行中的计时器记录本段开始的墙钟时刻）"""
+        now_wall, now_mono = time.time(), time.monotonic()
+        timers = []
+        for timer in self.timers.values():
+            state = {k: v for k, v in timer.items() if k not in ('run_mono', 'run_wall')}
+            if timer['run_mono'] is not None:
+                # 按单调时钟折算的本段开始墙钟时刻
+                state['run_since'] = now_wall - (now_mono - timer['run_mono'])
+            timers.append(state)
+        data = {'next_id': self.next_id, 'timers': timers}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    # 查询
+    def elapsed(self, timer_id):
+        """当前阶段已运行秒数"""
+        timer = self.timers[timer_id]
+        running = time.monotonic() - timer['run_mono'] if timer['run_mono'] is not None else 0
+        return timer['accumulated'] + running
+
+    def remaining(self, timer_id):
+        """倒计时阶段剩余秒数，正计时返回 None"""
+        timer = self.timers[timer_id]
+        if timer['duration'] is None:
+            return None
+        return max(timer['duration'] - self.elapsed(timer_id), 0)
+
+    def is_running(self, timer_id):
+        return self.timers[timer_id]['run_mono'] is not None
+
+    def list_timers(self):
+        return list(self.timers.values())
+
+    # 控制
+    def start(self, task, tags=(), kind=STOPWATCH):
+        """新建并启动计时器，返回编号"""
+        timer_id = self.next_id
+        self.next_id += 1
+        self.timers[timer_id] = {
+            'id': timer_id,
+            'task': task,
+            'tags': list(tags),
+            'kind': kind,
+            'phase': FOCUS,
+            'cycle': 0,
+            'total': 0,
+            'accumulated': 0,
+            'duration': self._phase_seconds(FOCUS) if kind == POMODORO else None,
+            'run_mono': None,
+            'run_wall': None,
+        }
+        self.resume(timer_id)
+        return timer_id
+
+    def pause(self, timer_id):
+        """暂停，已运行的一段计入累计时间"""
+        timer = self.timers[timer_id]
+        if timer['run_mono'] is None:
+            return
+        self._close_segment(timer, time.monotonic())
+        self._disarm(timer_id)
+        self.save()
+
+    def resume(self, timer_id):
+        """继续（或开始）计时"""
+        timer = self.timers[timer_id]
+        if timer['run_mono'] is not None:
+            return
+        timer['run_mono'] = time.monotonic()
+        timer['run_wall'] = time.time()
+        self._arm(timer_id)
+        self.save()
+
+    def stop(self, timer_id):
+        """停止并移除计时器，返回总运行秒数"""
+        timer = self.timers[timer_id]
+        if timer['run_mono'] is not None:
+            self._close_segment(timer, time.monotonic())
+        self._disarm(timer_id)
+        del self.timers[timer_id]
+        self.save()
+        self._emit('stopped', timer, timer['total'])
+        return timer['total']
+
+    def skip(self, timer_id):
+        """番茄钟跳到下一阶段"""
+        timer = self.timers[timer_id]
+        if timer['kind'] != POMODORO:
+            return
+        now = time.monotonic()
+        running = timer['run_mono'] is not None
+        if running:
+            self._close_segment(timer, now)
+        self._next_phase(timer)
+        if running:
+            timer['run_mono'] = now
+            timer['run_wall'] = time.time()
+        self._arm(timer_id)
+        self.save()
+
+    # 内部
+    def _phase_seconds(self, phase):
+        key = {FOCUS: 'focus_minutes', SHORT_BREAK: 'short_break_minutes', LONG_BREAK: 'long_break_minutes'}[phase]
+        return self.pomodoro[key] * 60
+
+    def _close_segment(self, timer, end_mono):
+        """结束当前运行段，专注段通知记录"""
+        seconds = end_mono - timer['run_mono']
+        timer['accumulated'] += seconds
+        if timer['phase'] == FOCUS:
+            timer['total'] += seconds
+            start = datetime.datetime.fromtimestamp(timer['run_wall'])
+            self._emit('segment', timer, (start, start + datetime.timedelta(seconds=seconds)))
+        timer['run_mono'] = timer['run_wall'] = None
+
+    def _next_phase(self, timer):
+        finished = timer['phase']
+        if finished == FOCUS:
+            timer['cycle'] += 1
+            if timer['cycle'] % self.pomodoro['cycles_before_long_break'] == 0:
+                timer['phase'] = LONG_BREAK
+            else:
+                timer['phase'] = SHORT_BREAK
+        else:
+            timer['phase'] = FOCUS
+        timer['accumulated'] = 0
+        timer['duration'] = self._phase_seconds(timer['phase'])
+        self._emit('phase', timer, finished)
+
+    def _catch_up(self, timer_id, limit=None):
+        """按截止时间推进已到期的阶段（含关闭期间错过的阶段）"""
+        timer = self.timers[timer_id]
+        changed = False
+        while timer['duration'] is not None and timer['run_mono'] is not None:
+            overrun = self.elapsed(timer_id) - timer['duration']
+            if overrun < 0:
+                break
+            if limit is not None:
+                if limit <= 0:
+                    timer['run_mono'] = timer['run_wall'] = None
+                    timer['accumulated'] = 0
+                    changed = True
+                    break
+                limit -= 1
+            # 阶段恰好在截止时间结束，多出的时间计入下一阶段
+            end_mono = time.monotonic() - overrun
+            end_wall = timer['run_wall'] + (end_mono - timer['run_mono'])
+            self._close_segment(timer, end_mono)
+            self._next_phase(timer)
+            timer['run_mono'], timer['run_wall'] = end_mono, end_wall
+            changed = True
+        return changed
+
+    def _arm(self, timer_id):
+        """在当前阶段截止时间触发"""
+        remaining = self.remaining(timer_id)
+        if self.scheduler is None or remaining is None or not self.is_running(timer_id):
+            return
+        self.scheduler.at(f"timer:{timer_id}", time.monotonic() + remaining, lambda: self._on_deadline(timer_id))
+
+    def _disarm(self, timer_id):
+        if self.scheduler is not None:
+            self.scheduler.cancel(f"timer:{timer_id}")
+
+    def _on_deadline(self, timer_id):
+        if timer_id not in self.timers:
+            return
+        if self._catch_up(timer_id):
+            self.save()
+        self._arm(timer_id)
+
+    def tick(self):
+        """没有调度器时手动检查到期阶段"""
+        for timer_id in list(self.timers):
+            if self._catch_up(timer_id):
+                self.save()
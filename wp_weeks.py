@@ -0,0 +1,97 @@
+"""周次计算与周转换 - 按 ISO 周（周一开始）相对 start_date 计算周数"""
+import os
+import datetime
+
+from wp_model import parse_date
+
+
+def monday_of(date):
+    """日期所在 ISO 周的周一"""
+    return date - datetime.timedelta(days=date.weekday())
+
+
+class WeekEngine:
+    """周次引擎
+
+    第 1 周是 start_date 所在的 ISO 周，任意日期的周数只需一次日期相减；
+    周转换时当前周文件只归档一次，中间跳过的周在归档清单中登记为空白周。
+    """
+
+    def __init__(self, start_date):
+        self.start_date = start_date
+        self.anchor = monday_of(start_date)
+
+    @classmethod
+    def from_config(cls, config, today=None):
+        """从配置创建；没有 start_date 时按上次检查日 (last_check) 和当时的 week_num 倒推并写回配置
+
+        week_num 是 last_check 那天所在的周，按今天倒推会把离开期间的周都算进当前周，
+        久未打开时就不会归档。两者都没有时才按今天计算。
+        """
+        today = today or datetime.date.today()
+        start = parse_date(config.get('start_date'))
+        if start is None:
+            last_check = parse_date(config.get('last_check')) or today
+            start = monday_of(last_check) - datetime.timedelta(weeks=max(config.get('week_num', 1), 1) - 1)
+            config['start_date'] = str(start)
+        return cls(start)
+
+    def week_of(self, date):
+        """日期所在的周数（start_date 之前的日期算第 1 周）"""
+        return max((monday_of(date) - self.anchor).days // 7 + 1, 1)
+
+    def week_range(self, week_num):
+        """某周的 (周一, 周日)"""
+        monday = self.anchor + datetime.timedelta(weeks=week_num - 1)
+        return monday, monday + datetime.timedelta(days=6)
+
+    def next_boundary(self, now=None):
+        """下一个周一零点"""
+        now = now or datetime.datetime.now()
+        monday = monday_of(now.date()) + datetime.timedelta(weeks=1)
+        return datetime.datetime.combine(monday, datetime.time())
+
+    def archive_path(self, archive_dir, week_num):
+        """某周的归档文件路径"""
+        _, sunday = self.week_range(week_num)
+        return os.path.join(archive_dir, f"week_{week_num}_progress_{sunday}.txt")
+
+    def transition(self, catalog, current_file, week_num, today=None):
+        """把当前周文件推进到今天所在的周
+
+        week_num 是当前周文件所属的周。今天已进入之后的周时，把当前周文件改名归档
+        （目标已存在说明上次已归档过，不会重复归档），并为中间没有记录的周登记空白条目。
+        返回 (新的周数, 归档路径或 None, 空白周数)。
+        """
+        today = today or datetime.date.today()
+        current = self.week_of(today)
+        if current <= week_num:
+            return week_num, None, self.backfill(catalog, week_num)
+
+        archived = None
+        path = self.archive_path(catalog.archive_dir, week_num)
+        if os.path.exists(current_file) and not os.path.exists(path):
+            os.replace(current_file, path)
+            archived = path
+        if os.path.exists(path) and (catalog.get_week(week_num) or {}).get('file') != os.path.basename(path):
+            catalog.record(week_num, path)
+        return current, archived, self.backfill(catalog, current)
+
+    def start_new_week(self, catalog, current_file, week_num, today=None):
+        """手动开始新的一周：当前周文件立即归档，今天所在的日历周算作下一周
+
+        今天仍在 week_num 所在的周（或之前）时，把 start_date 提前相应的周数，周数与日历
+        保持一致，下一个周一照常转换；调用方需把新的 start_date 写回配置。
+        返回值同 transition。
+        """
+        today = today or datetime.date.today()
+        behind = week_num + 1 - self.week_of(today)
+        if behind > 0:
+            self.start_date -= datetime.timedelta(weeks=behind)
+            self.anchor = monday_of(self.start_date)
+        return self.transition(catalog, current_file, week_num, today)
+
+    def backfill(self, catalog, current):
+        """为当前周之前没有条目的周登记空白条目，返回新增数量"""
+        missing = [n for n in range(1, current) if catalog.get_week(n) is None]
+        return catalog.record_gaps((n,) + self.week_range(n) for n in missing)
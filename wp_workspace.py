@@ -0,0 +1,183 @@
+"""工作区 - 每个课程/项目独立的周记文件、归档和索引"""
+import os
+import re
+import json
+import datetime
+
+from wp_model import iter_tasks
+from wp_catalog import ArchiveCatalog
+from wp_tags import TagIndex, CURRENT_SOURCE
+
+DEFAULT_WORKSPACE = "default"
+WORKSPACES_DIR = "workspaces"
+CURRENT_NAME = "weekly_progress.txt"
+ARCHIVE_NAME = "archive"
+PENDING_NAME = ".pending.json"
+# 随工作区切换的配置项（周数各自独立）
+WORKSPACE_KEYS = ('week_num', 'start_date', 'last_check')
+NAME_RE = re.compile(r'^[^\\/:*?"<>|.][^\\/:*?"<>|]{0,39}$')
+
+
+class Workspace:
+    """一个工作区
+
+    归档清单和标签索引在第一次访问时才加载；待办摘要单独保存为小索引文件，
+    文件未被外部修改时跨工作区的待办视图直接读索引，不打开周记文件。
+    """
+
+    def __init__(self, name, root):
+        self.name = name
+        self.root = root
+        self.current_file = os.path.join(root, CURRENT_NAME)
+        self.archive_dir = os.path.join(root, ARCHIVE_NAME)
+        self.pending_path = os.path.join(self.archive_dir, PENDING_NAME)
+        self._catalog = None
+        self._tag_index = None
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            self._catalog = ArchiveCatalog(self.archive_dir)
+        return self._catalog
+
+    @property
+    def tag_index(self):
+        if self._tag_index is None:
+            index = TagIndex(self.archive_dir)
+            index.sync_archives(self.catalog)
+            if os.path.exists(self.current_file):
+                with open(self.current_file, 'r', encoding='utf-8') as f:
+                    index.update_source(CURRENT_SOURCE, f.read())
+            self._tag_index = index
+        return self._tag_index
+
+    def append_line(self, line):
+        """在周记文件末尾追加一行并落盘，只读末尾一个字节，与文件大小无关
+
+        文件不以换行结尾时先补换行；返回实际写入的文本。
+        """
+        with open(self.current_file, 'ab+') as f:
+            f.seek(0, os.SEEK_END)
+            prefix = b''
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    prefix = b'\n'
+            data = prefix + line.rstrip('\n').encode('utf-8') + b'\n'
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return data.decode('utf-8')
+
+    def _file_key(self):
+        try:
+            st = os.stat(self.current_file)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def record_pending(self, content):
+        """保存当前周待办摘要（在周记文件写入之后调用）"""
+        tasks = [
+            {'line': t['line'], 'lineno': t['lineno'], 'text': t['text'], 'tags': t['tags']}
+            for t in iter_tasks(content, self.name) if not t['done']
+        ]
+        os.makedirs(self.archive_dir, exist_ok=True)
+        tmp_path = self.pending_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': self._file_key(), 'tasks': tasks}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.pending_path)
+        return tasks
+
+    def pending(self):
+        """当前周待办：索引与文件一致时直接返回，否则重新解析一次"""
+        key = self._file_key()
+        if key is None:
+            return []
+        try:
+            with open(self.pending_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('key') == key:
+                return data.get('tasks', [])
+        except (OSError, ValueError):
+            pass
+        with open(self.current_file, 'r', encoding='utf-8') as f:
+            return self.record_pending(f.read())
+
+
+class WorkspaceManager:
+    """工作区注册表
+
+    默认工作区就是程序目录本身（weekly_progress.txt 和 archive/），其余工作区位于
+    workspaces/<名称>/ 下，同样的文件布局。工作区对象按需创建并缓存。
+    """
+
+    def __init__(self, config, base_dir="."):
+        self.config = config
+        self.base_dir = base_dir
+        self.loaded = {}
+        config.setdefault('workspaces', [])
+        config.setdefault('active_workspace', DEFAULT_WORKSPACE)
+        config.setdefault('workspace_state', {})
+        if self.config['active_workspace'] not in self.names():
+            self.config['active_workspace'] = DEFAULT_WORKSPACE
+
+    def names(self):
+        return [DEFAULT_WORKSPACE] + list(self.config['workspaces'])
+
+    def root_of(self, name):
+        if name == DEFAULT_WORKSPACE:
+            return self.base_dir
+        return os.path.join(self.base_dir, WORKSPACES_DIR, name)
+
+    def get(self, name):
+        """取工作区（第一次访问时创建对象，不读取文件）"""
+        workspace = self.loaded.get(name)
+        if workspace is None:
+            if name not in self.names():
+                raise KeyError(name)
+            workspace = Workspace(name, self.root_of(name))
+            self.loaded[name] = workspace
+        return workspace
+
+    @property
+    def active(self):
+        return self.get(self.config['active_workspace'])
+
+    def create(self, name):
+        """新建工作区，名称不合法或已存在时抛出 ValueError"""
+        name = name.strip()
+        if not NAME_RE.match(name) or name in self.names():
+            raise ValueError(f"工作区名称无效或已存在: {name}")
+        os.makedirs(os.path.join(self.root_of(name), ARCHIVE_NAME), exist_ok=True)
+        self.config['workspaces'].append(name)
+        self.config['workspace_state'][name] = {
+            'week_num': 1,
+            'last_check': str(datetime.date.today()),
+        }
+        return self.get(name)
+
+    def switch(self, name):
+        """切换活动工作区：保存当前工作区的周数等配置，换入目标工作区的"""
+        if name not in self.names():
+            raise KeyError(name)
+        current = self.config['active_workspace']
+        if name == current:
+            return self.active
+        states = self.config['workspace_state']
+        states[current] = {k: self.config[k] for k in WORKSPACE_KEYS if k in self.config}
+        state = states.pop(name, None) or {'week_num': 1, 'last_check': str(datetime.date.today())}
+        for key in WORKSPACE_KEYS:
+            self.config.pop(key, None)
+        self.config.update(state)
+        self.config['active_workspace'] = name
+        return self.active
+
+    def pending_everywhere(self):
+        """所有工作区的当前周待办 [(工作区名, 任务)]"""
+        result = []
+        for name in self.names():
+            for task in self.get(name).pending():
+                result.append((name, task))
+        return result